@@ -0,0 +1,188 @@
+"""
+аналитика игры на numpy
+ответы копятся в матрицах игрок x вопрос, итоги раунда и игры считаются разом для всех
+"""
+
+import warnings
+
+from startup import lazy_import
+
+# numpy грузится при первой игре, а не при старте сервера
+np = lazy_import('numpy')
+
+# нет ответа на вопрос
+NO_ANSWER = -1
+
+
+class GameAnalytics:
+    """матрицы времени ответа, правильности и очков для одной игры"""
+
+    def __init__(self, questions=10, capacity=8):
+        self.slots = {}  # sid -> строка матриц
+        self.size = 0
+        self.times = np.full((capacity, questions), np.nan, dtype=np.float32)
+        self.correct = np.full((capacity, questions), NO_ANSWER, dtype=np.int8)
+        self.points = np.zeros((capacity, questions), dtype=np.int16)
+
+    # ---------- запись ----------
+
+    def add_player(self, sid):
+        """выделение строки под игрока"""
+        if sid in self.slots:
+            return self.slots[sid]
+        if self.size == self.times.shape[0]:
+            self._grow(rows=self.size * 2 or 8)
+        self.slots[sid] = self.size
+        self.size += 1
+        return self.slots[sid]
+
+    def reserve(self, questions):
+        """столбцы под вопросы игры (число известно после загрузки вопросов)"""
+        if questions > self.times.shape[1]:
+            self._grow(cols=questions)
+
+    def rename(self, old_sid, new_sid):
+        """игрок переподключился под новым sid"""
+        if old_sid in self.slots:
+            self.slots[new_sid] = self.slots.pop(old_sid)
+
+    def remove_player(self, sid):
+        """игрок ушел - строка остается, но в итоги не попадает"""
+        self.slots.pop(sid, None)
+
+    def record(self, sid, question_idx, is_correct, response_time, points):
+        """учет одного ответа"""
+        row = self.slots.get(sid)
+        if row is None:
+            row = self.add_player(sid)
+        if question_idx >= self.times.shape[1]:
+            self._grow(cols=question_idx + 1)
+        self.times[row, question_idx] = response_time
+        self.correct[row, question_idx] = 1 if is_correct else 0
+        self.points[row, question_idx] = points
+
+    def _grow(self, rows=None, cols=None):
+        rows = max(rows or 0, self.times.shape[0])
+        cols = max(cols or 0, self.times.shape[1])
+        old_rows, old_cols = self.times.shape
+
+        times = np.full((rows, cols), np.nan, dtype=np.float32)
+        correct = np.full((rows, cols), NO_ANSWER, dtype=np.int8)
+        points = np.zeros((rows, cols), dtype=np.int16)
+        times[:old_rows, :old_cols] = self.times
+        correct[:old_rows, :old_cols] = self.correct
+        points[:old_rows, :old_cols] = self.points
+        self.times, self.correct, self.points = times, correct, points
+
+    # ---------- итоги ----------
+
+    def round_summary(self, question_idx):
+        """время ответа на один вопрос по всем игрокам"""
+        if question_idx >= self.times.shape[1] or not self.slots:
+            return {'answered': 0, 'avg_time': 0, 'p50_time': 0, 'p90_time': 0}
+
+        rows = np.fromiter(self.slots.values(), dtype=np.intp, count=len(self.slots))
+        column = self.times[rows, question_idx]
+        column = column[~np.isnan(column)]
+        if column.size == 0:
+            return {'answered': 0, 'avg_time': 0, 'p50_time': 0, 'p90_time': 0}
+
+        p50, p90 = np.percentile(column, [50, 90])
+        return {
+            'answered': int(column.size),
+            'avg_time': round(float(column.mean()), 2),
+            'p50_time': round(float(p50), 2),
+            'p90_time': round(float(p90), 2)
+        }
+
+    def player_summary(self, sids):
+        """итоги по игрокам в порядке sids: массивы одинаковой длины"""
+        rows = np.fromiter((self.slots[sid] for sid in sids), dtype=np.intp, count=len(sids))
+        times = self.times[rows]
+        correct = self.correct[rows]
+
+        answered = (correct != NO_ANSWER).sum(axis=1)
+        right = (correct == 1)
+
+        with warnings.catch_warnings():
+            # у игрока без единого ответа все nan - это нормально, получаем 0
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            avg_time = np.nan_to_num(np.nanmean(times, axis=1))
+        p50_time, p90_time = row_percentiles(times, (50, 90))
+
+        return {
+            'score': self.points[rows].sum(axis=1, dtype=np.int64),
+            'correct': right.sum(axis=1),
+            'wrong': (correct == 0).sum(axis=1),
+            'accuracy': np.divide(right.sum(axis=1), answered, out=np.zeros(len(rows)), where=answered > 0),
+            'avg_time': avg_time,
+            'p50_time': p50_time,
+            'p90_time': p90_time,
+            'best_streak': best_streaks(right)
+        }
+
+    # ---------- снапшот ----------
+
+    def to_bytes(self):
+        """сырые матрицы для снапшота (только занятые строки)"""
+        rows, cols = self.size, self.times.shape[1]
+        header = np.array([rows, cols], dtype=np.uint32).tobytes()
+        return (header
+                + self.times[:rows].tobytes()
+                + self.correct[:rows].tobytes()
+                + self.points[:rows].tobytes())
+
+    @classmethod
+    def from_bytes(cls, data, sids_by_row):
+        """восстановление из to_bytes, sids_by_row - sid для каждой строки (None если игрока уже нет)"""
+        rows, cols = np.frombuffer(data, dtype=np.uint32, count=2)
+        rows, cols = int(rows), int(cols)
+        analytics = cls(questions=cols, capacity=max(rows, 8))
+
+        pos = 8
+        for matrix, dtype in ((analytics.times, np.float32), (analytics.correct, np.int8), (analytics.points, np.int16)):
+            count = rows * cols
+            matrix[:rows] = np.frombuffer(data, dtype=dtype, count=count, offset=pos).reshape(rows, cols)
+            pos += count * np.dtype(dtype).itemsize
+
+        analytics.size = rows
+        analytics.slots = {sid: row for row, sid in enumerate(sids_by_row) if sid is not None}
+        return analytics
+
+    def rows_to_sids(self):
+        """sid для каждой занятой строки"""
+        result = [None] * self.size
+        for sid, row in self.slots.items():
+            result[row] = sid
+        return result
+
+
+def row_percentiles(values, percents):
+    """перцентили по строкам с пропуском nan (np.nanpercentile по оси в разы медленнее)"""
+    ordered = np.sort(values, axis=1)  # nan уходят в конец строки
+    counts = (~np.isnan(values)).sum(axis=1)
+    rows = np.arange(len(values))
+    last = np.maximum(counts - 1, 0)
+
+    result = []
+    for percent in percents:
+        pos = last * (percent / 100.0)
+        lo = np.floor(pos).astype(np.intp)
+        hi = np.minimum(lo + 1, last)
+        low_values = ordered[rows, lo] if ordered.shape[1] else np.zeros(len(rows))
+        high_values = ordered[rows, hi] if ordered.shape[1] else np.zeros(len(rows))
+        value = low_values + (high_values - low_values) * (pos - lo)
+        result.append(np.where(counts > 0, value, 0.0))
+    return result
+
+
+def best_streaks(right):
+    """самая длинная серия правильных ответов в каждой строке булевой матрицы"""
+    if right.shape[1] == 0:
+        return np.zeros(right.shape[0], dtype=np.int64)
+    hits = right.astype(np.int64)
+    total = np.cumsum(hits, axis=1)
+    # значение накопленной суммы в момент последнего промаха
+    at_miss = np.maximum.accumulate(np.where(hits == 0, total, 0), axis=1)
+    return (total - at_miss).max(axis=1)
+
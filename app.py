@@ -4,39 +4,85 @@ quizbattle - командная викторина в реальном врем
 """
 
 import os
-import random
-import string
+import hmac
 import json
 import time
 import threading
 import uuid
-from datetime import datetime
+import itertools
+from datetime import datetime, timedelta
 from functools import wraps
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file
+import click
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, session, stream_with_context
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-from flask_bcrypt import Bcrypt
 from sqlalchemy import func
-import requests
+from sqlalchemy.orm import joinedload
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 
+import database
+import metrics
+import passwords
+import questionstats
+import transport
+from ratelimit import Budget, RateLimiter
+from analytics import GameAnalytics
+from archive import DEFAULT_ARCHIVE_FILE, HISTORY_RETENTION_DAYS, Archive
+from assets import Assets, build_assets
+from eventlog import (EVENT_ANSWER, EVENT_CREATE, EVENT_END, EVENT_JOIN, EVENT_KICK, EVENT_LEAVE,
+                      EVENT_QUESTION, EVENT_SKIP, EVENT_TIMEOUT, EventLog, read_log, replay, team_code)
+from export import EXPORT_FORMATS, ExportCache, csv_chunks, game_chunks, game_record, ndjson_chunks, player_record
+from large_room import LARGE_ROOM_THRESHOLD, TOP_N, AnswerBuffer, top_players, player_ranks, roster_shard
+from matchmaking import Matchmaker
+from pagecache import TwoTierCache, conditional_response, make_etag
+from pins import PinAllocator
+from profiler import MAX_PROFILE_SECONDS, SamplingProfiler, collapsed
+from questionpack import QuestionPack
+from questionio import (COLUMNS as QUESTION_COLUMNS, FORMATS as QUESTION_FORMATS, detect_format, open_file,
+                        read_questions, write_questions)
+from rating import DEFAULT_RATING, DEFAULT_RD, DEFAULT_VOL, rate_game
+from reaper import DEFAULT_TTLS, select_expired
+from scheduler import scheduler
+from spectators import SpectatorFeed, watch_room
+from clocksync import ClockSync
+from snapshot import GameJournal, encode_game, decode_game
+from startup import lazy_import
+
+# тяжелые модули, не нужные для старта сервера
+np = lazy_import('numpy')
+
 # загружаем переменные окружения из .env
 load_dotenv()
 
 # инициализация flask приложения
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///quizbattle.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = database.normalize_url(
+    os.environ.get('DATABASE_URL', database.DEFAULT_DATABASE_URL)
+)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # инициализация расширений flask
 db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
+with app.app_context():
+    database.configure_engine(db.engine)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# транспорт и формат пакетов настраиваются через SOCKET_TRANSPORT и SOCKET_SERIALIZER (см. transport.py)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', **transport.server_options())
+# за обратным прокси адрес клиента берется из X-Forwarded-For (лимиты по ip, см. ratelimit.py);
+# TRUSTED_PROXIES - сколько прокси стоит перед сервером, без него заголовку не верим.
+# оборачиваем после socketio, чтобы исправленный адрес видели и socket.io события
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+socket_client = transport.client_config()
+# статика с хешем в имени и сжатыми копиями, если собрана flask build-assets (см. assets.py)
+assets = Assets(app)
 
 # ==================== МОДЕЛИ БД ====================
 
@@ -53,7 +99,9 @@ class User(UserMixin, db.Model):
     total_games = db.Column(db.Integer, default=0)
     total_wins = db.Column(db.Integer, default=0)
     total_points = db.Column(db.Integer, default=0)
-    rating = db.Column(db.Integer, default=1000)  # elo-like рейтинг
+    rating = db.Column(db.Integer, default=DEFAULT_RATING)  # elo или glicko-2, см. rating.py
+    rating_rd = db.Column(db.Float, default=DEFAULT_RD)  # отклонение рейтинга (glicko-2)
+    rating_vol = db.Column(db.Float, default=DEFAULT_VOL)  # волатильность (glicko-2)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -61,6 +109,9 @@ class User(UserMixin, db.Model):
 
 class Question(db.Model):
     """вопрос для викторины"""
+    # ключ дублей при импорте (тема + текст); индекс не уникальный - в старых бд дубли уже могут быть
+    __table_args__ = (db.Index('ix_question_topic_text', 'topic', 'question_text'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     topic = db.Column(db.String(50), nullable=False)
     difficulty = db.Column(db.String(20), default='medium')  # easy, medium, hard
@@ -83,10 +134,38 @@ class Question(db.Model):
         }
 
 
+class QuestionStats(db.Model):
+    """накопленная статистика ответов на вопрос (пишется пакетами из questionstats.py)"""
+    # без внешнего ключа: вопросы из встроенного пакета может не быть в этой бд
+    question_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    shown = db.Column(db.Integer, default=0, nullable=False)
+    answered = db.Column(db.Integer, default=0, nullable=False)
+    correct = db.Column(db.Integer, default=0, nullable=False)
+    # сколько раз выбран каждый вариант
+    picks_0 = db.Column(db.Integer, default=0, nullable=False)
+    picks_1 = db.Column(db.Integer, default=0, nullable=False)
+    picks_2 = db.Column(db.Integer, default=0, nullable=False)
+    picks_3 = db.Column(db.Integer, default=0, nullable=False)
+    # время ответа: сумма и гистограмма по корзинам questionstats.TIME_BUCKETS
+    time_total = db.Column(db.Float, default=0, nullable=False)
+    time_b0 = db.Column(db.Integer, default=0, nullable=False)
+    time_b1 = db.Column(db.Integer, default=0, nullable=False)
+    time_b2 = db.Column(db.Integer, default=0, nullable=False)
+    time_b3 = db.Column(db.Integer, default=0, nullable=False)
+    time_b4 = db.Column(db.Integer, default=0, nullable=False)
+    time_b5 = db.Column(db.Integer, default=0, nullable=False)
+    time_b6 = db.Column(db.Integer, default=0, nullable=False)
+    time_b7 = db.Column(db.Integer, default=0, nullable=False)
+    # вопрос признан плохим и больше не выдается
+    retired = db.Column(db.Boolean, default=False, nullable=False)
+
+
 class GameHistory(db.Model):
     """история игр"""
-    id = db.Column(db.Integer, primary_key=True)
-    pin = db.Column(db.String(6), nullable=False)
+    id = db.Column(db.Integer, primary_key=True)  # выдает бд
+    # номер игры из общего счетчика: из него пин и имя журнала событий (см. pins.py)
+    game_id = db.Column(db.BigInteger, unique=True, index=True)
+    pin = db.Column(db.String(6), nullable=False, index=True)
     topic = db.Column(db.String(50), nullable=False)
     mode = db.Column(db.String(20), default='teams')  # teams, ffa
     difficulty = db.Column(db.String(20), default='medium')
@@ -104,8 +183,8 @@ class GameHistory(db.Model):
 class PlayerStats(db.Model):
     """статистика игрока в конкретной игре"""
     id = db.Column(db.Integer, primary_key=True)
-    game_id = db.Column(db.Integer, db.ForeignKey('game_history.id'))
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('game_history.id'), index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
     guest_name = db.Column(db.String(50), nullable=True)  # для гостей
     team = db.Column(db.String(10))  # A, B или null для ffa
     score = db.Column(db.Integer, default=0)
@@ -116,11 +195,45 @@ class PlayerStats(db.Model):
     user = db.relationship('User', backref='game_stats')
 
 
+class UserDailyStats(db.Model):
+    """итоги игрока за день (пополняется в конце каждой игры, переживает архивацию истории)"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    games = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    points = db.Column(db.Integer, default=0, nullable=False)
+    correct = db.Column(db.Integer, default=0, nullable=False)
+    answered = db.Column(db.Integer, default=0, nullable=False)
+    time_total = db.Column(db.Float, default=0, nullable=False)
+
+
+class UserTopicStats(db.Model):
+    """итоги игрока по теме за всё время"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    topic = db.Column(db.String(50), primary_key=True)
+    games = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    points = db.Column(db.Integer, default=0, nullable=False)
+    correct = db.Column(db.Integer, default=0, nullable=False)
+    answered = db.Column(db.Integer, default=0, nullable=False)
+    time_total = db.Column(db.Float, default=0, nullable=False)
+
+
+class Counter(db.Model):
+    """счетчики номеров, общие для всех процессов сервера"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False)  # следующий свободный номер
+
+
+# счетчики сводок (одинаковые у дневных и тематических)
+ROLLUP_COUNTERS = ('games', 'wins', 'points', 'correct', 'answered', 'time_total')
+
+
 # ==================== ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ ====================
 
 # активные игры в памяти (для real-time)
 active_games = {}
-games_lock = threading.Lock()
+games_lock = threading.RLock()
 
 # темы для выбора (без эмодзи)
 TOPICS = [
@@ -136,6 +249,128 @@ TOPICS = [
     'видеоигры'
 ]
 
+# время на ответ (секунды)
+QUESTION_TIME = 20
+
+# сколько вопросов можно заказать в игру (приходит от клиента, задает размер матриц аналитики)
+MAX_QUESTIONS = 50
+
+# строки от клиента: в снапшоте и журнале событий у них поле длины u16, имя еще и в таблицах лобби
+MAX_NAME_LENGTH = 32
+MAX_PASSWORD_LENGTH = 64
+GAME_MODES = ('teams', 'ffa')
+GAME_DIFFICULTIES = ('easy', 'medium', 'hard', 'mixed')
+
+# вопрос клиенты получают заранее и показывают все вместе в назначенный момент:
+# пауза между раундами (видно результат ответа) и запас на переход из лобби на страницу игры перед первым вопросом
+ROUND_PAUSE = 2
+START_DELAY = 3
+# текст вопроса уходит клиентам не раньше чем за столько секунд до показа - раньше его успели бы найти
+QUESTION_LEAD = 2
+
+# журнал снапшотов активных игр (для рестарта без потери комнат)
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', 'game_journal.bin')
+SNAPSHOT_INTERVAL = float(os.environ.get('SNAPSHOT_INTERVAL', '2'))
+game_journal = GameJournal(SNAPSHOT_PATH)
+
+# журнал событий игр (вход, вопросы, ответы, конец) для повтора и аналитики, на диск - порциями
+EVENT_LOG_DIR = os.environ.get('EVENT_LOG_DIR', 'events')
+EVENT_FLUSH_INTERVAL = float(os.environ.get('EVENT_FLUSH_INTERVAL', '1'))
+event_log = EventLog(EVENT_LOG_DIR)
+
+# статистика вопросов: счетчики в памяти, в бд - пакетом раз в QUESTION_STATS_INTERVAL секунд
+QUESTION_STATS_INTERVAL = float(os.environ.get('QUESTION_STATS_INTERVAL', '30'))
+question_stats = questionstats.QuestionStatsAggregator()
+
+# архив истории: игры старше HISTORY_RETENTION_DAYS переезжают в отдельную бд, сводки остаются
+ARCHIVE_INTERVAL = float(os.environ.get('ARCHIVE_INTERVAL', str(6 * 3600)))
+history_archive = Archive(
+    os.environ.get('ARCHIVE_DATABASE_URL', f"sqlite:///{os.path.join(app.instance_path, DEFAULT_ARCHIVE_FILE)}"),
+    GameHistory.__table__, PlayerStats.__table__
+)
+
+# подбор соперников: очереди по рейтингу, комнаты создаются и стартуют сами
+MATCH_ROOM_SIZE = int(os.environ.get('MATCH_ROOM_SIZE', '8'))
+MATCH_TIMEOUT = float(os.environ.get('MATCH_TIMEOUT', '30'))
+MATCH_TICK = float(os.environ.get('MATCH_TICK', '1'))
+MATCH_QUESTIONS = 10
+# сколько ждем, пока подобранные игроки дойдут до лобби
+MATCH_START_TIMEOUT = 15
+MATCH_DIFFICULTIES = ('easy', 'medium', 'hard')
+MATCH_MODES = ('teams', 'ffa')
+matchmaker = Matchmaker(room_size=MATCH_ROOM_SIZE, timeout=MATCH_TIMEOUT)
+
+# зрители: снимок игры раз в SPECTATOR_INTERVAL секунд в отдельный канал, в состоянии игры их нет
+SPECTATOR_INTERVAL = float(os.environ.get('SPECTATOR_INTERVAL', '1'))
+spectator_feed = SpectatorFeed()
+
+# пинги игрокам для оценки задержки сети: скорость ответа считаем без доставки
+CLOCK_SYNC_INTERVAL = float(os.environ.get('CLOCK_SYNC_INTERVAL', '5'))
+clock_sync = ClockSync()
+
+# профайлер по запросу (/api/admin/profile), доступ по токену; без токена эндпоинт закрыт
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+profiler = SamplingProfiler()
+
+# номера игр и пин-коды: блоки номеров из счетчика в бд + перестановка по ключу;
+# счетчик общий для процессов и продолжается после последней игры (см. init_db)
+GAME_COUNTER = 'game'
+
+
+def reserve_game_ids(count):
+    with app.app_context():
+        return database.reserve_block(db.engine, Counter.__table__, GAME_COUNTER, count)
+
+
+pin_allocator = PinAllocator(os.environ.get('PIN_KEY', app.config['SECRET_KEY']), reserve_game_ids)
+
+# экспорт результатов: кэш готовых файлов завершенных игр и размер порции при выгрузке периода
+export_cache = ExportCache(int(os.environ.get('EXPORT_CACHE_BYTES', str(32 * 1024 * 1024))))
+EXPORT_CHUNK_ROWS = 1000
+
+# кэш страниц и api: lru в процессе + общий кэш flask-caching, если задан CACHE_TYPE (например RedisCache)
+if os.environ.get('CACHE_TYPE'):
+    from flask_caching import Cache
+    app.config['CACHE_TYPE'] = os.environ['CACHE_TYPE']
+    app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', '')
+    app.config['CACHE_KEY_PREFIX'] = 'quizbattle:'
+    shared_cache = Cache(app)
+else:
+    shared_cache = None
+page_cache = TwoTierCache(shared_cache, max_items=int(os.environ.get('PAGE_CACHE_ITEMS', '1024')))
+
+# уборка брошенных игр
+MAX_ACTIVE_GAMES = int(os.environ.get('MAX_ACTIVE_GAMES', '5000'))
+REAPER_INTERVAL = float(os.environ.get('REAPER_INTERVAL', '30'))
+
+# встроенный пакет вопросов: игра без бд и без API (собирается generate_questions.py pack)
+QUESTION_PACK_PATH = os.environ.get(
+    'QUESTION_PACK', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.qbp')
+)
+question_pack = QuestionPack.open_optional(QUESTION_PACK_PATH)
+
+# хеширование паролей в пуле процессов (см. passwords.py)
+password_hasher = passwords.PasswordHasher()
+
+# лимиты частоты socket.io событий: на соединение и на ip (за одним ip может сидеть целый класс)
+SOCKET_EVENT_BUDGETS = {
+    'connect': Budget(rate=1, burst=5, ip_rate=20, ip_burst=200),
+    'disconnect': None,
+    'create_game': Budget(rate=0.2, burst=3, ip_rate=2, ip_burst=20),
+    'join_game': Budget(rate=1, burst=5, ip_rate=20, ip_burst=200),
+    'get_roster': Budget(rate=2, burst=6, ip_rate=None, ip_burst=None),
+    'resume_game': Budget(rate=0.5, burst=3, ip_rate=20, ip_burst=200),
+    'start_game': Budget(rate=0.5, burst=2, ip_rate=None, ip_burst=None),
+    'get_question': Budget(rate=1, burst=4, ip_rate=None, ip_burst=None),
+    'submit_answer': Budget(rate=2, burst=4, ip_rate=None, ip_burst=None),
+    'queue_match': Budget(rate=0.5, burst=3, ip_rate=10, ip_burst=50),
+    # зрители трансляции часто сидят за одним ip
+    'watch_game': Budget(rate=0.5, burst=3, ip_rate=50, ip_burst=1000),
+}
+# для событий, которых нет в таблице (админские и новые)
+SOCKET_DEFAULT_BUDGET = Budget(rate=1, burst=5, ip_rate=None, ip_burst=None)
+rate_limiter = RateLimiter(SOCKET_EVENT_BUDGETS, SOCKET_DEFAULT_BUDGET)
+
 # конфигурация для API Кими
 KIMI_API_KEY = os.environ.get('KIMI_API_KEY', '')
 KIMI_API_URL = os.environ.get('KIMI_API_URL', 'https://api.moonshot.cn/v1/chat/completions')
@@ -149,12 +384,12 @@ def load_user(user_id):
 
 
 def generate_pin():
-    """генерация уникального 6-значного пин-кода"""
+    """номер новой игры и её уникальный 6-значный пин-код"""
     while True:
-        pin = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        with games_lock:
-            if pin not in active_games:
-                return pin
+        game_id, pin = pin_allocator.allocate()
+        # пины из счетчика не повторяются; проверка только против комнат из старых снапшотов
+        if pin not in active_games:
+            return game_id, pin
 
 
 def generate_questions_via_kimi(topic, difficulty, count=35):
@@ -163,6 +398,8 @@ def generate_questions_via_kimi(topic, difficulty, count=35):
         print("[!] нет API ключа")
         return None
     
+    import requests
+    
     # составляем промпт для API
     prompt = f"""Создай {count} вопросов для викторины на тему "{topic}" с уровнем сложности "{difficulty}".
 
@@ -245,15 +482,151 @@ def save_questions_to_db(topic, questions, difficulty='medium'):
     db.session.commit()
 
 
+# вопросов в одной транзакции импорта
+IMPORT_CHUNK = 50000
+
+
+def import_questions(f, fmt, topics=TOPICS, chunk_size=IMPORT_CHUNK, on_error=None):
+    """потоковый импорт из открытого файла: порции по chunk_size вставляются одной транзакцией,
+    вопросы, которые уже есть (та же тема и текст), пропускаются; возвращает (строк, ошибок, вставлено)"""
+    total = errors = inserted = 0
+    # (тема, текст) -> строка: дубли внутри порции отсекаем до бд, первая строка остается
+    chunk = {}
+    constants = {'created_at': datetime.utcnow(), 'times_used': 0}
+    
+    def flush():
+        nonlocal inserted
+        with db.engine.begin() as conn:
+            inserted += database.insert_missing(conn, Question.__table__, QUESTION_COLUMNS, list(chunk.values()),
+                                                ('topic', 'question_text'), constants)
+        chunk.clear()
+    
+    for line_no, row, error in read_questions(f, fmt, topics):
+        total += 1
+        if error:
+            errors += 1
+            if on_error:
+                on_error(line_no, error)
+            continue
+        key = (row[0], row[2])
+        if key not in chunk:
+            chunk[key] = row
+            if len(chunk) >= chunk_size:
+                flush()
+    if chunk:
+        flush()
+    return total, errors, inserted
+
+
+def export_questions(f, fmt, topic=None, difficulty=None, chunk_size=IMPORT_CHUNK):
+    """потоковый экспорт в открытый файл (таблица читается порциями по chunk_size); возвращает число вопросов"""
+    query = db.select(*(Question.__table__.c[name] for name in QUESTION_COLUMNS)).order_by(Question.id)
+    if topic:
+        query = query.where(Question.topic == topic)
+    if difficulty:
+        query = query.where(Question.difficulty == difficulty)
+    with db.engine.connect() as conn:
+        return write_questions(f, fmt, conn.execution_options(yield_per=chunk_size).execute(query))
+
+
 def get_random_questions(topic, count=10, difficulty=None):
-    """получение случайных вопросов из бд"""
+    """получение случайных вопросов из бд, недостающие добираем из встроенного пакета"""
     query = Question.query.filter_by(topic=topic)
+    # вопросы, списанные по статистике ответов
+    query = query.filter(Question.id.not_in(db.select(QuestionStats.question_id).where(QuestionStats.retired)))
     
     if difficulty and difficulty != 'mixed':
         query = query.filter_by(difficulty=difficulty)
     
-    questions = query.order_by(func.random()).limit(count).all()
-    return [q.to_dict() for q in questions]
+    questions = [q.to_dict() for q in query.order_by(func.random()).limit(count).all()]
+    
+    if len(questions) < count and question_pack is not None:
+        # у вопросов пакета свои (отрицательные) id: списанные берем из статистики, дубли с бд отсекаем по тексту
+        retired = db.session.execute(
+            db.select(QuestionStats.question_id).where(QuestionStats.retired, QuestionStats.question_id < 0)
+        ).scalars()
+        questions += question_pack.sample(topic, count - len(questions), difficulty, exclude=set(retired),
+                                          texts={q['question'] for q in questions})
+    return questions
+
+
+# ==================== ДОСТУП К ДАННЫМ ====================
+
+# сколько игр показываем на одной странице профиля
+PROFILE_PAGE_SIZE = 20
+
+
+def get_profile_history(user_id, before_id=None, limit=PROFILE_PAGE_SIZE):
+    """страница истории игр пользователя (keyset по id), возвращает (строки, курсор следующей страницы)"""
+    query = (
+        db.select(PlayerStats)
+        .where(PlayerStats.user_id == user_id)
+        .options(joinedload(PlayerStats.game))
+        .order_by(PlayerStats.id.desc())
+        .limit(limit + 1)
+    )
+    if before_id:
+        query = query.where(PlayerStats.id < before_id)
+    
+    rows = db.session.execute(query).scalars().all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def get_profile_summary(user_id, days=30):
+    """сводки для профиля: по темам и за последние days дней (размер не зависит от числа игр)"""
+    topics = db.session.execute(
+        db.select(UserTopicStats).where(UserTopicStats.user_id == user_id).order_by(UserTopicStats.games.desc())
+    ).scalars().all()
+    
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    recent = db.session.execute(
+        db.select(*(func.coalesce(func.sum(getattr(UserDailyStats, name)), 0).label(name) for name in ROLLUP_COUNTERS))
+        .where(UserDailyStats.user_id == user_id, UserDailyStats.day >= since)
+    ).one()._asdict()
+    
+    total = {name: sum(getattr(t, name) for t in topics) for name in ROLLUP_COUNTERS}
+    for summary in (total, recent):
+        summary['accuracy'] = summary['correct'] / summary['answered'] if summary['answered'] else 0
+        summary['avg_time'] = summary['time_total'] / summary['answered'] if summary['answered'] else 0
+    return topics, total, recent
+
+
+def get_user_rank(rating):
+    """место в рейтинге"""
+    return db.session.execute(
+        db.select(func.count(User.id)).where(User.rating > rating)
+    ).scalar() + 1
+
+
+def get_top_players(limit=100):
+    """таблица рейтинга: только те, кто хоть раз играл (кэшируется до следующей завершенной игры)"""
+    rows = page_cache.get('leaderboard', f'top:{limit}')
+    if rows is None:
+        result = db.session.execute(
+            db.select(User.id, User.username, User.rating, User.total_wins, User.total_games)
+            .where(User.total_games > 0).order_by(User.rating.desc()).limit(limit)
+        )
+        rows = [row._asdict() for row in result]
+        page_cache.set('leaderboard', f'top:{limit}', rows)
+    return rows
+
+
+def get_latest_game(pin):
+    """последняя игра с этим пин-кодом (пины повторяются, номер игры - нет)"""
+    return db.session.execute(
+        db.select(GameHistory).where(GameHistory.pin == pin).order_by(GameHistory.game_id.desc()).limit(1)
+    ).scalar()
+
+
+def get_game_players(game_id):
+    """статистика игроков вместе с пользователями одним запросом"""
+    return db.session.execute(
+        db.select(PlayerStats)
+        .where(PlayerStats.game_id == game_id)
+        .order_by(PlayerStats.id)
+        .options(joinedload(PlayerStats.user))
+    ).scalars().all()
 
 
 # ==================== КЛАСС ИГРЫ ====================
@@ -261,8 +634,8 @@ def get_random_questions(topic, count=10, difficulty=None):
 class GameSession:
     """класс управления игровой сессией"""
     
-    def __init__(self, creator_id, topic, mode='teams', difficulty='medium', questions_count=10, has_password=False, password=None):
-        self.pin = generate_pin()
+    def __init__(self, creator_id, topic, mode='teams', difficulty='medium', questions_count=10, has_password=False, password=None, large=False):
+        self.game_id, self.pin = generate_pin()
         self.creator_id = creator_id
         self.topic = topic
         self.mode = mode
@@ -273,6 +646,7 @@ class GameSession:
         
         self.status = 'waiting'
         self.created_at = time.time()
+        self.last_activity = self.created_at
         
         # игроки
         self.players = {}  # sid -> {user_id, name, team, score, correct, wrong, times}
@@ -290,8 +664,34 @@ class GameSession:
         # бонусы
         self.bonus_enabled = True
         
+        # режим большой комнаты: агрегаты вместо рассылки на каждый ответ
+        self.large = large
+        self.answer_buffer = AnswerBuffer()
+        
+        # матрицы ответов для итогов раунда и игры; столбцы под вопросы - после load_questions
+        self.analytics = GameAnalytics(questions=0)
+        
+        # комната из подбора: стартует сама, когда в лобби соберется столько игроков
+        self.auto_start = 0
+    
+    def touch(self):
+        """отметка активности (для уборки брошенных игр)"""
+        self.last_activity = time.time()
+    
+    def log_event(self, kind, *fields, now=None):
+        """событие в журнал игры (только буфер в памяти, см. eventlog.py)"""
+        if not event_log.record(self.game_id, self.created_at, kind, *fields, now=now):
+            metrics.inc('events_dropped')
+    
+    def log_question(self, now=None):
+        """показ текущего вопроса: id вопроса и правильный ответ, чтобы повтор не зависел от бд"""
+        q = self.questions[self.current_question_idx]
+        team = self.current_team if self.mode == 'teams' else None
+        self.log_event(EVENT_QUESTION, self.current_question_idx, q.get('id'), q['correct'], team_code(team), now=now)
+        
     def add_player(self, sid, user_id=None, guest_name=None):
         """добавление игрока в игру"""
+        self.touch()
         if self.mode == 'teams':
             # балансировка команд
             team_a = len(self.teams['A'])
@@ -302,8 +702,10 @@ class GameSession:
             team = None
             
         self.players[sid] = {
+            'token': uuid.uuid4().hex,  # для возврата в игру после реконнекта/рестарта
             'user_id': user_id,
-            'name': guest_name or (User.query.get(user_id).username if user_id else 'игрок'),
+            # имя резолвит вызывающий код до взятия лока, здесь в бд не ходим
+            'name': guest_name or 'игрок',
             'team': team,
             'score': 0,
             'correct': 0,
@@ -311,16 +713,44 @@ class GameSession:
             'response_times': [],
             'answered_current': False
         }
+        self.analytics.add_player(sid)
+        
+        # комната разрослась - переключаемся в режим большой комнаты насовсем
+        if not self.large and len(self.players) >= LARGE_ROOM_THRESHOLD:
+            self.large = True
         
         return team
     
+    def resume_player(self, token, new_sid):
+        """перепривязка игрока к новому sid по токену, возвращает данные игрока"""
+        for old_sid, p in self.players.items():
+            if p.get('token') == token:
+                break
+        else:
+            return None
+        
+        self.touch()
+        if old_sid != new_sid:
+            # пересобираем словарь чтобы сохранить порядок игроков
+            self.players = {(new_sid if sid == old_sid else sid): data for sid, data in self.players.items()}
+            if p['team']:
+                team = self.teams[p['team']]
+                team[team.index(old_sid)] = new_sid
+            if old_sid in self.answered_this_round:
+                self.answered_this_round.discard(old_sid)
+                self.answered_this_round.add(new_sid)
+            self.analytics.rename(old_sid, new_sid)
+        return p
+    
     def remove_player(self, sid):
         """удаление игрока"""
+        self.touch()
         if sid in self.players:
             team = self.players[sid]['team']
             if team and sid in self.teams[team]:
                 self.teams[team].remove(sid)
             del self.players[sid]
+            self.analytics.remove_player(sid)
     
     def load_questions(self):
         """загрузка вопросов из бд или генерация через API"""
@@ -334,20 +764,64 @@ class GameSession:
                 questions = get_random_questions(self.topic, self.questions_count, self.difficulty)
         
         self.questions = questions[:self.questions_count]
+        self.analytics.reserve(len(self.questions))
     
-    def get_current_question(self):
-        """получение текущего вопроса"""
-        if 0 <= self.current_question_idx < len(self.questions):
-            q = self.questions[self.current_question_idx]
+    def public_question(self, idx):
+        """вопрос без правильного ответа - такой можно отдать клиенту заранее"""
+        if 0 <= idx < len(self.questions):
+            q = self.questions[idx]
             return {
                 'question': q['question'],
                 'options': q['options'],
-                'question_number': self.current_question_idx + 1,
-                'total': len(self.questions),
-                'current_team': self.current_team if self.mode == 'teams' else None
+                'question_number': idx + 1,
+                'total': len(self.questions)
             }
         return None
     
+    def get_current_question(self):
+        """получение текущего вопроса"""
+        q = self.public_question(self.current_question_idx)
+        if q:
+            q['current_team'] = self.current_team if self.mode == 'teams' else None
+        return q
+    
+    def begin_round(self, delay):
+        """раунд текущего вопроса: показ у всех через delay секунд, время ответа считается от показа"""
+        now = time.time()
+        self.question_start_time = now + delay
+        self.touch()
+        self.log_question(now=self.question_start_time)
+        return self.round_info(now)
+    
+    def round_info(self, now=None):
+        """расписание раунда по часам сервера; сам вопрос - только если до показа не больше QUESTION_LEAD
+        (иначе клиент запросит его в question_at)"""
+        now = time.time() if now is None else now
+        info = {
+            'question_number': self.current_question_idx + 1,
+            'current_team': self.current_team if self.mode == 'teams' else None,
+            'reveal_at': self.question_start_time,
+            'question_at': self.question_start_time - QUESTION_LEAD,
+            'duration': QUESTION_TIME,
+            'server_time': now
+        }
+        # округление до мс: reveal_at = now + ROUND_PAUSE, а разность float может выйти чуть больше паузы
+        if round(self.question_start_time - now, 3) <= QUESTION_LEAD:
+            info.update(self.public_question(self.current_question_idx) or {})
+        return info
+    
+    def revealed(self, now=None):
+        """текущий вопрос уже показан игрокам"""
+        now = time.time() if now is None else now
+        return self.question_start_time is not None and now >= self.question_start_time
+    
+    def time_left(self, now=None):
+        """секунд до конца раунда (до показа вопроса - полное время)"""
+        if self.status != 'playing' or self.question_start_time is None:
+            return None
+        now = time.time() if now is None else now
+        return max(0, int(QUESTION_TIME - max(0.0, now - self.question_start_time)))
+    
     def check_answer(self, answer_idx):
         """проверка ответа"""
         if 0 <= self.current_question_idx < len(self.questions):
@@ -376,8 +850,12 @@ class GameSession:
     
     def next_question(self):
         """переход к следующему вопросу"""
+        self.touch()
+        if 0 <= self.current_question_idx < len(self.questions):
+            question_stats.shown(self.questions[self.current_question_idx].get('id'))
         self.current_question_idx += 1
         self.answered_this_round.clear()
+        self.answer_buffer.reset()
         
         # сбрасываем флаги ответов
         for p in self.players.values():
@@ -404,28 +882,184 @@ class GameSession:
             )
             return [{'sid': sid, **data} for sid, data in sorted_players]
     
-    def get_stats(self):
+    def get_stats(self, summary=None):
         """детальная статистика для админа"""
+        sids = list(self.players)
+        if summary is None:
+            summary = self.analytics.player_summary(sids)
+        
         stats = []
-        for sid, p in self.players.items():
-            avg_time = sum(p['response_times']) / len(p['response_times']) if p['response_times'] else 0
+        for i, sid in enumerate(sids):
+            p = self.players[sid]
             stats.append({
                 'name': p['name'],
                 'team': p['team'],
                 'score': p['score'],
                 'correct': p['correct'],
                 'wrong': p['wrong'],
-                'avg_time': round(avg_time, 2)
+                'avg_time': round(float(summary['avg_time'][i]), 2),
+                'p90_time': round(float(summary['p90_time'][i]), 2),
+                'best_streak': int(summary['best_streak'][i])
             })
         return sorted(stats, key=lambda x: x['score'], reverse=True)
+    
+    def round_results(self):
+        """итоги раунда для большой комнаты: общий payload и место каждого игрока"""
+        correct = None
+        if 0 <= self.current_question_idx < len(self.questions):
+            correct = self.questions[self.current_question_idx]['correct']
+        
+        payload = {
+            'distribution': self.answer_buffer.distribution(),
+            'times': self.analytics.round_summary(self.current_question_idx),
+            'correct': correct,
+            'top': top_players(self.players),
+            'total_players': len(self.players)
+        }
+        if self.mode == 'teams':
+            payload['teams'] = self.get_leaderboard()
+        
+        return payload, player_ranks(self.players)
+    
+    def roster_update(self):
+        """данные о составе для рассылки при входе/выходе игрока"""
+        if not self.large:
+            return {'players': get_players_list(self)}
+        # в большой комнате список целиком не шлем, только размеры
+        return {
+            'large': True,
+            'count': len(self.players),
+            'team_sizes': {team: len(sids) for team, sids in self.teams.items()}
+        }
+    
+    def spectator_fingerprint(self):
+        """что меняет картинку у зрителей; пока отпечаток тот же, снимок не пересобирается"""
+        return (self.status, self.current_question_idx, self.question_start_time, self.revealed(),
+                self.answer_buffer.answered, len(self.players))
+    
+    def spectator_state(self):
+        """снимок для зрителей: вопрос без правильного ответа, распределение ответов и таблица"""
+        # предзагруженный вопрос зрителям до показа не отдаем, иначе игрок подсмотрит его через /watch
+        shown = self.status == 'playing' and self.revealed()
+        state = {
+            'pin': self.pin,
+            'status': self.status,
+            'mode': self.mode,
+            'topic': self.topic,
+            'question': self.get_current_question() if shown else None,
+            'time_left': self.time_left(),
+            'distribution': self.answer_buffer.distribution(),
+            'top': top_players(self.players),
+            'total_players': len(self.players)
+        }
+        if self.mode == 'teams':
+            state['teams'] = self.get_leaderboard()
+        return state
+    
+    def snapshot_state(self):
+        """состояние игры для снапшота
+        
+        только то, что меняют события игры: остаток времени раунда тикает сам и сделал бы новой каждую запись,
+        поэтому храним время показа вопроса (по часам сервера)"""
+        return {
+            'pin': self.pin,
+            'game_id': self.game_id,
+            'creator_id': self.creator_id,
+            'topic': self.topic,
+            'mode': self.mode,
+            'difficulty': self.difficulty,
+            'questions_count': self.questions_count,
+            'has_password': self.has_password,
+            'password': self.password,
+            'status': self.status,
+            'created_at': self.created_at,
+            'current_question_idx': self.current_question_idx,
+            'current_team': self.current_team,
+            'bonus_enabled': self.bonus_enabled,
+            'large': self.large,
+            'auto_start': self.auto_start,
+            'question_start_time': self.question_start_time if self.status == 'playing' else None,
+            'questions': self.questions,
+            'players': self.players,
+            'analytics': {
+                'rows': self.analytics.rows_to_sids(),
+                'data': self.analytics.to_bytes()
+            }
+        }
+    
+    @classmethod
+    def from_snapshot_state(cls, state):
+        """восстановление игры из снапшота без генерации нового пин-кода"""
+        game = cls.__new__(cls)
+        game.pin = state['pin']
+        game.game_id = state['game_id']
+        game.creator_id = state['creator_id']
+        game.topic = state['topic']
+        game.mode = state['mode']
+        game.difficulty = state['difficulty']
+        game.questions_count = state['questions_count']
+        game.has_password = state['has_password']
+        game.password = state['password']
+        game.status = state['status']
+        game.created_at = state['created_at']
+        # отсчет простоя начинаем заново, иначе после долгого даунтайма уберем всё сразу
+        game.last_activity = time.time()
+        game.questions = state['questions']
+        game.current_question_idx = state['current_question_idx']
+        game.current_team = state['current_team']
+        game.bonus_enabled = state['bonus_enabled']
+        game.large = state['large']
+        game.answer_buffer = AnswerBuffer()
+        game.auto_start = state['auto_start']
+        
+        if state.get('analytics'):
+            game.analytics = GameAnalytics.from_bytes(state['analytics']['data'], state['analytics']['rows'])
+        else:
+            game.analytics = GameAnalytics(questions=len(game.questions))
+            for sid in state['players']:
+                game.analytics.add_player(sid)
+        
+        game.players = state['players']
+        game.teams = {'A': [], 'B': []}
+        game.answered_this_round = set()
+        for sid, p in game.players.items():
+            if p['team']:
+                game.teams[p['team']].append(sid)
+            if p['answered_current']:
+                game.answered_this_round.add(sid)
+        
+        game.question_start_time = state['question_start_time']
+        
+        return game
 
 
 # ==================== РОУТЫ ====================
 
+@app.context_processor
+def inject_socket_client():
+    """шаблонам нужен тот же транспорт и формат пакетов, что у сервера"""
+    return {'socket_client': socket_client}
+
+
+def cached_page(tag, name, render):
+    """страница из кэша с etag; шапка зависит от пользователя, поэтому копия на каждого"""
+    # флеш-сообщение показывается один раз - такую страницу не кэшируем
+    if session.get('_flashes'):
+        return render()
+    
+    key = f'{name}:{current_user.get_id() or "anon"}'
+    cached = page_cache.get(tag, key)
+    if cached is None:
+        body = render()
+        cached = (body, make_etag(body))
+        page_cache.set(tag, key, cached)
+    return conditional_response(app, cached[0], cached[1], private=True)
+
+
 @app.route('/')
 def index():
     """главная страница"""
-    return render_template('index.html', topics=TOPICS)
+    return cached_page('static', 'index', lambda: render_template('index.html', topics=TOPICS))
 
 
 @app.route('/register', methods=['GET', 'POST'])
@@ -454,7 +1088,7 @@ def register():
         user = User(
             username=username,
             email=email,
-            password_hash=bcrypt.generate_password_hash(password).decode('utf-8')
+            password_hash=password_hasher.hash(password)
         )
         db.session.add(user)
         db.session.commit()
@@ -477,7 +1111,14 @@ def login():
         
         user = User.query.filter_by(username=username).first()
         
-        if user and bcrypt.check_password_hash(user.password_hash, password):
+        if user and password_hasher.check(password, user.password_hash):
+            # стоимость bcrypt поменялась - пересчитываем хеш, пока знаем пароль
+            if password_hasher.needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = password_hasher.hash(password)
+                    db.session.commit()
+                except passwords.HasherBusy:
+                    pass
             login_user(user, remember=True)
             return redirect(url_for('index'))
         
@@ -486,6 +1127,13 @@ def login():
     return render_template('login.html')
 
 
+@app.errorhandler(passwords.HasherBusy)
+def handle_hasher_busy(e):
+    """наплыв входов: просим повторить чуть позже вместо очереди без конца"""
+    metrics.inc('password_rejected')
+    return 'сервер перегружен, повторите через пару секунд', 503, {'Retry-After': str(e.retry_after)}
+
+
 @app.route('/logout')
 @login_required
 def logout():
@@ -498,28 +1146,32 @@ def logout():
 @login_required
 def profile():
     """профиль пользователя"""
-    # статистика игр
-    stats = PlayerStats.query.filter_by(user_id=current_user.id).all()
+    # статистика игр постранично, игра подгружается тем же запросом
+    before_id = request.args.get('before', type=int)
+    stats, next_cursor = get_profile_history(current_user.id, before_id)
+    
+    # итоги из сводок, а не пересчетом всей истории
+    topics, total, recent = get_profile_summary(current_user.id)
     
     # позиция в рейтинге
-    rank = User.query.filter(User.rating > current_user.rating).count() + 1
+    rank = get_user_rank(current_user.rating)
     
-    return render_template('profile.html', stats=stats, rank=rank)
+    return render_template('profile.html', stats=stats, rank=rank, next_cursor=next_cursor,
+                           topics=topics, total=total, recent=recent)
 
 
 @app.route('/rating')
 def rating():
     """таблица рейтинга - показываем только тех кто хоть раз играл"""
     # показываем только тех кто хотя бы раз играл
-    users = User.query.filter(User.total_games > 0).order_by(User.rating.desc()).limit(100).all()
-    return render_template('rating.html', users=users)
+    return cached_page('leaderboard', 'rating', lambda: render_template('rating.html', users=get_top_players(100)))
 
 
 @app.route('/join', methods=['POST'])
 def join():
     """присоединение к игре по POST"""
     pin = request.form.get('pin', '').upper().strip()
-    guest_name = request.form.get('guest_name', '').strip()
+    guest_name = client_text(request.form.get('guest_name'), MAX_NAME_LENGTH)
     password = request.form.get('password', '')
     
     if not pin or not guest_name:
@@ -566,32 +1218,74 @@ def game():
     return render_template('game.html', pin=pin)
 
 
+@app.route('/watch')
+def watch():
+    """трансляция игры для зрителей"""
+    pin = request.args.get('pin', '').upper()
+    if not pin:
+        return redirect(url_for('index'))
+    return render_template('watch.html', pin=pin)
+
+
 # ==================== SOCKET.IO ====================
 
-@socketio.on('connect')
-def handle_connect():
+def client_text(value, limit):
+    """строка от клиента: не строка - пустая, пробелы по краям убраны, не длиннее limit;
+    одиночные суррогаты (json их пропускает) выбрасываем - они не пишутся ни в журнал, ни в бд"""
+    if not isinstance(value, str):
+        return ''
+    return value.encode('utf-8', 'ignore').decode('utf-8').strip()[:limit]
+
+
+def on_event(event):
+    """socketio.on с лимитом частоты: лишние события отбрасываются до обработчика"""
+    def decorator(handler):
+        @wraps(handler)
+        def limited(*args):
+            if not rate_limiter.allow(event, request.sid, request.remote_addr):
+                metrics.inc(f'throttled_{event}')
+                if event == 'connect':
+                    return False
+                emit('throttled', {'event': event})
+                return None
+            if profiler.active:
+                pin = args[0].get('pin') if args and isinstance(args[0], dict) else None
+                with profiler.context(event, pin):
+                    return handler(*args)
+            return handler(*args)
+        return socketio.on(event)(limited)
+    return decorator
+
+
+@on_event('connect')
+def handle_connect(auth=None):
     """подключение клиента"""
     # просто коннект, ничего интересного
     pass
 
 
-@socketio.on('disconnect')
+@on_event('disconnect')
 def handle_disconnect():
     """отключение клиента"""
+    rate_limiter.forget(request.sid)
+    matchmaker.cancel(request.sid)
+    clock_sync.forget(request.sid)
     with games_lock:
         for pin, game in list(active_games.items()):
             if request.sid in game.players:
+                game.log_event(EVENT_LEAVE, game.analytics.slots[request.sid])
                 game.remove_player(request.sid)
                 
                 # уведомляем остальных
                 emit('player_left', {
                     'name': game.players.get(request.sid, {}).get('name', 'игрок'),
-                    'players': get_players_list(game)
+                    **game.roster_update()
                 }, room=pin)
                 
                 # если не осталось игроков - удаляем игру
                 if len(game.players) == 0:
                     del active_games[pin]
+                    event_log.finish(game.game_id)
                 break
 
 
@@ -607,15 +1301,37 @@ def get_players_list(game):
     return result
 
 
-@socketio.on('create_game')
+@on_event('create_game')
 def handle_create_game(data):
     """создание новой игры"""
     topic = data.get('topic')
     mode = data.get('mode', 'teams')  # teams или ffa
     difficulty = data.get('difficulty', 'medium')
-    questions_count = int(data.get('questions_count', 10))
+    try:
+        questions_count = int(data.get('questions_count', 10))
+    except (TypeError, ValueError):
+        questions_count = 0
     has_password = data.get('has_password', False)
     password = data.get('password')
+    large = bool(data.get('large_room', False))
+    
+    if topic not in TOPICS or mode not in GAME_MODES or difficulty not in GAME_DIFFICULTIES:
+        emit('error', {'message': 'неверные параметры игры'})
+        return
+    if not 1 <= questions_count <= MAX_QUESTIONS:
+        emit('error', {'message': f'количество вопросов - от 1 до {MAX_QUESTIONS}'})
+        return
+    if password is not None and (not isinstance(password, str) or len(password) > MAX_PASSWORD_LENGTH):
+        emit('error', {'message': f'пароль - не длиннее {MAX_PASSWORD_LENGTH} символов'})
+        return
+    
+    # лимит живых комнат: сначала пробуем освободить место уборкой
+    if len(active_games) >= MAX_ACTIVE_GAMES:
+        reap_games()
+        if len(active_games) >= MAX_ACTIVE_GAMES:
+            metrics.inc('games_rejected_full')
+            emit('error', {'message': 'сервер переполнен, попробуйте позже'})
+            return
     
     # создаем сессию
     game = GameSession(
@@ -625,9 +1341,12 @@ def handle_create_game(data):
         difficulty=difficulty,
         questions_count=questions_count,
         has_password=has_password,
-        password=password
+        password=password,
+        large=large
     )
     
+    game.log_event(EVENT_CREATE, game.creator_id, questions_count, int(large), game.pin, topic, mode, difficulty)
+    
     with games_lock:
         active_games[game.pin] = game
     
@@ -642,11 +1361,11 @@ def handle_create_game(data):
     })
 
 
-@socketio.on('join_game')
+@on_event('join_game')
 def handle_join_game(data):
     """присоединение к игре"""
-    pin = data.get('pin', '').upper().strip()
-    guest_name = data.get('guest_name', '').strip()
+    pin = client_text(data.get('pin'), 16).upper()
+    guest_name = client_text(data.get('guest_name'), MAX_NAME_LENGTH)
     password = data.get('password')
     
     with games_lock:
@@ -667,9 +1386,10 @@ def handle_join_game(data):
         
         # добавляем игрока
         user_id = current_user.id if current_user.is_authenticated else None
-        name = guest_name or (current_user.username if current_user.is_authenticated else 'игрок')
+        name = guest_name or (current_user.username[:MAX_NAME_LENGTH] if current_user.is_authenticated else 'игрок')
         
         team = game.add_player(request.sid, user_id, name)
+        game.log_event(EVENT_JOIN, game.analytics.slots[request.sid], user_id, team_code(team), name)
     
     join_room(pin)
     
@@ -677,17 +1397,79 @@ def handle_join_game(data):
         'pin': pin,
         'name': name,
         'team': team,
-        'mode': game.mode
+        'mode': game.mode,
+        'match': bool(game.auto_start),
+        'token': game.players[request.sid]['token']
     })
     
     emit('player_joined', {
         'name': name,
         'team': team,
-        'players': get_players_list(game)
+        **game.roster_update()
     }, room=pin)
+    
+    # комната из подбора: все дошли до лобби - стартуем, не дожидаясь таймера
+    if game.auto_start and len(game.players) >= game.auto_start:
+        start_game(pin)
 
 
-@socketio.on('start_game')
+@on_event('get_roster')
+def handle_get_roster(data):
+    """страница списка игроков (для большой комнаты список отдается частями)"""
+    pin = client_text(data.get('pin'), 16).upper()
+    team = data.get('team') if data.get('team') in ('A', 'B') else None
+    # номер страницы от клиента: мусор - первая страница, за пределы списка roster_shard не выпустит
+    try:
+        page = int(data.get('page', 0))
+    except (TypeError, ValueError):
+        page = 0
+    
+    with games_lock:
+        if pin not in active_games:
+            return
+        
+        game = active_games[pin]
+        sids = game.teams[team] if team in game.teams else list(game.players)
+        shard = roster_shard(game.players, sids, page)
+    
+    emit('roster', {'team': team, **shard})
+
+
+@on_event('resume_game')
+def handle_resume_game(data):
+    """возврат игрока в игру по токену (после реконнекта или рестарта сервера)"""
+    pin = client_text(data.get('pin'), 16).upper()
+    token = client_text(data.get('token'), 64)
+    
+    with games_lock:
+        if pin not in active_games or not token:
+            emit('error', {'message': 'игра не найдена'})
+            return
+        
+        game = active_games[pin]
+        player = game.resume_player(token, request.sid)
+        if not player:
+            emit('error', {'message': 'игрок не найден'})
+            return
+        
+        time_left = game.time_left()
+    
+    join_room(pin)
+    # новое соединение: первый замер задержки до показа вопроса
+    ping_clock(request.sid)
+    
+    emit('resumed', {
+        'pin': pin,
+        'name': player['name'],
+        'team': player['team'],
+        'mode': game.mode,
+        'status': game.status,
+        'score': player['score'],
+        'time_left': time_left
+    })
+
+
+@on_event('start_game')
 def handle_start_game(data):
     """начало игры"""
     pin = data.get('pin')
@@ -698,6 +1480,12 @@ def handle_start_game(data):
         
         game = active_games[pin]
         
+        # комнату подбора стартует сервер (все дошли до лобби или вышел срок): создателя у нее нет,
+        # а по user_id любой гость совпал бы с creator_id=None
+        if game.auto_start:
+            emit('error', {'message': 'игра подбора начнется сама'})
+            return
+        
         # проверяем что это создатель
         if request.sid not in game.players or game.players[request.sid].get('user_id') != game.creator_id:
             emit('error', {'message': 'только создатель может начать игру'})
@@ -706,37 +1494,200 @@ def handle_start_game(data):
         if len(game.players) < 2:
             emit('error', {'message': 'нужно минимум 2 игрока'})
             return
-        
-        # загружаем вопросы
-        game.load_questions()
-        
-        if len(game.questions) == 0:
-            emit('error', {'message': 'не удалось загрузить вопросы'})
-            return
-        
-        game.status = 'playing'
     
-    # сохраняем в бд
-    history = GameHistory(
-        pin=pin,
-        topic=game.topic,
-        mode=game.mode,
-        difficulty=game.difficulty,
-        created_by=game.creator_id,
-        questions_count=game.questions_count
-    )
-    db.session.add(history)
-    db.session.commit()
+    error = start_game(pin)
+    if error:
+        emit('error', {'message': error})
+
+
+def start_game(pin):
+    """загрузка вопросов, запись игры в бд и старт; возвращает текст ошибки или None"""
+    # вызывается из обработчиков и из таймера подбора, где контекста приложения нет
+    with app.app_context():
+        with games_lock:
+            game = active_games.get(pin)
+            if game is None or game.status != 'waiting':
+                return 'игра не найдена'
+            
+            # загружаем вопросы
+            game.load_questions()
+            
+            if len(game.questions) == 0:
+                return 'не удалось загрузить вопросы'
+            
+            game.status = 'playing'
+            schedule_round(game, START_DELAY)
+        
+        # сохраняем в бд
+        history = GameHistory(
+            game_id=game.game_id,
+            pin=pin,
+            topic=game.topic,
+            mode=game.mode,
+            difficulty=game.difficulty,
+            created_by=game.creator_id,
+            questions_count=game.questions_count
+        )
+        db.session.add(history)
+        db.session.commit()
     
-    emit('game_started', {
+    socketio.emit('game_started', {
         'mode': game.mode,
         'topic': game.topic
     }, room=pin)
+    return None
+
+
+# ==================== СИНХРОНИЗАЦИЯ ЧАСОВ ====================
+
+def ping_clock(sid):
+    """пинг с временем сервера; ack клиента дает замер времени круга
+    через сервер python-socketio напрямую: на ack не нужен контекст flask"""
+    sent = time.time()
+    socketio.server.emit(
+        'clock_ping', {'ts': sent, 'rtt': clock_sync.rtt(sid)}, to=sid,
+        callback=lambda *_: clock_sync.record(sid, time.time() - sent)
+    )
+
+
+def ping_players():
+    """периодический пинг игроков идущих игр (из лобби на страницу игры клиент уходит с новым sid)"""
+    with games_lock:
+        sids = [sid for game in active_games.values() if game.status == 'playing' for sid in game.players]
+    for sid in sids:
+        ping_clock(sid)
+    return len(sids)
+
 
+# ==================== ЗРИТЕЛИ ====================
+
+@on_event('watch_game')
+def handle_watch_game(data):
+    """подключение зрителя: только socket.io комната, в игру он не добавляется"""
+    pin = client_text(data.get('pin'), 16).upper()
+    password = data.get('password')
+    
+    with games_lock:
+        game = active_games.get(pin)
+        if game is None:
+            emit('error', {'message': 'игра не найдена'})
+            return
+        # та же проверка, что при входе: закрытую комнату (и комнату быстрой игры) смотрят только знающие пароль
+        if game.has_password and game.password != password:
+            emit('error', {'message': 'неверный пароль', 'password_required': True})
+            return
+        # у комнаты без зрителей снимок мог не собираться - собираем сразу
+        body = spectator_feed.latest(pin) or spectator_feed.publish(
+            pin, game.spectator_fingerprint(), game.spectator_state
+        )
+    
+    join_room(watch_room(pin))
+    emit('spectate', body)
 
-@socketio.on('get_question')
+
+def has_watchers(pin):
+    return watch_room(pin) in socketio.server.manager.rooms.get('/', {})
+
+
+def broadcast_spectators():
+    """рассылка снимков: одна сборка и одна сериализация на игру, только если есть зрители и что-то изменилось"""
+    with games_lock:
+        games = list(active_games.items())
+    spectator_feed.retain(pin for pin, _ in games)
+    
+    sent = 0
+    for pin, game in games:
+        if not has_watchers(pin):
+            continue
+        with games_lock:
+            fingerprint = game.spectator_fingerprint()
+            body = spectator_feed.publish(pin, fingerprint, game.spectator_state)
+        if body is not None:
+            # json-строка уходит как есть, socket.io не перекодирует payload на каждого зрителя
+            socketio.emit('spectate', body, to=watch_room(pin))
+            sent += 1
+    return sent
+
+
+# ==================== ПОДБОР СОПЕРНИКОВ ====================
+
+@on_event('queue_match')
+def handle_queue_match(data):
+    """встать в очередь на публичную игру"""
+    topic = data.get('topic')
+    difficulty = data.get('difficulty', 'medium')
+    mode = data.get('mode', 'ffa')
+    if topic not in TOPICS or difficulty not in MATCH_DIFFICULTIES or mode not in MATCH_MODES:
+        emit('error', {'message': 'неверные параметры подбора'})
+        return
+    
+    # гости подбираются со стартовым рейтингом
+    if current_user.is_authenticated:
+        user_id, rating = current_user.id, current_user.rating or DEFAULT_RATING
+    else:
+        user_id, rating = None, DEFAULT_RATING
+    
+    key = (topic, difficulty, mode)
+    matchmaker.enqueue(request.sid, key, rating, user_id)
+    emit('queued', {'waiting': matchmaker.waiting(key)})
+
+
+@on_event('cancel_match')
+def handle_cancel_match(data=None):
+    """выйти из очереди"""
+    matchmaker.cancel(request.sid)
+    emit('match_cancelled', {})
+
+
+def run_matchmaking():
+    """тик подбора: собранные группы получают комнату с паролем и переходят в лобби"""
+    for (topic, difficulty, mode), tickets in matchmaker.tick():
+        game = GameSession(
+            creator_id=None,
+            topic=topic,
+            mode=mode,
+            difficulty=difficulty,
+            questions_count=MATCH_QUESTIONS,
+            has_password=True,
+            # пароль знают только подобранные игроки, посторонние по пину не войдут
+            password=uuid.uuid4().hex
+        )
+        game.auto_start = len(tickets)
+        game.log_event(EVENT_CREATE, None, MATCH_QUESTIONS, 0, game.pin, topic, mode, difficulty)
+        
+        with games_lock:
+            active_games[game.pin] = game
+        metrics.inc('matches_created')
+        
+        for ticket in tickets:
+            socketio.emit('match_found', {'pin': game.pin, 'password': game.password}, to=ticket.sid)
+        
+        threading.Timer(MATCH_START_TIMEOUT, lambda pin=game.pin: start_match_late(pin)).start()
+
+
+def start_match_late(pin):
+    """не все подобранные дошли до лобби: играем теми, кто пришел, или закрываем комнату"""
+    with games_lock:
+        game = active_games.get(pin)
+        if game is None or game.status != 'waiting':
+            return
+        if len(game.players) < 2:
+            del active_games[pin]
+            event_log.finish(game.game_id)
+            closed = True
+        else:
+            closed = False
+    
+    if closed:
+        socketio.emit('game_closed', {'reason': 'match_timeout'}, room=pin)
+        socketio.close_room(pin)
+        return
+    start_game(pin)
+
+
+@on_event('get_question')
 def handle_get_question(data):
-    """получение текущего вопроса"""
+    """текущий вопрос лично игроку: при заходе на страницу игры и в question_at, если вопроса в расписании не было"""
     pin = data.get('pin')
     
     with games_lock:
@@ -744,31 +1695,45 @@ def handle_get_question(data):
             return
         
         game = active_games[pin]
-        q = game.get_current_question()
-        
-        if q:
-            game.question_start_time = time.time()
-            
-            # определяем чья очередь (для команд)
-            player_team = game.players.get(request.sid, {}).get('team')
-            is_your_turn = (game.mode == 'ffa' or player_team == game.current_team)
-            
-            emit('question', {
-                **q,
-                'your_team': player_team,
-                'is_your_turn': is_your_turn,
-                'time_left': 20
-            }, room=pin)
-            
-            # запускаем таймер
-            threading.Timer(20.0, lambda: time_up(pin, game.current_question_idx)).start()
-        else:
+        if game.public_question(game.current_question_idx) is None:
             # игра окончена
             end_game(pin)
+            return
+        if game.question_start_time is None:
+            return
+        
+        # определяем чья очередь (для команд)
+        player_team = game.players.get(request.sid, {}).get('team')
+        is_your_turn = (game.mode == 'ffa' or player_team == game.current_team)
+        
+        payload = {
+            **game.round_info(),
+            'your_team': player_team,
+            'is_your_turn': is_your_turn,
+            'time_left': game.time_left()
+        }
+    
+    emit('question', payload)
+
+
+def schedule_round(game, delay):
+    """старт раунда под games_lock: таймер на показ плюс время ответа, расписание для рассылки"""
+    info = game.begin_round(delay)
+    pin, idx = game.pin, game.current_question_idx
+    threading.Timer(delay + QUESTION_TIME, lambda: time_up(pin, idx)).start()
+    return info
 
 
 def time_up(pin, question_idx):
     """обработка истечения времени на вопрос"""
+    # таймер раунда - тоже работа комнаты, в профиле подписываем ее как событие
+    if profiler.active:
+        with profiler.context('time_up', pin):
+            return _time_up(pin, question_idx)
+    return _time_up(pin, question_idx)
+
+
+def _time_up(pin, question_idx):
     with games_lock:
         if pin not in active_games:
             return
@@ -777,15 +1742,22 @@ def time_up(pin, question_idx):
         if game.current_question_idx != question_idx:
             return
         
+        results = game.round_results() if game.large else None
+        game.log_event(EVENT_TIMEOUT, question_idx)
+        
         # переходим к следующему
         if not game.next_question():
             end_game(pin)
             return
+        info = schedule_round(game, ROUND_PAUSE)
     
+    if results:
+        reveal_round(pin, *results)
     socketio.emit('time_up', {}, room=pin)
+    socketio.emit('next_round', info, room=pin)
 
 
-@socketio.on('submit_answer')
+@on_event('submit_answer')
 def handle_submit_answer(data):
     """обработка ответа игрока"""
     pin = data.get('pin')
@@ -806,9 +1778,13 @@ def handle_submit_answer(data):
             emit('error', {'message': 'сейчас очередь другой команды'})
             return
         
-        # проверяем ответ
+        # вопрос уже у клиентов, но до показа ответы не принимаем
+        if not game.revealed():
+            return
+        
+        # проверяем ответ; время - с момента показа, без задержки сети игрока
         is_correct = game.check_answer(answer)
-        response_time = time.time() - game.question_start_time
+        response_time = clock_sync.compensate(request.sid, time.time() - game.question_start_time, QUESTION_TIME)
         
         # начисляем очки
         points = game.calculate_score(is_correct, response_time)
@@ -822,14 +1798,32 @@ def handle_submit_answer(data):
         player['response_times'].append(response_time)
         player['answered_current'] = True
         game.answered_this_round.add(request.sid)
+        game.analytics.record(request.sid, game.current_question_idx, is_correct, response_time, points)
+        game.touch()
+        # номер варианта от клиента может быть чем угодно - в журнал пишем только 0..3
+        answer_code = answer if isinstance(answer, int) and 0 <= answer < 4 else -1
+        game.log_event(EVENT_ANSWER, game.analytics.slots[request.sid], game.current_question_idx,
+                       answer_code, int(is_correct), response_time, points)
+        if game.current_question_idx < len(game.questions):
+            question_stats.answer(game.questions[game.current_question_idx].get('id'),
+                                  answer_code, is_correct, response_time)
+        
+        # распределение по вариантам: итоги раунда большой комнаты и снимки для зрителей
+        game.answer_buffer.record(answer, is_correct)
     
     # отправляем результат
     emit('answer_result', {
         'correct': is_correct,
         'points': points,
-        'answer': answer
+        'answer': answer,
+        'score': player['score']
     })
     
+    # в большой комнате счет уходит только на раскрытии ответа
+    if game.large:
+        check_all_answered(pin)
+        return
+    
     # обновляем счет всем
     emit('score_update', {
         'leaderboard': game.get_leaderboard(),
@@ -849,7 +1843,12 @@ def check_all_answered(pin):
         
         game = active_games[pin]
         
-        if game.mode == 'teams':
+        if game.large:
+            # отвечать может только текущая команда, так что хватает счетчика
+            expected = len(game.teams[game.current_team]) if game.mode == 'teams' else len(game.players)
+            if len(game.answered_this_round) < expected:
+                return
+        elif game.mode == 'teams':
             # проверяем что вся команда ответила
             team_players = game.teams[game.current_team]
             answered_in_team = [p for p in team_players if game.players[p]['answered_current']]
@@ -861,27 +1860,49 @@ def check_all_answered(pin):
             if len(game.answered_this_round) < len(game.players):
                 return
         
-        # небольшая пауза и следующий вопрос
-        time.sleep(2)
+        results = game.round_results() if game.large else None
         
         if not game.next_question():
             end_game(pin)
             return
+        # пауза на результат ответа: вопрос уходит вместе с расписанием, клиенты покажут его одновременно
+        info = schedule_round(game, ROUND_PAUSE)
     
-    socketio.emit('next_question_ready', {}, room=pin)
+    if results:
+        reveal_round(pin, *results)
+    socketio.emit('next_round', info, room=pin)
+
+
+def reveal_round(pin, payload, ranks):
+    """раскрытие ответа в большой комнате: один общий payload и личное место каждому"""
+    socketio.emit('round_results', payload, room=pin)
+    for sid, rank in ranks.items():
+        socketio.emit('your_rank', {'rank': rank, 'total': len(ranks)}, to=sid)
 
 
 def end_game(pin):
     """завершение игры и подсчет результатов"""
+    # вызывается и из обработчиков, и из таймера, где контекста приложения нет
+    with app.app_context():
+        _end_game(pin)
+
+
+def _end_game(pin):
     with games_lock:
         if pin not in active_games:
             return
         
         game = active_games[pin]
+        # итоги и рейтинг пишем ровно один раз, сколько бы раз ни дернули конец игры
+        if game.status == 'finished':
+            return
         game.status = 'finished'
         
         # определяем победителя
-        leaderboard = game.get_leaderboard()
+        if game.large and game.mode != 'teams':
+            leaderboard = top_players(game.players)
+        else:
+            leaderboard = game.get_leaderboard()
         
         if game.mode == 'teams':
             winner = 'A' if leaderboard['A'] > leaderboard['B'] else 'B' if leaderboard['B'] > leaderboard['A'] else 'tie'
@@ -889,60 +1910,432 @@ def end_game(pin):
             # для ffa берем топ-1
             winner = leaderboard[0]['name'] if leaderboard else None
         
+        # итоги по всем игрокам разом
+        sids = list(game.players)
+        summary = game.analytics.player_summary(sids)
+        
         # сохраняем статистику
-        history = GameHistory.query.filter_by(pin=pin).first()
+        history = GameHistory.query.filter_by(game_id=game.game_id).first()
         if history:
             history.ended_at = datetime.utcnow()
-            history.winner_team = winner if isinstance(winner, str) else None
-            db.session.commit()
-            
-            # сохраняем статистику игроков
-            for sid, p in game.players.items():
-                stats = PlayerStats(
-                    game_id=history.id,
-                    user_id=p['user_id'],
-                    guest_name=p['name'] if not p['user_id'] else None,
-                    team=p['team'],
-                    score=p['score'],
-                    correct_answers=p['correct'],
-                    wrong_answers=p['wrong'],
-                    avg_response_time=sum(p['response_times']) / len(p['response_times']) if p['response_times'] else 0
-                )
-                db.session.add(stats)
-                
-                # обновляем рейтинг пользователя
-                if p['user_id']:
-                    user = User.query.get(p['user_id'])
-                    if user:
-                        user.total_games += 1
-                        user.total_points += p['score']
-                        
-                        # обновляем рейтинг (простая elo-like система)
-                        if game.mode == 'teams':
-                            is_winner = (p['team'] == winner)
-                        else:
-                            is_winner = (p['name'] == winner)
-                        
-                        if is_winner:
-                            user.total_wins += 1
-                            user.rating += 15
-                        else:
-                            user.rating = max(100, user.rating - 10)
-            
-            db.session.commit()
+            history.winner_team = winner if game.mode == 'teams' else None
+            save_game_results(history, game, sids, summary)
+            # рейтинг и история поменялись
+            page_cache.invalidate('leaderboard', f'game:{pin}')
+        
+        stats = game.get_stats(summary)
+        ranks = player_ranks(game.players) if game.large else None
         
-        stats = game.get_stats()
+        game.log_event(EVENT_END, winner)
+        event_log.finish(game.game_id)
     
-    emit('game_finished', {
+    if ranks:
+        # в большой комнате таблицу режем до топа, место каждый получает лично
+        stats = stats[:TOP_N]
+    
+    socketio.emit('game_finished', {
         'winner': winner,
         'leaderboard': leaderboard,
         'stats': stats,
         'mode': game.mode
     }, room=pin)
+    
+    if ranks:
+        for sid, rank in ranks.items():
+            socketio.emit('your_rank', {'rank': rank, 'total': len(ranks)}, to=sid)
+
+
+def save_game_results(history, game, sids, summary):
+    """запись статистики игроков и пересчет рейтинга одним пакетом"""
+    players = [game.players[sid] for sid in sids]
+    scores = np.array([p['score'] for p in players], dtype=np.int64)
+    
+    # текущие рейтинги всех зарегистрированных игроков одним запросом
+    user_ids = {p['user_id'] for p in players if p['user_id']}
+    users = {}
+    if user_ids:
+        rows = db.session.execute(
+            db.select(User.id, User.rating, User.rating_rd, User.rating_vol,
+                      User.total_games, User.total_wins, User.total_points)
+            .where(User.id.in_(user_ids))
+        )
+        users = {row.id: row for row in rows}
+    
+    # гости тоже соперники, но со стартовым рейтингом
+    ratings, rds, vols = [], [], []
+    for p in players:
+        user = users.get(p['user_id'])
+        ratings.append(user.rating if user else DEFAULT_RATING)
+        rds.append(user.rating_rd if user and user.rating_rd is not None else DEFAULT_RD)
+        vols.append(user.rating_vol if user and user.rating_vol is not None else DEFAULT_VOL)
+    
+    teams = [p['team'] for p in players]
+    new_ratings, new_rds, new_vols = rate_game(game.mode, ratings, rds, vols, scores, teams)
+    
+    if game.mode == 'teams':
+        winners = np.array([t == history.winner_team for t in teams])
+    else:
+        # победитель - по месту в игре, а не по имени (имена могут совпадать)
+        winners = scores == scores.max() if len(scores) else scores.astype(bool)
+        top = int(np.argmax(scores)) if len(scores) else None
+        if top is not None and players[top]['user_id']:
+            history.winner_team = str(players[top]['user_id'])
+    
+    stats_rows = [{
+        'game_id': history.id,
+        'user_id': p['user_id'],
+        'guest_name': p['name'] if not p['user_id'] else None,
+        'team': p['team'],
+        'score': p['score'],
+        'correct_answers': p['correct'],
+        'wrong_answers': p['wrong'],
+        'avg_response_time': float(summary['avg_time'][i])
+    } for i, p in enumerate(players)]
+    
+    user_rows = {}
+    for i, p in enumerate(players):
+        user = users.get(p['user_id'])
+        if not user:
+            continue
+        user_rows[user.id] = {
+            'id': user.id,
+            'total_games': user.total_games + 1,
+            'total_wins': user.total_wins + int(winners[i]),
+            'total_points': user.total_points + p['score'],
+            'rating': int(round(new_ratings[i])),
+            'rating_rd': float(new_rds[i]),
+            'rating_vol': float(new_vols[i])
+        }
+    
+    daily_rows, topic_rows = [], []
+    day = history.ended_at.date()
+    for i, p in enumerate(players):
+        if p['user_id'] in users:
+            # время - то же среднее, что уходит в player_stats, чтобы пересборка сводок давала те же числа
+            answered = p['correct'] + p['wrong']
+            rollup = rollup_counters(bool(winners[i]), p['score'], p['correct'], p['wrong'],
+                                     float(summary['avg_time'][i]) * answered)
+            daily_rows.append({'user_id': p['user_id'], 'day': day, **rollup})
+            topic_rows.append({'user_id': p['user_id'], 'topic': game.topic, **rollup})
+    
+    if stats_rows:
+        db.session.execute(db.insert(PlayerStats), stats_rows)
+    if user_rows:
+        db.session.execute(db.update(User), list(user_rows.values()))
+    database.upsert_add(db.session, UserDailyStats.__table__, daily_rows, ('user_id', 'day'), ROLLUP_COUNTERS)
+    database.upsert_add(db.session, UserTopicStats.__table__, topic_rows, ('user_id', 'topic'), ROLLUP_COUNTERS)
+    db.session.commit()
+
+
+def rollup_counters(won, score, correct, wrong, time_total):
+    """вклад одной игры в сводки игрока"""
+    return {
+        'games': 1,
+        'wins': int(won),
+        'points': score,
+        'correct': correct,
+        'answered': correct + wrong,
+        'time_total': float(time_total)
+    }
+
+
+def history_rows(chunk_size=5000):
+    """строки итогов законченных игр по порядку окончания: сначала архив, потом рабочая бд"""
+    def query(games, players):
+        return (
+            db.select(players.c.game_id, players.c.user_id, players.c.team, players.c.score,
+                      players.c.correct_answers, players.c.wrong_answers, players.c.avg_response_time,
+                      games.c.mode, games.c.topic, games.c.ended_at, games.c.winner_team)
+            .join(games, players.c.game_id == games.c.id)
+            .where(games.c.ended_at.isnot(None))
+            .order_by(games.c.ended_at, games.c.id)
+        )
+    # в архив уходят игры раньше границы, поэтому порядок по времени окончания сохраняется
+    yield from history_archive.stream(query, chunk_size)
+    yield from db.session.execute(
+        query(GameHistory.__table__, PlayerStats.__table__).execution_options(yield_per=chunk_size)
+    )
+
+
+def rebuild_rollups(chunk_size=5000):
+    """пересборка сводок по всей истории (рабочая бд + архив), например после первого обновления"""
+    daily, topics = {}, {}
+    games = 0
+    for game_id, group in itertools.groupby(history_rows(chunk_size), key=lambda row: row.game_id):
+        group = list(group)
+        top = max(row.score for row in group)
+        for row in group:
+            if not row.user_id:
+                continue
+            won = row.team == row.winner_team if row.mode == 'teams' else row.score == top
+            answered = (row.correct_answers or 0) + (row.wrong_answers or 0)
+            rollup = rollup_counters(won, row.score or 0, row.correct_answers or 0, row.wrong_answers or 0,
+                                     (row.avg_response_time or 0) * answered)
+            for table, key in ((daily, (row.user_id, row.ended_at.date())), (topics, (row.user_id, row.topic))):
+                current = table.get(key)
+                if current is None:
+                    # своя копия на каждую таблицу: иначе сложение в одной прибавится и в другой
+                    table[key] = dict(rollup)
+                else:
+                    for name in ROLLUP_COUNTERS:
+                        current[name] += rollup[name]
+        games += 1
+    
+    db.session.execute(db.delete(UserDailyStats))
+    db.session.execute(db.delete(UserTopicStats))
+    daily_rows = [{'user_id': user_id, 'day': day, **c} for (user_id, day), c in daily.items()]
+    topic_rows = [{'user_id': user_id, 'topic': topic, **c} for (user_id, topic), c in topics.items()]
+    for table, rows in ((UserDailyStats, daily_rows), (UserTopicStats, topic_rows)):
+        for start in range(0, len(rows), chunk_size):
+            db.session.execute(db.insert(table), rows[start:start + chunk_size])
+    db.session.commit()
+    return games, len(daily_rows), len(topic_rows)
+
+
+def backfill_rollups():
+    """сводки профиля для бд от прошлых версий: история есть, а сводок нет - собираем их один раз,
+    иначе профиль покажет нули
+    возвращает результат rebuild_rollups или None, если сводки уже есть или собирать не из чего"""
+    if db.session.execute(db.select(UserDailyStats.user_id).limit(1)).first() is not None:
+        return None
+    played = db.session.execute(
+        db.select(PlayerStats.id).join(GameHistory, PlayerStats.game_id == GameHistory.id)
+        .where(PlayerStats.user_id.isnot(None), GameHistory.ended_at.isnot(None)).limit(1)
+    ).first()
+    if played is None and not history_archive.max_game_id():
+        return None
+    games, daily, topics = rebuild_rollups()
+    print(f"сводки профиля собраны по истории: игр {games}, дневных сводок {daily}, по темам {topics}")
+    return games, daily, topics
+
+
+def compact_history(retention_days=HISTORY_RETENTION_DAYS):
+    """перенос старых игр в архив; сводки уже содержат их вклад"""
+    if retention_days <= 0:
+        return 0, 0
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    with app.app_context():
+        moved = history_archive.move(db.session, GameHistory.__table__, PlayerStats.__table__, cutoff)
+    if moved[0]:
+        metrics.inc('games_archived', moved[0])
+    return moved
+
+
+def recompute_ratings(chunk_size=5000, system=None):
+    """пересчет рейтинга всех игроков по всей истории игр (после смены параметров)"""
+    # состояние держим в памяти: user_id -> [rating, rd, vol]
+    state = {}
+    games = 0
+    
+    # строки одной игры идут подряд, историю (с архивом) читаем потоком порциями по chunk_size
+    for game_id, group in itertools.groupby(history_rows(chunk_size), key=lambda row: row.game_id):
+        group = list(group)
+        current = [state.get(row.user_id, (DEFAULT_RATING, DEFAULT_RD, DEFAULT_VOL)) for row in group]
+        new_ratings, new_rds, new_vols = rate_game(
+            group[0].mode,
+            [c[0] for c in current],
+            [c[1] for c in current],
+            [c[2] for c in current],
+            [row.score for row in group],
+            [row.team for row in group],
+            system
+        )
+        for i, row in enumerate(group):
+            if row.user_id:
+                # рейтинг округляем после каждой игры, как при живой игре (колонка целая), иначе пересчет разойдется
+                state[row.user_id] = (int(round(new_ratings[i])), float(new_rds[i]), float(new_vols[i]))
+        games += 1
+    
+    # у кого нет игр - стартовые значения, остальным пишем пересчитанные
+    db.session.execute(db.update(User).values(rating=DEFAULT_RATING, rating_rd=DEFAULT_RD, rating_vol=DEFAULT_VOL))
+    user_rows = [{
+        'id': user_id,
+        'rating': rating,
+        'rating_rd': rd,
+        'rating_vol': vol
+    } for user_id, (rating, rd, vol) in state.items()]
+    for start in range(0, len(user_rows), chunk_size):
+        db.session.execute(db.update(User), user_rows[start:start + chunk_size])
+    db.session.commit()
+    page_cache.invalidate('leaderboard')
+    
+    return games, len(state)
+
+
+@app.cli.command('recompute-ratings')
+def recompute_ratings_command():
+    """пересчет рейтинга по всей истории: flask --app app recompute-ratings"""
+    start = time.time()
+    games, users = recompute_ratings()
+    print(f"пересчитано игр: {games}, игроков: {users}, за {time.time() - start:.2f} с")
+
+
+@app.cli.command('replay-game')
+@click.argument('game_id', type=int)
+def replay_game_command(game_id):
+    """повтор игры по журналу событий: flask --app app replay-game GAME_ID"""
+    path = event_log.path(game_id)
+    if not os.path.exists(path):
+        print(f"нет журнала игры {game_id}: {path}")
+        return
+    game = replay(read_log(path))
+    print(f"игра {game_id}, пин {game.get('pin')}, тема {game.get('topic')}, режим {game.get('mode')}")
+    print(f"вопросов показано: {len(game['questions'])}, ответов: {len(game['answers'])}, победитель: {game['winner']}")
+    for p in sorted(game['players'].values(), key=lambda p: p['score'], reverse=True):
+        times = p['response_times']
+        avg = sum(times) / len(times) if times else 0
+        left = f" ({p['left']})" if p['left'] else ''
+        print(f"  {p['name']:20} {p['team'] or '-':2} очки {p['score']:5} верно {p['correct']:3} "
+              f"неверно {p['wrong']:3} среднее {avg:.2f} с{left}")
+
+
+def flush_question_stats():
+    """сброс накопленной статистики вопросов: один upsert на все вопросы и счетчик показов"""
+    rows = question_stats.drain()
+    if not rows:
+        return 0
+    
+    with app.app_context():
+        try:
+            database.upsert_add(db.session, QuestionStats.__table__, rows, 'question_id', questionstats.COUNTERS)
+            # у вопросов пакета (id < 0) строки в question нет
+            used = [{'b_id': row['question_id'], 'b_shown': row['shown']}
+                    for row in rows if row['shown'] and row['question_id'] > 0]
+            if used:
+                table = Question.__table__
+                db.session.execute(
+                    table.update()
+                    .where(table.c.id == db.bindparam('b_id'))
+                    .values(times_used=func.coalesce(table.c.times_used, 0) + db.bindparam('b_shown')),
+                    used
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # счетчики не теряем - уйдут со следующим сбросом
+            question_stats.merge(rows)
+            raise
+    return len(rows)
+
+
+@app.cli.command('question-stats')
+@click.option('--apply', is_flag=True, help='записать новые метки сложности и списать плохие вопросы')
+def question_stats_command(apply):
+    """пересчет сложности и поиск плохих вопросов: flask --app app question-stats [--apply]"""
+    rows = db.session.execute(
+        db.select(QuestionStats, Question.difficulty, Question.correct_answer, Question.question_text)
+        .outerjoin(Question, Question.id == QuestionStats.question_id)
+        .where(QuestionStats.answered >= questionstats.MIN_ANSWERS, QuestionStats.retired.is_(False))
+    ).all()
+    # вопросы встроенного пакета (id < 0) берем из пакета; сложность в нем не меняется, списать можно
+    pack = question_pack.find(row[0].question_id for row in rows if row[0].question_id < 0) if question_pack else {}
+    relabel, retire = [], []
+    for stats, difficulty, correct_answer, text in rows:
+        in_pack = stats.question_id < 0
+        if in_pack:
+            question = pack.get(stats.question_id)
+            if question is None:
+                continue
+            difficulty, correct_answer, text = question['difficulty'], question['correct'], question['question']
+        elif text is None:
+            continue
+        data = {name: getattr(stats, name) for name in questionstats.COUNTERS}
+        rate = questionstats.correct_rate(data)
+        if questionstats.is_bad(data, correct_answer):
+            retire.append(stats.question_id)
+            print(f"списать #{stats.question_id} (верно {rate:.0%}): {text[:60]}")
+            continue
+        suggested = questionstats.suggest_difficulty(data)
+        if suggested and suggested != difficulty and not in_pack:
+            relabel.append({'b_id': stats.question_id, 'b_difficulty': suggested})
+            print(f"#{stats.question_id}: {difficulty} -> {suggested} (верно {rate:.0%}, "
+                  f"медиана {questionstats.time_quantile(data, 0.5)} с)")
+    print(f"сменить сложность: {len(relabel)}, списать: {len(retire)}")
+    
+    if not apply:
+        return
+    table = Question.__table__
+    if relabel:
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('b_id')).values(difficulty=db.bindparam('b_difficulty')),
+            relabel
+        )
+    if retire:
+        db.session.execute(db.update(QuestionStats).where(QuestionStats.question_id.in_(retire)).values(retired=True))
+    db.session.commit()
+    print("изменения записаны")
+
+
+@app.cli.command('compact-history')
+@click.option('--days', type=int, default=HISTORY_RETENTION_DAYS, help='сколько дней истории оставить в рабочей бд')
+def compact_history_command(days):
+    """перенос старых игр в архив: flask --app app compact-history [--days N]"""
+    games, rows = compact_history(days)
+    print(f"в архив перенесено игр: {games}, строк игроков: {rows}")
+
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """пересборка сводок профиля по всей истории: flask --app app rebuild-rollups"""
+    start = time.time()
+    games, daily, topics = rebuild_rollups()
+    print(f"игр: {games}, дневных сводок: {daily}, по темам: {topics}, за {time.time() - start:.2f} с")
+
+
+@app.cli.command('import-questions')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(QUESTION_FORMATS), help='по умолчанию - по расширению файла')
+@click.option('--any-topic', is_flag=True, help='принимать темы не из списка TOPICS')
+def import_questions_command(path, fmt, any_topic):
+    """импорт вопросов из jsonl или csv (- читает stdin): flask --app app import-questions questions.jsonl"""
+    fmt = detect_format(path, fmt)
+    if fmt is None:
+        raise click.UsageError('не удалось определить формат, укажите --format')
+    
+    shown = []
+    
+    def on_error(line_no, error):
+        # первые ошибки показываем, остальные только считаем
+        if len(shown) < 20:
+            shown.append(line_no)
+            print(f"строка {line_no}: {error}")
+    
+    # новая база: таблицы и индекс по (topic, question_text) нужны до вставки
+    init_db()
+    start = time.time()
+    with open_file(path) as f:
+        total, errors, inserted = import_questions(f, fmt, None if any_topic else TOPICS, on_error=on_error)
+    elapsed = time.time() - start
+    print(f"строк: {total}, с ошибками: {errors}, добавлено: {inserted}, дублей: {total - errors - inserted}, "
+          f"за {elapsed:.2f} с ({total / max(elapsed, 1e-9):.0f} строк/с)")
+
+
+@app.cli.command('export-questions')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(QUESTION_FORMATS), help='по умолчанию - по расширению файла')
+@click.option('--topic', help='только одна тема')
+@click.option('--difficulty', type=click.Choice(('easy', 'medium', 'hard')), help='только одна сложность')
+def export_questions_command(path, fmt, topic, difficulty):
+    """экспорт вопросов в jsonl или csv (- пишет в stdout): flask --app app export-questions questions.jsonl"""
+    fmt = detect_format(path, fmt)
+    if fmt is None:
+        raise click.UsageError('не удалось определить формат, укажите --format')
+    start = time.time()
+    with open_file(path, 'w') as f:
+        count = export_questions(f, fmt, topic, difficulty)
+    if path != '-':
+        print(f"выгружено вопросов: {count} за {time.time() - start:.2f} с")
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """сборка статики с хешами и сжатием: flask --app app build-assets (после каждого изменения static/)"""
+    manifest = build_assets(app.static_folder)
+    print(f"собрано файлов: {len(manifest)} -> {os.path.join(app.static_folder, 'dist')}")
 
 
 # админ команды
-@socketio.on('admin_pause')
+@on_event('admin_pause')
 def handle_pause(data):
     """пауза игры"""
     pin = data.get('pin')
@@ -960,7 +2353,7 @@ def handle_pause(data):
     emit('game_paused', {}, room=pin)
 
 
-@socketio.on('admin_skip')
+@on_event('admin_skip')
 def handle_skip(data):
     """пропуск текущего вопроса"""
     pin = data.get('pin')
@@ -973,14 +2366,16 @@ def handle_skip(data):
         if game.players[request.sid].get('user_id') != game.creator_id:
             return
         
+        game.log_event(EVENT_SKIP, game.current_question_idx)
         if not game.next_question():
             end_game(pin)
             return
+        info = schedule_round(game, ROUND_PAUSE)
     
-    emit('question_skipped', {}, room=pin)
+    emit('next_round', info, room=pin)
 
 
-@socketio.on('admin_kick')
+@on_event('admin_kick')
 def handle_kick(data):
     """исключение игрока из игры"""
     pin = data.get('pin')
@@ -996,14 +2391,64 @@ def handle_kick(data):
         
         if target_sid in game.players:
             name = game.players[target_sid]['name']
+            game.log_event(EVENT_KICK, game.analytics.slots[target_sid])
             game.remove_player(target_sid)
     
     emit('player_kicked', {'name': name}, room=pin)
     leave_room(pin, sid=target_sid)
 
 
+# ==================== УБОРКА ИГР ====================
+
+def reap_games(now=None):
+    """удаление брошенных и зависших игр, возвращает число удаленных"""
+    now = now or time.time()
+    
+    with games_lock:
+        expired = select_expired(active_games, now, DEFAULT_TTLS, MAX_ACTIVE_GAMES)
+        for pin, reason in expired:
+            event_log.finish(active_games.pop(pin).game_id)
+    
+    for pin, reason in expired:
+        metrics.inc('games_reaped')
+        metrics.inc(f'games_reaped.{reason}')
+        # оставшимся клиентам сообщаем что комнаты больше нет
+        socketio.emit('game_closed', {'reason': reason}, room=pin)
+        socketio.close_room(pin)
+        socketio.emit('game_closed', {'reason': reason}, to=watch_room(pin))
+        socketio.close_room(watch_room(pin))
+    
+    return len(expired)
+
+
 # ==================== API РОУТЫ ====================
 
+@app.route('/api/metrics')
+def get_metrics():
+    """счетчики метрик"""
+    with games_lock:
+        games_count = len(active_games)
+    return jsonify({**metrics.snapshot(), 'active_games': games_count})
+
+
+@app.route('/api/admin/profile')
+def admin_profile():
+    """профиль сервера за ?seconds= (до минуты) в формате collapsed stacks; ?pin= - одна игра, ?all=1 - все потоки"""
+    token = request.headers.get('X-Admin-Token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({'error': 'нет доступа'}), 403
+    
+    seconds = min(max(request.args.get('seconds', 10, type=float), 0.1), MAX_PROFILE_SECONDS)
+    counts = profiler.run(seconds, all_threads=request.args.get('all') == '1')
+    if counts is None:
+        return jsonify({'error': 'профайлер уже запущен'}), 409
+    
+    metrics.inc('profiles_taken')
+    name = f'quizbattle-{int(time.time())}.folded'
+    return Response(collapsed(counts, request.args.get('pin')), content_type='text/plain; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename={name}'})
+
+
 @app.route('/api/game/<pin>/stats')
 def get_game_stats(pin):
     """получение статистики игры"""
@@ -1012,55 +2457,148 @@ def get_game_stats(pin):
             game = active_games[pin]
             return jsonify(game.get_stats())
     
-    # если игра уже в бд
-    history = GameHistory.query.filter_by(pin=pin).first()
-    if history:
-        stats = PlayerStats.query.filter_by(game_id=history.id).all()
-        return jsonify([{
+    # завершенная игра больше не меняется - кэш сбрасывается, только когда под этим пином закончится новая
+    cached = page_cache.get(f'game:{pin}', 'stats')
+    if cached is None:
+        history = get_latest_game(pin)
+        if not history:
+            return jsonify({'error': 'игра не найдена'}), 404
+        
+        stats = get_game_players(history.id)
+        body = json.dumps([{
             'name': s.guest_name or (s.user.username if s.user else 'игрок'),
             'team': s.team,
             'score': s.score,
             'correct': s.correct_answers,
             'wrong': s.wrong_answers,
             'avg_time': s.avg_response_time
-        } for s in stats])
+        } for s in stats], ensure_ascii=False)
+        cached = (body, make_etag(body))
+        page_cache.set(f'game:{pin}', 'stats', cached)
     
-    return jsonify({'error': 'игра не найдена'}), 404
+    return conditional_response(app, cached[0], cached[1], content_type='application/json')
 
 
 @app.route('/api/game/<pin>/export')
 def export_game_results(pin):
-    """экспорт результатов в json"""
-    history = GameHistory.query.filter_by(pin=pin).first()
+    """экспорт результатов игры потоком: ?format=json|ndjson|csv"""
+    fmt = request.args.get('format', 'json')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'неизвестный формат'}), 400
+    
+    history = get_latest_game(pin)
     if not history:
         return jsonify({'error': 'игра не найдена'}), 404
     
-    stats = PlayerStats.query.filter_by(game_id=history.id).all()
+    filename = f'game_{pin}_{history.game_id}.{fmt}'
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
     
-    data = {
-        'pin': pin,
-        'topic': history.topic,
-        'mode': history.mode,
-        'difficulty': history.difficulty,
-        'created_at': history.created_at.isoformat(),
-        'ended_at': history.ended_at.isoformat() if history.ended_at else None,
-        'winner': history.winner_team,
-        'players': [{
-            'name': s.guest_name or (s.user.username if s.user else 'игрок'),
-            'team': s.team,
-            'score': s.score,
-            'correct': s.correct_answers,
-            'wrong': s.wrong_answers
-        } for s in stats]
-    }
+    # завершенная игра больше не меняется - отдаем из кэша
+    key = (history.game_id, fmt)
+    cached = export_cache.get(key)
+    if cached is not None:
+        return Response(cached, content_type=EXPORT_FORMATS[fmt], headers=headers)
+    
+    # игроки вместе с пользователями одним запросом, а не запрос на каждую строку
+    stats = get_game_players(history.id)
     
-    # сохраняем во временный файл
-    filename = f'game_{pin}_{int(time.time())}.json'
-    filepath = os.path.join('/tmp', filename)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    chunks = game_chunks(history, stats, fmt)
+    if history.ended_at:
+        chunks = export_cache.tee(key, chunks)
+    return Response(chunks, content_type=EXPORT_FORMATS[fmt], headers=headers)
+
+
+@app.route('/api/games/export')
+def export_games_range():
+    """экспорт всех игр за период потоком: ?from=YYYY-MM-DD&to=YYYY-MM-DD&format=ndjson|csv"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'для выгрузки периода доступны ndjson и csv'}), 400
+    
+    try:
+        date_from = datetime.fromisoformat(request.args['from'])
+        date_to = datetime.fromisoformat(request.args['to'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'укажите from и to в формате YYYY-MM-DD'}), 400
     
-    return send_file(filepath, as_attachment=True, download_name=filename)
+    # конец периода включительно
+    if len(request.args['to']) <= 10:
+        date_to = date_to.replace(hour=23, minute=59, second=59, microsecond=999999)
+    
+    query = (
+        db.select(GameHistory, PlayerStats, User.username)
+        .join(PlayerStats, PlayerStats.game_id == GameHistory.id)
+        .outerjoin(User, PlayerStats.user_id == User.id)
+        .where(GameHistory.created_at >= date_from, GameHistory.created_at <= date_to)
+        .order_by(GameHistory.id, PlayerStats.id)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+    
+    def rows():
+        # строки читаются с курсора порциями, в памяти не копятся
+        for history, stat, username in db.session.execute(query):
+            yield {**game_record(history), **player_record(stat, username or '')}
+    
+    chunks = ndjson_chunks(rows()) if fmt == 'ndjson' else csv_chunks(rows())
+    filename = f'games_{date_from.date()}_{date_to.date()}.{fmt}'
+    return Response(
+        stream_with_context(chunks),
+        content_type=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+# ==================== СНАПШОТЫ ====================
+
+def checkpoint_games():
+    """периодический чекпоинт всех активных игр в журнал"""
+    snapshots = {}
+    with games_lock:
+        # кодируем под локом (это быстро), а пишем на диск уже без него
+        for pin, game in active_games.items():
+            try:
+                snapshots[pin] = encode_game(game.snapshot_state())
+            except Exception as e:
+                # одна комната не должна останавливать чекпоинт остальных: для нее остается прошлый снапшот
+                metrics.inc('snapshot_errors')
+                print(f"[!] снапшот игры {pin} не записан: {e}")
+                previous = game_journal.previous(pin)
+                if previous is not None:
+                    snapshots[pin] = previous
+    game_journal.checkpoint(snapshots)
+
+
+def restore_games():
+    """восстановление игр из журнала после рестарта"""
+    restored = 0
+    for pin, payload in game_journal.load().items():
+        try:
+            game = GameSession.from_snapshot_state(decode_game(payload))
+        except Exception as e:
+            print(f"[!] не удалось восстановить игру {pin}: {e}")
+            continue
+        
+        with games_lock:
+            active_games[pin] = game
+        restored += 1
+        
+        # перезапускаем таймер текущего вопроса на оставшееся время
+        if game.status == 'playing' and game.question_start_time:
+            time_left = max(0.0, QUESTION_TIME - (time.time() - game.question_start_time))
+            idx = game.current_question_idx
+            threading.Timer(time_left, lambda pin=pin, idx=idx: time_up(pin, idx)).start()
+        # комната подбора ждет игроков заново: кто не вернется, без того не стартует
+        elif game.status == 'waiting' and game.auto_start:
+            threading.Timer(MATCH_START_TIMEOUT, lambda pin=pin: start_match_late(pin)).start()
+    
+    if restored:
+        with games_lock:
+            last_id = max(game.game_id for game in active_games.values())
+        # комнаты из снапшота прошлой версии могли получить номера дальше счетчика в бд
+        with app.app_context():
+            database.advance_counter(db.engine, Counter.__table__, GAME_COUNTER, last_id + 1)
+        pin_allocator.reset()
+        print(f"восстановлено игр: {restored}")
 
 
 # ==================== ИНИЦИАЛИЗАЦИЯ ====================
@@ -1069,11 +2607,45 @@ def init_db():
     """инициализация базы данных"""
     with app.app_context():
         db.create_all()
+        # create_all не добавляет колонки и индексы в уже существующие таблицы (бд от прошлых версий)
+        with db.engine.begin() as conn:
+            for table in db.metadata.sorted_tables:
+                for name in database.add_missing_columns(conn, table):
+                    print(f"добавлена колонка {table.name}.{name}")
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+        # до отдельной колонки номер игры хранился в id
+        db.session.execute(db.update(GameHistory).where(GameHistory.game_id.is_(None)).values(game_id=GameHistory.id))
+        db.session.commit()
+        backfill_rollups()
+        # номера новых игр продолжают историю (вместе с архивом), чтобы пины не совпали с прошлыми играми
+        last_id = db.session.execute(db.select(func.max(GameHistory.game_id))).scalar() or 0
+        database.advance_counter(db.engine, Counter.__table__, GAME_COUNTER,
+                                 max(last_id, history_archive.max_game_id()) + 1)
+        pin_allocator.reset()
         print("база данных создана")
 
 
+def init_runtime():
+    """восстановление игр и запуск фоновых задач"""
+    restore_games()
+    # процессы хеширования поднимаем в фоне, чтобы первый вход их не ждал
+    threading.Thread(target=password_hasher.start, daemon=True).start()
+    scheduler.every(SNAPSHOT_INTERVAL, checkpoint_games)
+    scheduler.every(REAPER_INTERVAL, reap_games)
+    scheduler.every(EVENT_FLUSH_INTERVAL, event_log.flush)
+    scheduler.every(QUESTION_STATS_INTERVAL, flush_question_stats)
+    scheduler.every(ARCHIVE_INTERVAL, compact_history)
+    scheduler.every(MATCH_TICK, run_matchmaking)
+    scheduler.every(SPECTATOR_INTERVAL, broadcast_spectators)
+    scheduler.every(CLOCK_SYNC_INTERVAL, ping_players)
+    scheduler.every(60, rate_limiter.prune)
+    scheduler.start()
+
+
 if __name__ == '__main__':
     init_db()
+    init_runtime()
     print("=" * 50)
     print("quizbattle сервер запущен")
     print("=" * 50)
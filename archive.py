@@ -0,0 +1,117 @@
+"""
+архив истории игр
+старые строки game_history и player_stats переезжают в отдельный файл бд, рабочие таблицы не растут
+схема архива - копия рабочих таблиц, перенос порциями и идемпотентен (повтор после падения не дублирует строки)
+"""
+
+import os
+
+from sqlalchemy import Column, MetaData, Table, create_engine, func, make_url, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+import database
+
+# файл архива рядом с рабочей бд (переопределяется ARCHIVE_DATABASE_URL)
+DEFAULT_ARCHIVE_FILE = 'quizbattle_archive.db'
+
+# игры старше стольких дней уезжают в архив (0 - не архивировать)
+HISTORY_RETENTION_DAYS = int(os.environ.get('HISTORY_RETENTION_DAYS', '90'))
+
+# игр за одну транзакцию переноса
+ARCHIVE_BATCH = 500
+
+
+class Archive:
+    """архивная бд с копиями таблиц истории"""
+
+    def __init__(self, url, games_table, players_table):
+        self.url = database.normalize_url(url)
+        self.metadata = MetaData()
+        self.games = _copy_table(games_table, self.metadata)
+        self.players = _copy_table(players_table, self.metadata)
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            if database.is_sqlite(self.url) and not database.is_memory_sqlite(self.url):
+                os.makedirs(os.path.dirname(os.path.abspath(make_url(self.url).database)), exist_ok=True)
+            self._engine = create_engine(self.url, **database.engine_options(self.url))
+            database.configure_engine(self._engine)
+            self.metadata.create_all(self._engine)
+            # архив от прошлых версий: недостающие колонки; номер игры раньше хранился в id
+            with self._engine.begin() as conn:
+                for table in self.metadata.sorted_tables:
+                    database.add_missing_columns(conn, table)
+                    for index in table.indexes:
+                        index.create(conn, checkfirst=True)
+                conn.execute(update(self.games).where(self.games.c.game_id.is_(None)).values(game_id=self.games.c.id))
+        return self._engine
+
+    def max_game_id(self):
+        if not self._exists():
+            return 0
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(self.games.c.game_id))).scalar() or 0
+
+    def move(self, session, games_table, players_table, cutoff, batch=ARCHIVE_BATCH):
+        """перенос игр, закончившихся до cutoff; возвращает (игр, строк игроков)"""
+        # последнюю записанную игру и игру с наибольшим id не трогаем: sqlite выдает новые id после максимального,
+        # без них id строк player_stats и game_history пошли бы по второму кругу и столкнулись с архивом
+        newest = select(players_table.c.game_id).order_by(players_table.c.id.desc()).limit(1).scalar_subquery()
+        last = select(func.max(games_table.c.id)).scalar_subquery()
+        moved_games = moved_players = 0
+        while True:
+            ids = session.execute(
+                select(games_table.c.id)
+                .where(games_table.c.ended_at < cutoff, games_table.c.id != func.coalesce(newest, -1),
+                       games_table.c.id != last)
+                .order_by(games_table.c.id)
+                .limit(batch)
+            ).scalars().all()
+            if not ids:
+                return moved_games, moved_players
+
+            games = [dict(row) for row in session.execute(
+                select(games_table).where(games_table.c.id.in_(ids))).mappings()]
+            players = [dict(row) for row in session.execute(
+                select(players_table).where(players_table.c.game_id.in_(ids))).mappings()]
+
+            # сначала архив (повтор вставки ничего не меняет), потом удаление из рабочей бд
+            with self.engine.begin() as conn:
+                _insert_ignore(conn, self.games, games)
+                _insert_ignore(conn, self.players, players)
+            session.execute(players_table.delete().where(players_table.c.game_id.in_(ids)))
+            session.execute(games_table.delete().where(games_table.c.id.in_(ids)))
+            session.commit()
+
+            moved_games += len(games)
+            moved_players += len(players)
+
+    def stream(self, query_for, chunk_size=5000):
+        """строки запроса к архиву порциями; query_for(games, players) строит select по таблицам архива"""
+        if not self._exists():
+            return
+        with self.engine.connect() as conn:
+            result = conn.execution_options(yield_per=chunk_size).execute(query_for(self.games, self.players))
+            yield from result
+
+    def _exists(self):
+        """архив для sqlite-файла еще не создан - не создаем его ради чтения"""
+        if self._engine is not None or not database.is_sqlite(self.url) or database.is_memory_sqlite(self.url):
+            return True
+        return os.path.exists(make_url(self.url).database)
+
+
+def _copy_table(table, metadata):
+    """те же колонки и индексы, но без внешних ключей: пользователи остаются в рабочей бд"""
+    columns = [Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False, index=c.index)
+               for c in table.columns]
+    return Table(table.name, metadata, *columns)
+
+
+def _insert_ignore(conn, table, rows):
+    if not rows:
+        return
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}[conn.dialect.name]
+    conn.execute(dialect.insert(table).on_conflict_do_nothing(), rows)
@@ -0,0 +1,127 @@
+"""
+сборка статики: имена с хешем содержимого, заранее сжатые копии и вечный кэш в браузере
+flask build-assets раскладывает static/ в static/dist/ (style.3f2a1b9c04.css, .gz, .br) и пишет manifest.json
+url_for('static', ...) подставляет имя с хешем; файл с таким именем не меняется никогда, кэшировать можно навсегда
+без манифеста (разработка) всё отдается по старым именам
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # без brotli собираем только gzip
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+# сжимаем только текст: mp3 и картинки уже сжаты
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+
+# меньше этого сжатие не окупает лишний заголовок
+MIN_COMPRESS_SIZE = 256
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def hashed_name(path, data):
+    """css/style.css -> css/style.<хеш>.css"""
+    root, ext = os.path.splitext(path)
+    return f'{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}'
+
+
+def build_assets(static_dir):
+    """сборка static/dist; возвращает манифест {исходное имя: имя с хешем}"""
+    dist = os.path.join(static_dir, DIST_DIR)
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [d for d in dirs if d != DIST_DIR]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            path = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            target = hashed_name(path, data)
+            manifest[path] = target
+            out = os.path.join(dist, target)
+            # то же содержимое - то же имя: повторная сборка ничего не пишет
+            if os.path.exists(out):
+                continue
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            _write(out, data)
+            if path.endswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_SIZE:
+                _write(out + '.gz', gzip.compress(data, 9, mtime=0))
+                if brotli is not None:
+                    _write(out + '.br', brotli.compress(data, quality=11))
+
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode())
+    return manifest
+
+
+def _write(path, data):
+    # через временный файл: воркеры, читающие dist во время сборки, не увидят половину файла
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class Assets:
+    """имена с хешем для url_for и раздача собранных файлов"""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_dir = app.static_folder
+        self.load()
+        app.url_defaults(self._hashed_url)
+        # штатный обработчик /static оставляем для файлов вне dist
+        self._send_static = app.view_functions['static']
+        app.view_functions['static'] = self.send
+
+    def load(self):
+        path = os.path.join(self.static_dir, DIST_DIR, MANIFEST)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+        return len(self.manifest)
+
+    def _hashed_url(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.manifest:
+            values['filename'] = f'{DIST_DIR}/{self.manifest[values["filename"]]}'
+
+    def send(self, filename):
+        """собранный файл - со сжатой копией по Accept-Encoding и вечным кэшем, остальное - как обычно"""
+        if not filename.startswith(DIST_DIR + '/'):
+            return self._send_static(filename=filename)
+
+        dist = os.path.join(self.static_dir, DIST_DIR)
+        name = filename[len(DIST_DIR) + 1:]
+        accepted = request.headers.get('Accept-Encoding', '')
+        served, encoding = name, None
+        for ext, coding in (('.br', 'br'), ('.gz', 'gzip')):
+            if coding in accepted and os.path.exists(os.path.join(dist, name + ext)):
+                served, encoding = name + ext, coding
+                break
+
+        response = send_from_directory(dist, served, max_age=None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+            # тип - по исходному имени, а не по .gz/.br
+            response.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,1089 @@
+#!/usr/bin/env python3
+"""
+бенчмарки quizbattle
+запуск: python benchmark.py <имя>   (без аргументов - список доступных)
+"""
+
+import base64
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+
+def _fake_game_state(pin, players=8, questions=10):
+    """синтетическое состояние комнаты как из GameSession.snapshot_state"""
+    qs = [{
+        'id': i + 1,
+        'question': f'вопрос номер {i} про что-нибудь достаточно длинное?',
+        'options': [f'вариант {j}' for j in range(4)],
+        'correct': random.randrange(4),
+        'difficulty': 'medium'
+    } for i in range(questions)]
+
+    ps = {}
+    for i in range(players):
+        ps[f'sid{pin}{i:04d}xxxxxxxx'] = {
+            'token': os.urandom(16).hex(),
+            'user_id': i + 1 if i % 2 else None,
+            'name': f'игрок {i}',
+            'team': 'A' if i % 2 else 'B',
+            'score': random.randrange(200),
+            'correct': random.randrange(10),
+            'wrong': random.randrange(10),
+            'answered_current': bool(i % 3),
+            'response_times': [random.uniform(0, 20) for _ in range(5)]
+        }
+
+    return {
+        'pin': pin,
+        'game_id': int(pin),
+        'creator_id': 1,
+        'topic': 'история',
+        'mode': 'teams',
+        'difficulty': 'medium',
+        'questions_count': questions,
+        'has_password': False,
+        'password': None,
+        'status': 'playing',
+        'created_at': time.time(),
+        'current_question_idx': 5,
+        'current_team': 'A',
+        'bonus_enabled': True,
+        'large': False,
+        'auto_start': 0,
+        'question_start_time': time.time() - 7.5,
+        'questions': qs,
+        'players': ps
+    }
+
+
+def bench_snapshot(rooms=1000):
+    """размер снапшота и время восстановления для 1000 комнат"""
+    from snapshot import GameJournal, encode_game, decode_game
+
+    states = {f'{i:06d}': _fake_game_state(f'{i:06d}') for i in range(rooms)}
+
+    start = time.perf_counter()
+    snapshots = {pin: encode_game(s) for pin, s in states.items()}
+    encode_time = time.perf_counter() - start
+
+    total = sum(len(b) for b in snapshots.values())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = GameJournal(os.path.join(tmp, 'journal.bin'))
+        journal.checkpoint(snapshots)
+
+        # инкрементальный чекпоинт: меняется только 5% комнат
+        for pin in list(states)[:rooms // 20]:
+            states[pin]['players'][next(iter(states[pin]['players']))]['score'] += 10
+            snapshots[pin] = encode_game(states[pin])
+        start = time.perf_counter()
+        written = journal.checkpoint(snapshots)
+        incremental_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = GameJournal(journal.path).load()
+        restored = [decode_game(b) for b in loaded.values()]
+        restore_time = time.perf_counter() - start
+
+    print(f"комнат: {rooms}")
+    print(f"размер снапшотов: {total / 1024:.1f} КБ ({total / rooms:.0f} байт на комнату)")
+    print(f"кодирование: {encode_time * 1000:.1f} мс")
+    print(f"инкрементальный чекпоинт ({written} записей): {incremental_time * 1000:.1f} мс")
+    print(f"восстановление {len(restored)} комнат: {restore_time * 1000:.1f} мс")
+
+
+def bench_reaper(cycles=20000):
+    """soak: память стабильна на тысячах циклов создания и брошенных комнат"""
+    import tracemalloc
+    # номера игр берутся из счетчика в бд - бд временная
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from app import GameSession, active_games, init_db, reap_games, DEFAULT_TTLS
+
+    init_db()
+    tracemalloc.start()
+    now = time.time()
+    samples = []
+    statuses = ('waiting', 'playing', 'paused', 'finished')
+
+    for i in range(cycles):
+        game = GameSession(creator_id=1, topic='история', mode='teams' if i % 2 else 'ffa')
+        game.add_player(f'sid-{i}-a', None, 'игрок а')
+        game.add_player(f'sid-{i}-b', None, 'игрок б')
+        game.status = statuses[i % len(statuses)]
+        active_games[game.pin] = game
+
+        # игроки уходят не отключаясь, комната остается висеть
+        game.last_activity = now
+        now += 1.0
+
+        if i % 1000 == 999:
+            reap_games(now=now + max(DEFAULT_TTLS.values()))
+            samples.append((i + 1, len(active_games), tracemalloc.get_traced_memory()[0]))
+
+    tracemalloc.stop()
+    print(f"{'циклов':>8} {'комнат':>8} {'память, КБ':>12}")
+    for done, rooms, mem in samples:
+        print(f"{done:>8} {rooms:>8} {mem / 1024:>12.1f}")
+    growth = samples[-1][2] - samples[1][2]
+    print(f"прирост памяти после прогрева: {growth / 1024:.1f} КБ")
+
+
+def bench_endgame(players=1000, questions=20):
+    """итоги игры и elo для 1000 игроков на numpy"""
+    import numpy as np
+    from analytics import GameAnalytics
+    from rating import elo_deltas_ffa, elo_deltas_teams
+
+    analytics = GameAnalytics(questions=questions)
+    sids = [f'sid{i}' for i in range(players)]
+    for sid in sids:
+        analytics.add_player(sid)
+
+    start = time.perf_counter()
+    for q in range(questions):
+        for sid in sids:
+            if random.random() < 0.9:
+                correct = random.random() < 0.6
+                analytics.record(sid, q, correct, random.uniform(0.5, 20), 20 if correct else 0)
+    record_time = time.perf_counter() - start
+
+    ratings = np.random.normal(1000, 200, players)
+    teams = ['A' if i % 2 else 'B' for i in range(players)]
+
+    start = time.perf_counter()
+    summary = analytics.player_summary(sids)
+    round_stats = [analytics.round_summary(q) for q in range(questions)]
+    ffa = elo_deltas_ffa(ratings, summary['score'])
+    team = elo_deltas_teams(ratings, teams, {'A': 1, 'B': 0})
+    end_time = time.perf_counter() - start
+
+    print(f"игроков: {players}, вопросов: {questions}")
+    print(f"запись {players * questions} ответов: {record_time * 1000:.1f} мс "
+          f"({record_time / (players * questions) * 1e6:.2f} мкс на ответ)")
+    print(f"итоги игры + раундов + elo (ffa и команды): {end_time * 1000:.1f} мс")
+    print(f"сумма изменений рейтинга ffa: {ffa.sum():.6f}, команды: {team.sum():.6f}")
+
+
+def bench_ratings(games=20000, users=2000):
+    """пересчет ладдера: elo и glicko-2 по синтетической истории"""
+    import numpy as np
+    from rating import DEFAULT_RATING, DEFAULT_RD, DEFAULT_VOL, rate_game
+
+    rng = np.random.default_rng(1)
+    history = []
+    for _ in range(games):
+        size = int(rng.integers(2, 9))
+        ids = rng.choice(users, size=size, replace=False)
+        mode = 'teams' if rng.random() < 0.5 else 'ffa'
+        teams = ['A' if i % 2 else 'B' for i in range(size)] if mode == 'teams' else [None] * size
+        history.append((mode, ids, rng.integers(0, 300, size), teams))
+
+    for system in ('elo', 'glicko2'):
+        state = {}
+        start = time.perf_counter()
+        for mode, ids, scores, teams in history:
+            current = [state.get(u, (DEFAULT_RATING, DEFAULT_RD, DEFAULT_VOL)) for u in ids]
+            new = rate_game(mode, [c[0] for c in current], [c[1] for c in current],
+                            [c[2] for c in current], scores, teams, system)
+            for i, u in enumerate(ids):
+                state[u] = (new[0][i], new[1][i], new[2][i])
+        elapsed = time.perf_counter() - start
+        print(f"{system:8} {games} игр: {elapsed:.2f} с ({games / elapsed:.0f} игр/с)")
+
+
+def _persist_game(engine, tables, user_ids, rng):
+    """одна завершенная игра как в save_game_results: история, статистика, апдейт игроков"""
+    history, stats, users = tables
+    players = rng.sample(user_ids, 8)
+    with engine.begin() as conn:
+        game_id = conn.execute(history.insert().values(
+            pin=f'{rng.randrange(10 ** 6):06d}', topic='история', mode='ffa', difficulty='medium'
+        )).inserted_primary_key[0]
+        conn.execute(stats.insert(), [{
+            'game_id': game_id, 'user_id': uid, 'team': None, 'score': rng.randrange(300),
+            'correct_answers': 5, 'wrong_answers': 5, 'avg_response_time': 7.5
+        } for uid in players])
+        conn.execute(users.update().where(users.c.id.in_(players))
+                     .values(total_games=users.c.total_games + 1, rating=users.c.rating + 1))
+
+
+def _profile_read(engine, tables, user_ids, rng):
+    """чтение профиля параллельно с записью"""
+    _, stats, users = tables
+    uid = rng.choice(user_ids)
+    with engine.connect() as conn:
+        conn.execute(users.select().where(users.c.id == uid)).first()
+        conn.execute(stats.select().where(stats.c.user_id == uid).order_by(stats.c.id.desc()).limit(20)).all()
+
+
+def bench_db(writers=8, readers=4, games_per_writer=150, users=500):
+    """пропускная способность записи итогов игр: sqlite по умолчанию против wal + пула"""
+    import threading
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import OperationalError
+    import database
+    from app import db, GameHistory, PlayerStats, User
+
+    tables = (GameHistory.__table__, PlayerStats.__table__, User.__table__)
+
+    def run(label, tuned):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            if tuned:
+                engine = create_engine(url, **database.engine_options(url))
+                database.configure_engine(engine)
+            else:
+                # как было: журнал delete, synchronous=full, таймаут блокировки 5 с
+                engine = create_engine(url)
+
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(User.__table__.insert(), [{
+                    'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x',
+                    'total_games': 0, 'total_wins': 0, 'total_points': 0, 'rating': 1000
+                } for i in range(users)])
+            user_ids = list(range(1, users + 1))
+
+            done = {'games': 0, 'reads': 0, 'locked': 0}
+            lock = threading.Lock()
+            writing = threading.Event()
+            writing.set()
+
+            def writer(seed):
+                rng = random.Random(seed)
+                for _ in range(games_per_writer):
+                    try:
+                        _persist_game(engine, tables, user_ids, rng)
+                        key = 'games'
+                    except OperationalError:
+                        key = 'locked'
+                    with lock:
+                        done[key] += 1
+
+            def reader(seed):
+                rng = random.Random(seed)
+                while writing.is_set():
+                    try:
+                        _profile_read(engine, tables, user_ids, rng)
+                        key = 'reads'
+                    except OperationalError:
+                        key = 'locked'
+                    with lock:
+                        done[key] += 1
+
+            write_threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+            read_threads = [threading.Thread(target=reader, args=(100 + i,)) for i in range(readers)]
+            start = time.perf_counter()
+            for t in write_threads + read_threads:
+                t.start()
+            for t in write_threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+            writing.clear()
+            for t in read_threads:
+                t.join()
+            engine.dispose()
+
+            print(f"{label:10} {done['games'] / elapsed:>9.0f} {done['reads'] / elapsed:>9.0f} {done['locked']:>8}")
+
+    print(f"писателей: {writers}, читателей: {readers}, игр на писателя: {games_per_writer}")
+    print(f"{'режим':10} {'игр/с':>9} {'чтений/с':>9} {'locked':>8}")
+    run('default', tuned=False)
+    run('wal', tuned=True)
+
+
+def bench_coldstart(runs=5, top=15):
+    """холодный старт: время импорта app по модулям и время до готовности сервера"""
+    import statistics
+    import subprocess
+    from startup import free_port, importtime_report, wait_for_port
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    rows = importtime_report('app')
+    total = next(r[0] for r in rows if r[3] == 'app')
+    print(f"импорт app: {total / 1000:.0f} мс, самые тяжелые прямые зависимости:")
+    for cumulative, _, _, name in sorted((r for r in rows if r[2] == 1), reverse=True)[:top]:
+        print(f"  {name:40} {cumulative / 1000:>8.1f} мс")
+
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(runs):
+            port = free_port('127.0.0.1')
+            env = dict(os.environ, QUIZBATTLE_PORT=str(port),
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, f'cold{i}.db')}",
+                       SNAPSHOT_PATH=os.path.join(tmp, f'journal{i}.bin'))
+            start = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, os.path.join(here, 'desktop.py'), '--no-window'],
+                                    env=env, cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                ready = wait_for_port('127.0.0.1', port, timeout=60, alive=lambda: proc.poll() is None)
+                elapsed = time.perf_counter() - start
+            finally:
+                proc.terminate()
+                proc.wait()
+            if not ready:
+                print("сервер не запустился")
+                return
+            times.append(elapsed)
+
+    print(f"до готовности сервера ({runs} запусков): медиана {statistics.median(times) * 1000:.0f} мс, "
+          f"мин {min(times) * 1000:.0f} мс, макс {max(times) * 1000:.0f} мс")
+
+
+# типичные заголовки запроса браузера к /socket.io/ (polling шлет их на каждый запрос)
+_BROWSER_HEADERS = (
+    'Host: quizbattle.example:5000\r\n'
+    'Connection: keep-alive\r\n'
+    'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36\r\n'
+    'Accept: */*\r\n'
+    'Referer: http://quizbattle.example:5000/game?pin=ABC123\r\n'
+    'Accept-Encoding: gzip, deflate\r\n'
+    'Accept-Language: ru-RU,ru;q=0.9\r\n'
+    'Cookie: session=eyJfZnJlc2giOmZhbHNlLCJnYW1lX3BpbiI6IkFCQzEyMyJ9.ZZZZZZ.abcdefghijklmnopqrstuvwxyz\r\n'
+    '\r\n'
+)
+
+
+def _answer_traffic(players, answers, questions=10):
+    """события одной игры на answers ответов: (направление, получатель, событие, данные)"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    from app import GameSession, init_db
+
+    init_db()
+    game = GameSession(creator_id=None, topic='история', mode='ffa', questions_count=questions)
+    game.questions = [{
+        'id': i, 'question': f'вопрос номер {i} про историю достаточно длинный?',
+        'options': [f'вариант ответа {j}' for j in range(4)], 'correct': i % 4, 'difficulty': 'medium'
+    } for i in range(questions)]
+    sids = [f'sid{i}' for i in range(players)]
+    for i, sid in enumerate(sids):
+        game.add_player(sid, None, f'игрок {i}')
+
+    traffic = []
+    for n in range(answers):
+        sid = sids[n % players]
+        if n % players == 0:
+            game.current_question_idx = (n // players) % questions
+            q = game.get_current_question()
+            traffic += [('out', to, 'question', {**q, 'time_left': 20, 'is_your_turn': True}) for to in sids]
+
+        player = game.players[sid]
+        player['score'] += random.choice((0, 15, 20))
+        traffic.append(('in', sid, 'submit_answer', {'pin': game.pin, 'answer': n % 4}))
+        traffic.append(('out', sid, 'answer_result', {'correct': True, 'points': 20, 'answer': n % 4,
+                                                     'score': player['score']}))
+        update = {'leaderboard': game.get_leaderboard(), 'answered_by': player['name'], 'is_correct': True}
+        traffic += [('out', to, 'score_update', update) for to in sids]
+    return traffic
+
+
+def bench_transport(players=10, answers=1000):
+    """socket.io: байты на проводе и cpu сервера на 1000 ответов для polling, websocket, deflate и msgpack
+    оба транспорта идут через один сервер socket.io: emit, очередь engine.io, разбор пакета и обработчик ответа;
+    разное только то, как пакет уходит в сеть: http-цикл wsgi-приложения или кадр websocket
+    (разбор http-запроса самим веб-сервером в cpu polling не входит - для него цифра занижена)"""
+    import socketio
+    from engineio import packet as eio_packet
+    from socketio import msgpack_packet, packet
+    from wsproto.extensions import PerMessageDeflate
+    from wsproto.frame_protocol import FrameProtocol
+
+    traffic = _answer_traffic(players, answers)
+    request_headers = len(f'GET /socket.io/?EIO=4&transport=polling&t=Ox1a2b3 HTTP/1.1\r\n{_BROWSER_HEADERS}')
+
+    def encode(serializer, event=None, data=None):
+        """пакет клиента, без события - подключение (его кодирует браузер, в cpu сервера не входит)"""
+        cls = msgpack_packet.MsgPackPacket if serializer == 'msgpack' else packet.Packet
+        if event is None:
+            encoded = cls(packet.CONNECT, namespace='/').encode()
+        else:
+            encoded = cls(packet.EVENT, data=[event, data], namespace='/').encode()
+        # engine.io: текстовое сообщение с префиксом 4, бинарное - как есть
+        return encoded if isinstance(encoded, bytes) else ('4' + encoded)
+
+    def polling_body(message):
+        """тело post: бинарное сообщение engine.io в polling идет base64 с префиксом b"""
+        if isinstance(message, bytes):
+            return ('b' + base64.b64encode(message).decode()).encode()
+        return message.encode()
+
+    def call(wsgi, method, query, body=b''):
+        """один http-цикл polling прямо через wsgi-приложение сервера: (тело ответа, байт в статусе и заголовках)"""
+        result = {}
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': '/socket.io/', 'QUERY_STRING': query,
+            'SERVER_NAME': 'quizbattle.example', 'SERVER_PORT': '5000', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body),
+            'CONTENT_LENGTH': str(len(body)), 'CONTENT_TYPE': 'text/plain;charset=UTF-8'
+        }
+        response = b''.join(wsgi(environ, lambda status, headers: result.update(status=status, headers=headers)))
+        head = len(f"HTTP/1.1 {result['status']}\r\n") + sum(len(f'{k}: {v}\r\n') for k, v in result['headers']) + 2
+        return response, head
+
+    def start(serializer):
+        """сервер и по соединению на игрока: {игрок: (query polling, сокет engine.io, sid socket.io)}"""
+        # обработчики синхронно, чтобы их cpu попал в замер, а не в отдельные потоки
+        sio = socketio.Server(async_mode='threading', serializer=serializer, async_handlers=False)
+        connected = []
+        sio.on('connect', lambda sid, environ, auth=None: connected.append(sid))
+        sio.on('submit_answer', lambda sid, data: received.append(data))
+        wsgi = socketio.WSGIApp(sio)
+        peers = {}
+        for player in dict.fromkeys(sid for _, sid, _, _ in traffic):
+            opened, _ = call(wsgi, 'GET', 'EIO=4&transport=polling')
+            eio_sid = json.loads(opened[1:])['sid']
+            query = f'EIO=4&transport=polling&sid={eio_sid}'
+            call(wsgi, 'POST', query, polling_body(encode(serializer)))
+            call(wsgi, 'GET', query)
+            peers[player] = (query, sio.eio.sockets[eio_sid], connected[-1])
+        received.clear()
+        return sio, wsgi, peers
+
+    def run_polling(serializer):
+        """каждое сообщение - отдельный http-цикл: emit и get за ним или post с ответом игрока"""
+        sio, wsgi, peers = start(serializer)
+        bodies = [polling_body(encode(serializer, event, data)) if direction == 'in' else None
+                  for direction, _, event, data in traffic]
+
+        wire = 0
+        start_cpu = time.process_time()
+        for (direction, player, event, data), body in zip(traffic, bodies):
+            query, _, sid = peers[player]
+            if direction == 'out':
+                sio.emit(event, data, to=sid)
+                response, head = call(wsgi, 'GET', query)
+                wire += request_headers + head + len(response)
+            else:
+                response, head = call(wsgi, 'POST', query, body)
+                wire += request_headers + head + len(body) + len(response)
+        return wire, time.process_time() - start_cpu
+
+    def run_websocket(serializer, deflate):
+        """emit и очередь engine.io, как у writer-потока websocket, кадр wsproto на соединение (свой контекст сжатия)"""
+        sio, _, peers = start(serializer)
+
+        def frame_protocol(client):
+            extensions = []
+            if deflate:
+                ext = PerMessageDeflate()
+                ext.finalize('permessage-deflate')
+                extensions = [ext]
+            return FrameProtocol(client=client, extensions=extensions)
+
+        # кадры клиентов (с маской) готовим заранее
+        clients = {}
+        frames = []
+        for direction, player, event, data in traffic:
+            if direction == 'in':
+                client = clients.setdefault(player, frame_protocol(True))
+                frames.append(client.send_data(encode(serializer, event, data), True))
+            else:
+                frames.append(None)
+        servers = {player: frame_protocol(False) for player in peers}
+
+        wire = 0
+        start_cpu = time.process_time()
+        for (direction, player, event, data), frame in zip(traffic, frames):
+            _, socket, sid = peers[player]
+            server = servers[player]
+            if direction == 'out':
+                sio.emit(event, data, to=sid)
+                for pkt in socket.poll():
+                    wire += len(server.send_data(pkt.encode(), True))
+            else:
+                server.receive_bytes(frame)
+                for message in server.received_frames():
+                    socket.receive(eio_packet.Packet(encoded_packet=message.payload))
+                wire += len(frame)
+        return wire, time.process_time() - start_cpu
+
+    configs = [
+        ('polling + json', lambda: run_polling('default')),
+        ('websocket + json', lambda: run_websocket('default', False)),
+        ('websocket + deflate + json', lambda: run_websocket('default', True)),
+        ('websocket + deflate + msgpack', lambda: run_websocket('msgpack', True)),
+        ('websocket + msgpack', lambda: run_websocket('msgpack', False)),
+    ]
+
+    received = []
+    messages = len(traffic)
+    scale = 1000 / answers
+    print(f"игроков: {players}, ответов: {answers}, сообщений: {messages}")
+    print(f"{'режим':32} {'КБ':>9} {'байт/сообщ':>11} {'cpu, мс':>9}   (на 1000 ответов)")
+    for name, run in configs:
+        wire, cpu = run()
+        # ответы дошли до обработчика, а не потерялись по дороге
+        assert len(received) == answers
+        print(f"{name:32} {wire * scale / 1024:>9.1f} {wire / messages:>11.1f} {cpu * scale * 1000:>9.0f}")
+
+
+def bench_eventlog(games=200, players=20, questions=20):
+    """журнал событий: цена записи в горячем пути, сброс на диск и скорость повтора"""
+    from eventlog import (EVENT_ANSWER, EVENT_CREATE, EVENT_END, EVENT_JOIN, EVENT_QUESTION,
+                          EventLog, iter_logs, read_log, replay)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(tmp)
+        created = time.time()
+        answers = 0
+        record_time = 0.0
+        for game_id in range(1, games + 1):
+            log.record(game_id, created, EVENT_CREATE, None, questions, 0, f'{game_id:06d}', 'история', 'ffa', 'medium')
+            for slot in range(players):
+                log.record(game_id, created, EVENT_JOIN, slot, None, 0, f'игрок {slot}')
+            for idx in range(questions):
+                log.record(game_id, created, EVENT_QUESTION, idx, idx + 1, idx % 4, 0)
+                # замеряем только ответы - это событие на каждый клик игрока
+                start = time.perf_counter()
+                for slot in range(players):
+                    log.record(game_id, created, EVENT_ANSWER, slot, idx, slot % 4, int(slot % 4 == idx % 4),
+                               random.uniform(0.5, 15), 20)
+                record_time += time.perf_counter() - start
+                answers += players
+            log.record(game_id, created, EVENT_END, 'игрок 0')
+            log.finish(game_id)
+
+        start = time.perf_counter()
+        written = log.flush()
+        flush_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        replayed = replay(read_log(log.path(1)))
+        replay_one = time.perf_counter() - start
+
+        start = time.perf_counter()
+        events = sum(1 for _ in iter_logs(tmp))
+        stream_time = time.perf_counter() - start
+
+    assert len(replayed['answers']) == players * questions
+    print(f"игр: {games}, ответов: {answers}, событий: {events}")
+    print(f"запись ответа в буфер: {record_time / answers * 1e6:.2f} мкс")
+    print(f"размер: {written / 1024:.1f} КБ ({written / events:.1f} байт на событие)")
+    print(f"сброс на диск: {flush_time * 1000:.1f} мс")
+    print(f"повтор одной игры: {replay_one * 1000:.2f} мс")
+    print(f"чтение всех журналов: {events / stream_time:.0f} событий/с")
+
+
+def bench_questionstats(answers=100000, questions=500, naive=2000):
+    """статистика вопросов: счетчики в памяти + пакетный upsert против записи в бд на каждый ответ"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    import database
+    import questionstats
+    from app import db, QuestionStats
+
+    table = QuestionStats.__table__
+    rng = random.Random(1)
+    stream = [(rng.randrange(1, questions + 1), rng.randrange(4), rng.random() < 0.6, rng.uniform(0.5, 20))
+              for _ in range(answers)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url, **database.engine_options(url))
+        database.configure_engine(engine)
+        db.metadata.create_all(engine, tables=[table])
+
+        aggregator = questionstats.QuestionStatsAggregator()
+        start = time.perf_counter()
+        for question_id, option, is_correct, response_time in stream:
+            aggregator.answer(question_id, option, is_correct, response_time)
+        record_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with Session(engine) as session:
+            rows = aggregator.drain()
+            database.upsert_add(session, table, rows, 'question_id', questionstats.COUNTERS)
+            session.commit()
+        flush_time = time.perf_counter() - start
+
+        # как без агрегатора: отдельный upsert и коммит на каждый ответ (на части потока)
+        start = time.perf_counter()
+        with Session(engine) as session:
+            for question_id, option, is_correct, response_time in stream[:naive]:
+                row = dict.fromkeys(questionstats.COUNTERS, 0)
+                row.update(question_id=question_id, answered=1, correct=int(is_correct), time_total=response_time)
+                row[f'picks_{option}'] = 1
+                row[f'time_b{questionstats.time_bucket(response_time)}'] = 1
+                database.upsert_add(session, table, [row], 'question_id', questionstats.COUNTERS)
+                session.commit()
+        naive_time = (time.perf_counter() - start) * answers / naive
+
+        with engine.connect() as conn:
+            total = conn.execute(db.select(db.func.sum(table.c.answered))).scalar()
+        engine.dispose()
+
+    assert total == answers + naive
+    print(f"ответов: {answers}, вопросов: {questions}")
+    print(f"агрегатор: {record_time / answers * 1e6:.2f} мкс на ответ, сброс {len(rows)} строк: {flush_time * 1000:.1f} мс")
+    print(f"итого с агрегатором: {record_time + flush_time:.2f} с")
+    print(f"запись на каждый ответ: ~{naive_time:.1f} с (оценка по {naive} ответам)")
+
+
+def bench_profile(sizes=(100, 1000, 10000), requests=50):
+    """время страницы профиля при разном числе сыгранных игр (сводки + keyset вместо всей истории)"""
+    from datetime import datetime, timedelta
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ['ARCHIVE_DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'archive.db')}"
+    from app import app, db, init_db, rebuild_rollups, GameHistory, PlayerStats, User
+
+    init_db()
+    client = app.test_client()
+    rng = random.Random(1)
+    next_game = 1
+    print(f"{'игр у игрока':>12} {'профиль, мс':>12} {'полный агрегат, мс':>19}")
+    for n, size in enumerate(sizes):
+        with app.app_context():
+            user = User(username=f'user{n}', email=f'user{n}@example.com', password_hash='x')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            now = datetime.utcnow()
+            games, players = [], []
+            for i in range(size):
+                games.append({'id': next_game, 'pin': f'{next_game:06d}', 'topic': rng.choice(('история', 'наука', 'космос')),
+                              'mode': 'ffa', 'questions_count': 10, 'ended_at': now - timedelta(hours=i)})
+                players.append({'game_id': next_game, 'user_id': user_id, 'score': rng.randrange(100),
+                                'correct_answers': rng.randrange(11), 'wrong_answers': 0, 'avg_response_time': 3.0})
+                next_game += 1
+            db.session.execute(db.insert(GameHistory), games)
+            db.session.execute(db.insert(PlayerStats), players)
+            db.session.commit()
+            rebuild_rollups()
+
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+        client.get('/profile')
+        start = time.perf_counter()
+        for _ in range(requests):
+            assert client.get('/profile').status_code == 200
+        profile_ms = (time.perf_counter() - start) / requests * 1000
+
+        # для сравнения: итоги, посчитанные по всей истории игрока
+        with app.app_context():
+            start = time.perf_counter()
+            for _ in range(requests):
+                db.session.execute(
+                    db.select(GameHistory.topic, db.func.count(), db.func.sum(PlayerStats.score))
+                    .join(GameHistory, PlayerStats.game_id == GameHistory.id)
+                    .where(PlayerStats.user_id == user_id).group_by(GameHistory.topic)
+                ).all()
+            full_ms = (time.perf_counter() - start) / requests * 1000
+        print(f"{size:>12} {profile_ms:>12.2f} {full_ms:>19.2f}")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_matchmaking(sizes=(1000, 10000, 100000), ticks=20):
+    """подбор: цена постановки в очередь и тика при тысячах ожидающих"""
+    from matchmaking import Matchmaker
+
+    keys = [(topic, difficulty, mode) for topic in ('история', 'наука', 'космос', 'спорт')
+            for difficulty in ('easy', 'medium', 'hard') for mode in ('teams', 'ffa')]
+    print(f"{'в очереди':>10} {'встать, мкс':>12} {'тик, мс':>9} {'комнат за тик':>14}")
+    for size in sizes:
+        rng = random.Random(size)
+        mm = Matchmaker()
+        now = 0.0
+        start = time.perf_counter()
+        for i in range(size):
+            mm.enqueue(f'sid{i}', rng.choice(keys), rng.gauss(1000, 200), now=now)
+        enqueue_us = (time.perf_counter() - start) / size * 1e6
+
+        # каждый тик приходит 100 новых игроков, комнаты собираются с потолком rooms_per_tick
+        elapsed, rooms = 0.0, 0
+        for t in range(ticks):
+            now += 1
+            for i in range(100):
+                mm.enqueue(f'new{t}_{i}', rng.choice(keys), rng.gauss(1000, 200), now=now)
+            start = time.perf_counter()
+            rooms += len(mm.tick(now=now))
+            elapsed += time.perf_counter() - start
+        print(f"{size:>10} {enqueue_us:>12.2f} {elapsed / ticks * 1000:>9.2f} {rooms / ticks:>14.0f}")
+
+
+def bench_spectators(players=30, watchers=(100, 1000, 5000), questions=5):
+    """зрители: cpu и пакеты на раунды, если зритель - игрок комнаты или сидит в канале снимков"""
+    import socketio
+    from large_room import AnswerBuffer, top_players
+    from spectators import SpectatorFeed, watch_room
+
+    rng = random.Random(1)
+    question = {'question': 'Какая планета ближе всего к Солнцу?', 'options': ['Меркурий', 'Венера', 'Марс', 'Земля'],
+                'question_number': 1, 'total': questions, 'current_team': None}
+    # ответы раунда: секунда от показа вопроса, игрок, вариант
+    answers = sorted((rng.uniform(0, 20), i, rng.randrange(4)) for i in range(players))
+
+    def server(spectators, room):
+        sio = socketio.Server(async_mode='threading')
+        sent = [0]
+        sio.eio.send_packet = lambda eio_sid, pkt: sent.__setitem__(0, sent[0] + 1)
+        manager = sio.manager
+        for i in range(players):
+            manager.enter_room(manager.connect(f'p{i}', '/'), '/', 'GAME')
+        for i in range(spectators):
+            sid = manager.connect(f'w{i}', '/')
+            manager.enter_room(sid, '/', room)
+        return sio, sent
+
+    print(f"{'зрителей':>9} {'в комнате, мс':>14} {'пакетов':>9} {'снимки, мс':>11} {'пакетов':>9}")
+    for spectators in watchers:
+        scores = {f'p{i}': {'name': f'игрок{i}', 'team': None, 'score': 0} for i in range(players)}
+
+        # как было: зритель сидит в комнате игры и получает каждое событие игроков
+        sio, sent = server(spectators, 'GAME')
+        start = time.process_time()
+        for _ in range(questions):
+            sio.emit('new_question', question, to='GAME')
+            for _, i, option in answers:
+                scores[f'p{i}']['score'] += 10
+                sio.emit('player_answered', {'name': f'игрок{i}', 'answered': i + 1, 'total': players}, to='GAME')
+                sio.emit('leaderboard_update', {'leaderboard': top_players(scores)}, to='GAME')
+        room_cpu, room_sent = time.process_time() - start, sent[0]
+
+        # отдельный канал: снимок раз в секунду и только если что-то изменилось
+        sio, sent = server(spectators, watch_room('GAME'))
+        feed = SpectatorFeed()
+        buffer = AnswerBuffer()
+        start = time.process_time()
+        for q in range(questions):
+            buffer.reset()
+            pending = iter(answers)
+            answer = next(pending, None)
+            for second in range(21):
+                while answer is not None and answer[0] < second:
+                    buffer.record(answer[2], answer[2] == 0)
+                    scores[f'p{answer[1]}']['score'] += 10
+                    answer = next(pending, None)
+                body = feed.publish('GAME', (q, buffer.answered), lambda: {
+                    'question': question, 'time_left': 20 - second,
+                    'distribution': buffer.distribution(), 'top': top_players(scores)
+                })
+                if body is not None:
+                    sio.emit('spectate', body, to=watch_room('GAME'))
+        feed_cpu, feed_sent = time.process_time() - start, sent[0]
+
+        print(f"{spectators:>9} {room_cpu * 1000:>14.1f} {room_sent:>9} {feed_cpu * 1000:>11.1f} {feed_sent:>9}")
+
+
+def bench_prefetch(sizes=(10, 50, 200), rounds=20):
+    """граница раунда: пакеты и cpu, если каждый клиент просит вопрос сам или вопрос уходит вместе с расписанием"""
+    import socketio
+
+    question = {'question': 'Какая планета ближе всего к Солнцу?', 'options': ['Меркурий', 'Венера', 'Марс', 'Земля'],
+                'question_number': 2, 'total': 10, 'current_team': None}
+
+    def server(players):
+        sio = socketio.Server(async_mode='threading')
+        sent = [0]
+        sio.eio.send_packet = lambda eio_sid, pkt: sent.__setitem__(0, sent[0] + 1)
+        sids = [sio.manager.connect(f'p{i}', '/') for i in range(players)]
+        for sid in sids:
+            sio.manager.enter_room(sid, '/', 'GAME')
+        return sio, sids, sent
+
+    print(f"{'игроков':>8} {'по запросу, мс':>15} {'пакетов':>9} {'рассылкой, мс':>14} {'пакетов':>9}")
+    for players in sizes:
+        # как было: next_question_ready всем, каждый клиент шлет get_question, ответ уходит всей комнате
+        sio, sids, sent = server(players)
+        start = time.process_time()
+        for _ in range(rounds):
+            sio.emit('next_question_ready', {}, to='GAME')
+            for sid in sids:
+                sio.emit('question', {**question, 'is_your_turn': True, 'time_left': 20}, to='GAME')
+        pull_cpu, pull_sent = time.process_time() - start, sent[0]
+
+        # одно сообщение на комнату: расписание раунда и сам вопрос за QUESTION_LEAD до показа
+        sio, sids, sent = server(players)
+        start = time.process_time()
+        for _ in range(rounds):
+            now = time.time()
+            sio.emit('next_round', {**question, 'reveal_at': now + 2, 'question_at': now, 'duration': 20,
+                                    'server_time': now}, to='GAME')
+        push_cpu, push_sent = time.process_time() - start, sent[0]
+
+        print(f"{players:>8} {pull_cpu / rounds * 1000:>15.2f} {pull_sent // rounds:>9} "
+              f"{push_cpu / rounds * 1000:>14.3f} {push_sent // rounds:>9}")
+
+
+def bench_clocksync(connections=(100, 1000, 5000), ticks=10, interval=5):
+    """синхронизация часов: cpu на пинг и ack всех соединений и доля одного ядра при пинге раз в interval секунд"""
+    import socketio
+    from clocksync import ClockSync
+
+    print(f"{'соединений':>11} {'тик, мс':>9} {'на соединение, мкс':>19} {'доля cpu':>9}")
+    for count in connections:
+        sio = socketio.Server(async_mode='threading')
+        sio.eio.send_packet = lambda eio_sid, pkt: None
+        manager = sio.manager
+        sids = [manager.connect(f'c{i}', '/') for i in range(count)]
+        sync = ClockSync()
+
+        start = time.process_time()
+        for _ in range(ticks):
+            # как ping_clock в app.py: личный пинг с ack
+            for sid in sids:
+                sent = time.time()
+                sio.emit('clock_ping', {'ts': sent, 'rtt': sync.rtt(sid)}, to=sid,
+                         callback=lambda *_, sid=sid, sent=sent: sync.record(sid, time.time() - sent))
+            # клиенты подтверждают
+            for sid in sids:
+                for ack_id in [k for k in manager.callbacks.get(sid, {}) if k != 0]:
+                    manager.trigger_callback(sid, ack_id, [])
+        tick = (time.process_time() - start) / ticks
+
+        print(f"{count:>11} {tick * 1000:>9.2f} {tick / count * 1e6:>19.1f} {tick / interval * 100:>8.2f}%")
+
+
+def bench_profiler(calls=200000, events=20000):
+    """профайлер: цена выключенного флага в обертке событий и замедление обработчиков во время снятия профиля"""
+    import threading
+    from profiler import SamplingProfiler
+
+    profiler = SamplingProfiler()
+    leaderboard = [{'name': f'игрок{i}', 'team': None, 'score': i * 10} for i in range(30)]
+
+    def guarded(handler, data):
+        # как обертка on_event в app.py
+        if profiler.active:
+            with profiler.context('bench', data.get('pin')):
+                return handler(data)
+        return handler(data)
+
+    # пустой обработчик: видна только цена обертки
+    def empty(data):
+        return data
+
+    data = {'pin': 'ABC123'}
+    start = time.perf_counter()
+    for _ in range(calls):
+        empty(data)
+    plain = (time.perf_counter() - start) / calls * 1e9
+    start = time.perf_counter()
+    for _ in range(calls):
+        guarded(empty, data)
+    off = (time.perf_counter() - start) / calls * 1e9
+    profiler.active = True
+    start = time.perf_counter()
+    for _ in range(calls):
+        guarded(empty, data)
+    on = (time.perf_counter() - start) / calls * 1e9
+    profiler.active = False
+    print(f"обертка: вызов {plain:.0f} нс, профайлер выключен {off:.0f} нс, включен {on:.0f} нс")
+
+    # обработчик с типичной работой: таблица лидеров в json
+    def handler(data):
+        return json.dumps({'leaderboard': sorted(leaderboard, key=lambda p: -p['score'])}, ensure_ascii=False)
+
+    def run_events():
+        start = time.perf_counter()
+        for _ in range(events):
+            guarded(handler, data)
+        return (time.perf_counter() - start) / events * 1e6
+
+    run_events()
+    idle = run_events()
+    samples = {}
+    thread = threading.Thread(target=lambda: samples.update(profiler.run(idle * events / 1e6 * 3 + 1)))
+    thread.start()
+    while not profiler.active:
+        time.sleep(0.001)
+    profiled = run_events()
+    thread.join()
+    print(f"событие: {idle:.1f} мкс, под профайлером {profiled:.1f} мкс ({(profiled / idle - 1) * 100:+.1f}%), "
+          f"снимков {sum(samples.values())}")
+
+
+def bench_assets(visits=3):
+    """статика: запросы и байты за несколько заходов на страницы до и после сборки с хешами, сжатием и вечным кэшем"""
+    import re
+    import shutil
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app import app, assets, init_db, page_cache
+    from assets import build_assets
+
+    init_db()
+    static = os.path.join(tmp, 'static')
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns('dist'))
+    app.static_folder = assets.static_dir = static
+    sounds = [f'/static/sounds/{name}.mp3' for name in ('tick', 'correct', 'wrong', 'start', 'end')]
+    pages = ['/', '/rating', '/login', '/game?pin=ABC123']
+    headers = {'Accept-Encoding': 'gzip, deflate, br'}
+
+    def browse(client, asset_urls):
+        """браузер с кэшем: no-cache - условный запрос (304), immutable - без запроса"""
+        cache = {}
+        requests = wire = 0
+        for _ in range(visits):
+            for page in pages:
+                html = client.get(page, headers=headers).get_data(as_text=True)
+                for url in asset_urls(page, html):
+                    cached = cache.get(url)
+                    if cached and 'immutable' in cached[1]:
+                        continue
+                    extra = {'If-None-Match': cached[0]} if cached else {}
+                    response = client.get(url, headers={**headers, **extra})
+                    requests += 1
+                    wire += len(response.data) + sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+                    if response.status_code == 200:
+                        cache[url] = (response.headers.get('ETag', ''), response.headers.get('Cache-Control', ''))
+        return requests, wire
+
+    # как было: css и пять <audio preload> на каждой странице, кэш с перепроверкой
+    assets.manifest = {}
+    before = browse(app.test_client(), lambda page, html: ['/static/css/style.css'] + sounds)
+
+    # сборка: имена с хешем, сжатие, звуки только на страницах игры и лобби
+    build_assets(static)
+    assets.load()
+    # главная и рейтинг закэшированы со старыми ссылками
+    page_cache.invalidate('static', 'leaderboard')
+
+    def hashed(page, html):
+        urls = re.findall(r'href="(/static/[^"]+)"', html)
+        if page.startswith('/game'):
+            urls += re.findall(r'"(/static/dist/sounds/[^"]+)"', html)
+        return urls
+    after = browse(app.test_client(), hashed)
+
+    print(f"{visits} захода на {len(pages)} страницы")
+    print(f"{'':>10} {'запросов':>9} {'байт':>9}")
+    print(f"{'было':>10} {before[0]:>9} {before[1]:>9}")
+    print(f"{'сборка':>10} {after[0]:>9} {after[1]:>9}")
+
+
+# импорт с нуля должен держать не меньше стольких вопросов в секунду
+IMPORT_TARGET = 50000
+
+
+def bench_questionio(questions=200000, naive=20000, runs=5):
+    """импорт и экспорт вопросов: потоковый jsonl/csv порциями против orm-вставки по одному объекту
+    импорт с нуля и повтор меряются runs раз на пустой таблице, в зачет - лучший (на общей машине время плавает)"""
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app import app, db, export_questions, import_questions, init_db, Question, TOPICS
+
+    init_db()
+    rng = random.Random(1)
+    source = os.path.join(tmp, 'questions.jsonl')
+    with open(source, 'w', encoding='utf-8') as f:
+        for i in range(questions):
+            f.write(json.dumps({
+                'topic': rng.choice(TOPICS),
+                'difficulty': rng.choice(('easy', 'medium', 'hard')),
+                'question': f'вопрос {i}: ' + 'слово ' * rng.randrange(5, 20),
+                'options': [f'вариант {i}-{k}' for k in range(4)],
+                'correct': rng.randrange(4)
+            }, ensure_ascii=False) + '\n')
+
+    def timed(fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, time.perf_counter() - start
+
+    def cpu_timed(fn, *args):
+        start = time.process_time()
+        result, elapsed = timed(fn, *args)
+        return result, elapsed, time.process_time() - start
+
+    def load(path, fmt):
+        with open(path, encoding='utf-8', newline='') as f:
+            return import_questions(f, fmt)
+
+    def dump(path, fmt):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            return export_questions(f, fmt)
+
+    with app.app_context():
+        import_time = import_cpu = dedup_time = float('inf')
+        for _ in range(runs):
+            db.session.execute(db.delete(Question))
+            db.session.commit()
+            (total, errors, inserted), elapsed, cpu = cpu_timed(load, source, 'jsonl')
+            assert (total, errors, inserted) == (questions, 0, questions)
+            import_time, import_cpu = min(import_time, elapsed), min(import_cpu, cpu)
+            # повторный импорт того же файла: все строки - дубли
+            (_, _, again), elapsed = timed(load, source, 'jsonl')
+            assert again == 0
+            dedup_time = min(dedup_time, elapsed)
+        exported, jsonl_time = timed(dump, os.path.join(tmp, 'out.jsonl'), 'jsonl')
+        _, csv_time = timed(dump, os.path.join(tmp, 'out.csv'), 'csv')
+        assert exported == questions
+
+        # как generate_questions.py: объект orm на каждый вопрос и коммит порции (на части файла)
+        db.session.execute(db.delete(Question))
+        db.session.commit()
+        start = time.perf_counter()
+        with open(source, encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                if i == naive:
+                    break
+                data = json.loads(line)
+                db.session.add(Question(topic=data['topic'], difficulty=data['difficulty'],
+                                        question_text=data['question'], option_1=data['options'][0],
+                                        option_2=data['options'][1], option_3=data['options'][2],
+                                        option_4=data['options'][3], correct_answer=data['correct']))
+                if i % 1000 == 999:
+                    db.session.commit()
+        db.session.commit()
+        naive_time = time.perf_counter() - start
+
+    shutil.rmtree(tmp, ignore_errors=True)
+    print(f"вопросов: {questions}, импорт - лучший из {runs}, цель импорта {IMPORT_TARGET} вопросов/с")
+    for name, elapsed, rows in (('импорт jsonl', import_time, questions), ('повтор (дубли)', dedup_time, questions),
+                                ('экспорт jsonl', jsonl_time, questions), ('экспорт csv', csv_time, questions),
+                                ('orm по одному', naive_time, naive)):
+        print(f"{name:>16}: {elapsed:6.2f} с, {rows / elapsed:8.0f} вопросов/с")
+    rate = questions / import_time
+    print(f"импорт: процессор {import_cpu:.2f} с ({questions / import_cpu:.0f} вопросов/с)")
+    print(f"импорт: {rate:.0f} вопросов/с - цель {'достигнута' if rate >= IMPORT_TARGET else 'НЕ достигнута'}")
+
+
+BENCHMARKS = {
+    'snapshot': bench_snapshot,
+    'reaper': bench_reaper,
+    'endgame': bench_endgame,
+    'ratings': bench_ratings,
+    'db': bench_db,
+    'coldstart': bench_coldstart,
+    'transport': bench_transport,
+    'eventlog': bench_eventlog,
+    'questionstats': bench_questionstats,
+    'profile': bench_profile,
+    'matchmaking': bench_matchmaking,
+    'spectators': bench_spectators,
+    'prefetch': bench_prefetch,
+    'clocksync': bench_clocksync,
+    'profiler': bench_profiler,
+    'assets': bench_assets,
+    'questionio': bench_questionio,
+}
+
+
+def main():
+    """основная функция"""
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print("доступные бенчмарки:")
+        for name, fn in BENCHMARKS.items():
+            print(f"  {name:12} {fn.__doc__}")
+        return
+
+    name = sys.argv[1]
+    print("=" * 50)
+    print(f"бенчмарк: {name}")
+    print("=" * 50)
+    BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,26 +8,43 @@ import PyInstaller.__main__
 import os
 import shutil
 
+from assets import build_assets
+from generate_questions import PACK_PATH, compile_pack
+
 # очищаем старые сборки
 if os.path.exists('dist'):
     shutil.rmtree('dist')
 if os.path.exists('build'):
     shutil.rmtree('build')
 
+# вопросы из бд кладем в сборку, чтобы играть без API ключа
+print("[*] сборка пакета вопросов...")
+if not compile_pack(PACK_PATH):
+    print("[!] в бд нет вопросов - приложение будет работать только с API Кими")
+
+# статика с хешами и сжатием едет в сборку вместе с исходной
+print("[*] сборка статики...")
+build_assets('static')
+
 print("[*] начинаем сборку...")
 print("[*] это может занять несколько минут...")
 
 PyInstaller.__main__.run([
     'desktop.py',
     '--name=QuizBattle',
-    '--onefile',
+    # onedir: onefile распаковывает все во временную папку при каждом запуске
+    '--onedir',
     '--windowed',
+    # numpy грузится лениво, а драйвер socket.io выбирается по имени - анализатор их не видит
+    '--hidden-import=numpy',
+    '--hidden-import=engineio.async_drivers.threading',
     '--add-data=templates:templates',
     '--add-data=static:static',
+    f'--add-data={PACK_PATH}:.',
     '--icon=NONE',
     '--clean',
     '--noconfirm'
 ])
 
 print("[*] сборка завершена!")
-print("[*] файл находится в папке dist/")
+print("[*] приложение находится в папке dist/QuizBattle/")
@@ -0,0 +1,55 @@
+"""
+синхронизация часов и компенсация задержки сети
+сервер пингует игроков по socket.io, клиент сразу подтверждает (ack), время круга копится в кольце на соединение
+оценка задержки - минимум кольца: разовые всплески очередей ее не раздувают
+клиент по тем же пингам оценивает смещение часов сервера и показывает вопрос в назначенный момент
+"""
+
+import threading
+from collections import deque
+
+# сколько последних замеров держим на соединение
+CLOCK_SAMPLES = 8
+
+# компенсация не больше этого (секунды): клиент может задерживать ack и раздувать свою задержку
+MAX_COMPENSATION = 0.5
+
+
+class ClockSync:
+    """кольца замеров времени круга (rtt) по sid"""
+
+    def __init__(self, samples=CLOCK_SAMPLES, max_compensation=MAX_COMPENSATION):
+        self.samples = samples
+        self.max_compensation = max_compensation
+        self._rtt = {}  # sid -> deque замеров
+        self._lock = threading.Lock()
+
+    def record(self, sid, rtt):
+        """замер: пинг ушел и подтверждение вернулось за rtt секунд"""
+        if rtt < 0:
+            return
+        with self._lock:
+            ring = self._rtt.get(sid)
+            if ring is None:
+                ring = self._rtt[sid] = deque(maxlen=self.samples)
+            ring.append(rtt)
+
+    def rtt(self, sid):
+        """оценка времени круга или None, если замеров еще нет"""
+        with self._lock:
+            ring = self._rtt.get(sid)
+            return min(ring) if ring else None
+
+    def compensate(self, sid, response_time, limit):
+        """время ответа без доставки: вопрос показан по часам сервера, а ответ шел до сервера половину круга (rtt/2)
+        результат в пределах 0..limit"""
+        rtt = self.rtt(sid)
+        compensation = min(rtt / 2, self.max_compensation) if rtt else 0.0
+        return min(max(response_time - compensation, 0.0), limit)
+
+    def forget(self, sid):
+        with self._lock:
+            self._rtt.pop(sid, None)
+
+    def __len__(self):
+        return len(self._rtt)
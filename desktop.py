@@ -2,52 +2,102 @@
 """
 десктопная версия quizbattle
 запускает сервер и открывает окно приложения
+запуск без окна (только сервер): python desktop.py --no-window
 """
 
+import multiprocessing
+import os
+import sys
 import threading
-import time
-import webview
-from app import app, socketio, init_db
 
-# флаг для отслеживания запуска сервера
-server_ready = False
+from startup import free_port, port_in_use, wait_for_port
 
+HOST = '127.0.0.1'
+PORT = int(os.environ.get('QUIZBATTLE_PORT', '5000'))
+
+# сколько ждем сервер, прежде чем показать ошибку
+STARTUP_TIMEOUT = 30
+
+# выставляется, как только сервер начал принимать соединения
+server_ready = threading.Event()
+
+# заставка, пока в фоне грузится сервер
+SPLASH_HTML = """<!DOCTYPE html>
+<html lang="ru"><head><meta charset="UTF-8"></head>
+<body style="margin:0;height:100vh;display:flex;align-items:center;justify-content:center;
+             font-family:sans-serif;background:#f5f7fb;color:#104ba9">
+<h2>QuizBattle загружается...</h2>
+</body></html>"""
+
+ERROR_HTML = """<!DOCTYPE html>
+<html lang="ru"><head><meta charset="UTF-8"></head>
+<body style="font-family:sans-serif;padding:40px"><h2>не удалось запустить сервер</h2></body></html>"""
+
+
+def start_server(port):
+    """запуск flask сервера (в отдельном потоке, пока главный поток открывает окно)"""
+    # приложение тянет sqlalchemy и socket.io - импортируем здесь, чтобы не задерживать окно
+    from app import app, socketio, init_db, init_runtime
 
-def start_server():
-    """запуск flask сервера в отдельном потоке"""
     # инициализируем базу данных
     init_db()
-    
-    # запускаем сервер
-    print("[*] запуск сервера на http://127.0.0.1:5000")
-    server_ready = True
-    socketio.run(app, host='127.0.0.1', port=5000, debug=False, use_reloader=False)
+
+    # восстанавливаем игры и запускаем фоновые задачи
+    init_runtime()
+
+    # запускаем сервер (только на localhost, поэтому встроенный сервер werkzeug допустим)
+    print(f"[*] запуск сервера на http://{HOST}:{port}")
+    socketio.run(app, host=HOST, port=port, debug=False, use_reloader=False, allow_unsafe_werkzeug=True)
+
+
+def wait_until_ready(port, server_thread):
+    """ждем, пока сервер займет порт (вместо паузы наугад)"""
+    if wait_for_port(HOST, port, STARTUP_TIMEOUT, alive=server_thread.is_alive):
+        server_ready.set()
+    return server_ready.is_set()
+
+
+def open_when_ready(window, port, server_thread):
+    """переключаем окно с заставки на приложение, как только сервер готов"""
+    if wait_until_ready(port, server_thread):
+        print("[*] сервер готов, открываем приложение")
+        window.load_url(f'http://{HOST}:{port}')
+    else:
+        window.load_html(ERROR_HTML)
 
 
 def main():
     """основная функция десктопного приложения"""
-    # запускаем сервер в фоновом потоке
-    server_thread = threading.Thread(target=start_server, daemon=True)
+    # в собранном exe дочерние процессы (хеширование паролей) запускаются через этот же файл
+    multiprocessing.freeze_support()
+
+    # порт занят другой программой - берем свободный, иначе проверка готовности обманется
+    port = PORT if not port_in_use(HOST, PORT) else free_port(HOST)
+
+    if '--no-window' in sys.argv:
+        start_server(port)
+        return
+
+    # сервер грузится в фоновом потоке параллельно с окном
+    server_thread = threading.Thread(target=start_server, args=(port,), daemon=True)
     server_thread.start()
-    
-    # ждем пока сервер запустится
-    print("[*] ожидание запуска сервера...")
-    time.sleep(2)
-    
-    # создаем окно приложения
+
+    import webview
+
+    # создаем окно приложения сразу, с заставкой
     print("[*] открытие окна приложения")
     window = webview.create_window(
         title='QuizBattle - Командная Викторина',
-        url='http://127.0.0.1:5000',
+        html=SPLASH_HTML,
         width=1200,
         height=800,
         min_size=(800, 600),
         resizable=True,
         text_select=True
     )
-    
+
     # запускаем GUI
-    webview.start(debug=False)
+    webview.start(open_when_ready, (window, port, server_thread), debug=False)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,236 @@
+"""
+журнал событий игры для повтора и аналитики
+у каждой игры свой append-only файл: вход, вопрос, ответ, таймаут, выход, кик, конец
+запись в горячем пути - только упаковка в буфер, на диск пишет фоновая задача порциями
+"""
+
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+# заголовок файла: магия, номер игры, время создания комнаты (от него считаются смещения записей)
+LOG_MAGIC = b'QBE1'
+_FILE_HEADER = struct.Struct('<4sqd')
+
+# запись: тип, длина данных, миллисекунды от создания комнаты
+_RECORD_HEADER = struct.Struct('<BHI')
+
+EVENT_CREATE = 1
+EVENT_JOIN = 2
+EVENT_QUESTION = 3
+EVENT_ANSWER = 4
+EVENT_TIMEOUT = 5
+EVENT_SKIP = 6
+EVENT_LEAVE = 7
+EVENT_KICK = 8
+EVENT_END = 9
+
+# поля событий: числа фиксированного размера (формат struct), затем строки с длиной
+# slot - строка игрока в матрицах аналитики игры, стабильна при реконнекте
+_SCHEMAS = {
+    EVENT_CREATE: ('create', '<qHB', ('creator_id', 'questions_count', 'large'), ('pin', 'topic', 'mode', 'difficulty')),
+    EVENT_JOIN: ('join', '<HqB', ('slot', 'user_id', 'team'), ('name',)),
+    EVENT_QUESTION: ('question', '<HqBB', ('idx', 'question_id', 'correct', 'team'), ()),
+    EVENT_ANSWER: ('answer', '<HHbBfh', ('slot', 'idx', 'answer', 'correct', 'response_time', 'points'), ()),
+    EVENT_TIMEOUT: ('timeout', '<H', ('idx',), ()),
+    EVENT_SKIP: ('skip', '<H', ('idx',), ()),
+    EVENT_LEAVE: ('leave', '<H', ('slot',), ()),
+    EVENT_KICK: ('kick', '<H', ('slot',), ()),
+    EVENT_END: ('end', '<', (), ('winner',)),
+}
+_STRUCTS = {kind: struct.Struct(fmt) for kind, (_, fmt, _, _) in _SCHEMAS.items()}
+_U16 = struct.Struct('<H')
+
+# команды кодируем байтом, None (ffa) - нулем
+TEAMS = (None, 'A', 'B')
+
+# событие при чтении: имя типа, время (unix), поля
+Event = namedtuple('Event', 'kind time data')
+
+
+def team_code(team):
+    return TEAMS.index(team) if team in TEAMS else 0
+
+
+def encode_event(kind, created_at, now, *fields):
+    """одна запись журнала; None в числовых полях пишем как -1"""
+    names = _SCHEMAS[kind][2]
+    numbers = fields[:len(names)]
+    payload = _STRUCTS[kind].pack(*(-1 if v is None else v for v in numbers))
+    for value in fields[len(names):]:
+        data = (value or '').encode('utf-8')
+        payload += _U16.pack(len(data)) + data
+    offset = max(0, int((now - created_at) * 1000))
+    return _RECORD_HEADER.pack(kind, len(payload), offset) + payload
+
+
+def decode_event(kind, payload, created_at, offset):
+    name, _, names, strings = _SCHEMAS[kind]
+    fixed = _STRUCTS[kind]
+    data = dict(zip(names, fixed.unpack_from(payload, 0)))
+    pos = fixed.size
+    for field in strings:
+        n = _U16.unpack_from(payload, pos)[0]
+        data[field] = bytes(payload[pos + 2:pos + 2 + n]).decode('utf-8')
+        pos += 2 + n
+    return Event(name, created_at + offset / 1000, data)
+
+
+class _Room:
+    __slots__ = ('created_at', 'buf', 'shown_idx', 'finished')
+
+    def __init__(self, created_at):
+        self.created_at = created_at
+        self.buf = bytearray()
+        self.shown_idx = -1
+        self.finished = False
+
+
+class EventLog:
+    """буферы событий по играм и их сброс в файлы <dir>/<game_id>.qbe"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._rooms = {}  # game_id -> _Room
+        self._lock = threading.Lock()
+        self.dropped = 0  # событий, не влезших в формат записи
+
+    def path(self, game_id):
+        return os.path.join(self.directory, f'{game_id}.qbe')
+
+    def __len__(self):
+        """игр с буфером в памяти"""
+        return len(self._rooms)
+
+    def record(self, game_id, created_at, kind, *fields, now=None):
+        """событие в буфер игры (без диска); False - событие не влезло в формат записи и не записано"""
+        now = time.time() if now is None else now
+        try:
+            record = encode_event(kind, created_at, now, *fields)
+        except (struct.error, ValueError):
+            # число вне диапазона поля, строка длиннее 64 кб или не кодируется в utf-8 (одиночный суррогат):
+            # пропускаем одно событие, а не роняем обработчик, который уже поменял состояние игры
+            self.dropped += 1
+            return False
+        with self._lock:
+            room = self._rooms.get(game_id)
+            if room is None:
+                room = self._rooms[game_id] = _Room(created_at)
+            if kind == EVENT_QUESTION:
+                # клиенты запрашивают вопрос каждый сам - пишем только первый показ
+                if room.shown_idx == fields[0]:
+                    return True
+                room.shown_idx = fields[0]
+            room.buf += record
+        return True
+
+    def finish(self, game_id):
+        """игра закончена или убрана: после следующего сброса буфер игры освобождается"""
+        with self._lock:
+            room = self._rooms.get(game_id)
+            if room is not None:
+                room.finished = True
+
+    def flush(self):
+        """запись накопленного на диск, возвращает число байт"""
+        with self._lock:
+            pending = []
+            for game_id, room in list(self._rooms.items()):
+                if room.buf:
+                    pending.append((game_id, room.created_at, bytes(room.buf)))
+                    room.buf.clear()
+                if room.finished:
+                    del self._rooms[game_id]
+
+        if not pending:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        written = 0
+        for game_id, created_at, data in pending:
+            path = self.path(game_id)
+            with open(path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(_FILE_HEADER.pack(LOG_MAGIC, game_id, created_at))
+                f.write(data)
+            written += len(data)
+        return written
+
+
+# ==================== ЧТЕНИЕ ====================
+
+def read_log(path):
+    """события одного файла по порядку; недописанный хвост (падение при записи) пропускается"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _FILE_HEADER.size:
+        return
+    magic, _, created_at = _FILE_HEADER.unpack_from(data, 0)
+    if magic != LOG_MAGIC:
+        raise ValueError(f'{path}: не журнал событий')
+
+    view = memoryview(data)
+    pos = _FILE_HEADER.size
+    header_size = _RECORD_HEADER.size
+    while pos + header_size <= len(data):
+        kind, length, offset = _RECORD_HEADER.unpack_from(data, pos)
+        end = pos + header_size + length
+        if end > len(data):
+            break
+        # неизвестные типы (из более новой версии) пропускаем по длине
+        if kind in _SCHEMAS:
+            yield decode_event(kind, view[pos + header_size:end], created_at, offset)
+        pos = end
+
+
+def iter_logs(directory, since=0):
+    """поток (game_id, событие) по всем играм с номером больше since - для аналитики без живых таблиц"""
+    if not os.path.isdir(directory):
+        return
+    ids = sorted(int(name[:-4]) for name in os.listdir(directory)
+                 if name.endswith('.qbe') and name[:-4].isdigit())
+    for game_id in ids:
+        if game_id > since:
+            for event in read_log(os.path.join(directory, f'{game_id}.qbe')):
+                yield game_id, event
+
+
+def replay(events):
+    """детерминированный повтор игры: состав, очки и ответы восстанавливаются только из событий"""
+    game = {'players': {}, 'questions': {}, 'answers': [], 'winner': None, 'ended_at': None}
+    players = game['players']
+    for event in events:
+        data = event.data
+        if event.kind == 'create':
+            game.update(data, created_at=event.time)
+        elif event.kind == 'join':
+            players[data['slot']] = {
+                'name': data['name'],
+                'user_id': None if data['user_id'] < 0 else data['user_id'],
+                'team': TEAMS[data['team']],
+                'score': 0, 'correct': 0, 'wrong': 0, 'response_times': [], 'left': None
+            }
+        elif event.kind == 'question':
+            game['questions'][data['idx']] = {
+                'question_id': None if data['question_id'] < 0 else data['question_id'],
+                'correct': data['correct'],
+                'team': TEAMS[data['team']],
+                'shown_at': event.time
+            }
+        elif event.kind == 'answer':
+            p = players.get(data['slot'])
+            if p is None:
+                continue
+            p['score'] += data['points']
+            p['correct' if data['correct'] else 'wrong'] += 1
+            p['response_times'].append(data['response_time'])
+            game['answers'].append(data)
+        elif event.kind in ('leave', 'kick'):
+            p = players.get(data['slot'])
+            if p is not None:
+                p['left'] = event.kind
+        elif event.kind == 'end':
+            game['winner'] = data['winner'] or None
+            game['ended_at'] = event.time
+    return game
@@ -0,0 +1,142 @@
+"""
+экспорт результатов игр
+сериализация потоком (json, ndjson, csv) и lru-кэш готовых файлов завершенных игр
+"""
+
+import csv
+import io
+import json
+import threading
+from collections import OrderedDict
+
+# форматы экспорта и их content-type
+EXPORT_FORMATS = {
+    'json': 'application/json; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# колонки плоской строки (ndjson и csv): поля игры + поля игрока
+FLAT_FIELDS = [
+    'game_id', 'pin', 'topic', 'mode', 'difficulty', 'created_at', 'ended_at', 'winner',
+    'name', 'team', 'score', 'correct', 'wrong', 'avg_time'
+]
+
+# сколько строк копим перед отдачей куска клиенту
+ROWS_PER_CHUNK = 500
+
+
+def game_record(history):
+    """поля игры"""
+    return {
+        'game_id': history.game_id,
+        'pin': history.pin,
+        'topic': history.topic,
+        'mode': history.mode,
+        'difficulty': history.difficulty,
+        'created_at': history.created_at.isoformat() if history.created_at else None,
+        'ended_at': history.ended_at.isoformat() if history.ended_at else None,
+        'winner': history.winner_team
+    }
+
+
+def player_record(stat, username=None):
+    """поля игрока (username передаем, если он уже достан join'ом)"""
+    if username is None and stat.user is not None:
+        username = stat.user.username
+    return {
+        'name': stat.guest_name or username or 'игрок',
+        'team': stat.team,
+        'score': stat.score,
+        'correct': stat.correct_answers,
+        'wrong': stat.wrong_answers,
+        'avg_time': stat.avg_response_time
+    }
+
+
+def json_chunks(history, stats):
+    """один json-документ игры кусками, без сборки всего dict в памяти"""
+    header = game_record(history)
+    head = json.dumps(header, ensure_ascii=False)
+    yield head[:-1] + ', "players": ['
+    for i, stat in enumerate(stats):
+        yield (', ' if i else '') + json.dumps(player_record(stat), ensure_ascii=False)
+    yield ']}\n'
+
+
+def ndjson_chunks(rows):
+    """плоские строки по одной на линию"""
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(row, ensure_ascii=False))
+        if len(batch) >= ROWS_PER_CHUNK:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+
+def csv_chunks(rows):
+    """плоские строки в csv с заголовком"""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=FLAT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % ROWS_PER_CHUNK == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def game_chunks(history, stats, fmt):
+    """экспорт одной игры в нужном формате"""
+    if fmt == 'json':
+        return json_chunks(history, stats)
+
+    header = game_record(history)
+    rows = ({**header, **player_record(stat)} for stat in stats)
+    return ndjson_chunks(rows) if fmt == 'ndjson' else csv_chunks(rows)
+
+
+class ExportCache:
+    """lru-кэш готовых экспортов по (id игры, формат), ограничен по объему"""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._size -= len(self._items.pop(key))
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self._size -= len(old)
+
+    def tee(self, key, chunks):
+        """отдача кусков клиенту с одновременной записью результата в кэш"""
+        parts = []
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            parts.append(data)
+            yield data
+        # кэшируем только если клиент дочитал до конца
+        self.put(key, b''.join(parts))
@@ -2,9 +2,11 @@
 """
 скрипт для генерации вопросов через API Кими
 запуск: python generate_questions.py
+сборка офлайн-пакета из бд: python generate_questions.py pack [questions.qbp]
 """
 
 import os
+import sys
 import json
 import time
 import requests
@@ -32,6 +34,9 @@ TOPICS = [
 
 DIFFICULTIES = ['easy', 'medium', 'hard']
 
+# куда по умолчанию собирается офлайн-пакет (его же подхватывает app.py и build.py)
+PACK_PATH = 'questions.qbp'
+
 
 def generate_questions(topic, difficulty, count=35):
     """генерация вопросов через API Кими"""
@@ -149,8 +154,29 @@ def save_to_db(questions, topic, difficulty):
         print(f"[+] вопросы сохранены в базу данных")
 
 
+def compile_pack(path=PACK_PATH):
+    """сборка пакета вопросов из бд для игры без интернета"""
+    from app import app, db, Question
+    from questionpack import write_pack
+    
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(Question)
+            .order_by(Question.topic, Question.difficulty, Question.id)
+            .execution_options(yield_per=1000)
+        ).scalars()
+        total = write_pack(path, ({**q.to_dict(), 'topic': q.topic} for q in rows))
+    
+    print(f"[+] пакет {path}: {total} вопросов, {os.path.getsize(path) / 1024:.1f} КБ")
+    return total
+
+
 def main():
     """основная функция"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'pack':
+        compile_pack(sys.argv[2] if len(sys.argv) > 2 else PACK_PATH)
+        return
+    
     print("=" * 50)
     print("генератор вопросов для quizbattle")
     print("=" * 50)
@@ -0,0 +1,85 @@
+"""
+режим большой комнаты для аудитории в тысячи участников
+ответы копятся в буфере раунда, наружу уходят только агрегаты, топ-N и личное место
+"""
+
+import heapq
+import os
+
+# с какого числа игроков комната автоматически переходит в этот режим
+LARGE_ROOM_THRESHOLD = int(os.environ.get('LARGE_ROOM_THRESHOLD', '200'))
+
+# сколько игроков показываем в таблице лидеров
+TOP_N = 10
+
+# размер страницы списка игроков команды
+ROSTER_SHARD_SIZE = 50
+
+
+class AnswerBuffer:
+    """агрегирование ответов текущего раунда без рассылки на каждый ответ"""
+
+    def __init__(self, options=4):
+        self.options = options
+        self.reset()
+
+    def reset(self):
+        """очистка перед новым вопросом"""
+        self.counts = [0] * self.options
+        self.answered = 0
+        self.correct = 0
+
+    def record(self, answer_idx, is_correct):
+        """учет одного ответа"""
+        if isinstance(answer_idx, int) and 0 <= answer_idx < self.options:
+            self.counts[answer_idx] += 1
+        self.answered += 1
+        if is_correct:
+            self.correct += 1
+
+    def distribution(self):
+        """распределение ответов по вариантам"""
+        return {
+            'counts': list(self.counts),
+            'answered': self.answered,
+            'correct': self.correct
+        }
+
+
+def top_players(players, n=TOP_N):
+    """топ-N игроков без сортировки всей комнаты"""
+    best = heapq.nlargest(n, players.values(), key=lambda p: p['score'])
+    return [{'name': p['name'], 'team': p['team'], 'score': p['score']} for p in best]
+
+
+def player_ranks(players):
+    """место каждого игрока (одинаковые очки - одинаковое место)"""
+    order = sorted(players, key=lambda sid: players[sid]['score'], reverse=True)
+    ranks = {}
+    prev_score = None
+    rank = 0
+    for i, sid in enumerate(order):
+        score = players[sid]['score']
+        if score != prev_score:
+            rank = i + 1
+            prev_score = score
+        ranks[sid] = rank
+    return ranks
+
+
+def roster_shard(players, sids, page, size=ROSTER_SHARD_SIZE):
+    """одна страница списка игроков (команды или всей комнаты)"""
+    total = len(sids)
+    pages = max(1, (total + size - 1) // size)
+    page = min(max(0, page), pages - 1)
+    chunk = sids[page * size:(page + 1) * size]
+    return {
+        'players': [{
+            'name': players[sid]['name'],
+            'team': players[sid]['team'],
+            'score': players[sid]['score']
+        } for sid in chunk if sid in players],
+        'page': page,
+        'pages': pages,
+        'total': total
+    }
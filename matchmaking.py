@@ -0,0 +1,108 @@
+"""
+подбор соперников для публичных игр
+очередь на каждую (тема, сложность, режим) разбита на корзины по рейтингу; встать и выйти из очереди - O(1)
+окно поиска расширяется на соседние корзины по мере ожидания, тик смотрит только головы корзин,
+поэтому его цена не зависит от того, сколько людей стоит в очереди
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# игрок в очереди
+Ticket = namedtuple('Ticket', 'sid user_id rating since')
+
+
+class Matchmaker:
+    """очереди по ключу (тема, сложность, режим) и корзинам рейтинга"""
+
+    def __init__(self, room_size=8, min_players=2, bucket_width=100, widen_every=5, max_widen=5, timeout=30,
+                 rooms_per_tick=100):
+        self.room_size = room_size
+        self.min_players = min_players
+        self.bucket_width = bucket_width
+        # каждые widen_every секунд ожидания окно растет на корзину в обе стороны, но не больше max_widen
+        self.widen_every = widen_every
+        self.max_widen = max_widen
+        # столько ждем полную комнату, потом играем тем составом, что набрался
+        self.timeout = timeout
+        # потолок комнат за тик: при наплыве остальные соберутся на следующих тиках, тик не растягивается
+        self.rooms_per_tick = rooms_per_tick
+        self._queues = {}  # ключ -> {корзина: OrderedDict sid -> Ticket}
+        self._where = {}   # sid -> (ключ, корзина)
+        self._lock = threading.Lock()
+
+    def enqueue(self, sid, key, rating, user_id=None, now=None):
+        """встать в очередь (повторный вызов переставляет игрока в новую очередь)"""
+        now = time.monotonic() if now is None else now
+        bucket = int(rating) // self.bucket_width
+        with self._lock:
+            self._remove(sid)
+            buckets = self._queues.setdefault(key, {})
+            buckets.setdefault(bucket, OrderedDict())[sid] = Ticket(sid, user_id, rating, now)
+            self._where[sid] = (key, bucket)
+
+    def cancel(self, sid):
+        """выйти из очереди; True если игрок в ней был"""
+        with self._lock:
+            return self._remove(sid)
+
+    def waiting(self, key=None):
+        """сколько игроков ждет (всего или в одной очереди)"""
+        with self._lock:
+            if key is None:
+                return len(self._where)
+            return sum(len(q) for q in self._queues.get(key, {}).values())
+
+    def tick(self, now=None):
+        """сбор комнат: список (ключ, [Ticket]) для полных комнат и для тех, кто ждал дольше timeout"""
+        now = time.monotonic() if now is None else now
+        matches = []
+        with self._lock:
+            for key, buckets in list(self._queues.items()):
+                for bucket in sorted(buckets):
+                    while bucket in buckets and len(matches) < self.rooms_per_tick:
+                        group = self._collect(buckets, bucket, now)
+                        if group is None:
+                            break
+                        for ticket in group:
+                            self._remove(ticket.sid)
+                        matches.append((key, group))
+                if not buckets:
+                    del self._queues[key]
+        return matches
+
+    def _collect(self, buckets, bucket, now):
+        """состав комнаты вокруг самого давнего игрока корзины или None, если пока рано"""
+        head = next(iter(buckets[bucket].values()))
+        waited = now - head.since
+        widen = min(self.max_widen, int(waited // self.widen_every))
+
+        # своя корзина, потом соседние по удаленности; из каждой берем не больше, чем нужно
+        group = []
+        for distance in range(widen + 1):
+            for b in ((bucket,) if distance == 0 else (bucket - distance, bucket + distance)):
+                queue = buckets.get(b)
+                if not queue:
+                    continue
+                for ticket in queue.values():
+                    if len(group) == self.room_size:
+                        return group
+                    group.append(ticket)
+        if len(group) == self.room_size:
+            return group
+        if waited >= self.timeout and len(group) >= self.min_players:
+            return group
+        return None
+
+    def _remove(self, sid):
+        place = self._where.pop(sid, None)
+        if place is None:
+            return False
+        key, bucket = place
+        buckets = self._queues[key]
+        queue = buckets[bucket]
+        del queue[sid]
+        if not queue:
+            del buckets[bucket]
+        return True
@@ -0,0 +1,28 @@
+"""
+метрики приложения
+простые потокобезопасные счетчики в памяти, отдаются через /api/metrics
+"""
+
+import threading
+from collections import defaultdict
+
+_counters = defaultdict(int)
+_lock = threading.Lock()
+
+
+def inc(name, value=1):
+    """увеличение счетчика"""
+    with _lock:
+        _counters[name] += value
+
+
+def get(name):
+    """текущее значение счетчика"""
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot():
+    """копия всех счетчиков"""
+    with _lock:
+        return dict(_counters)
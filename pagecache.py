@@ -0,0 +1,88 @@
+"""
+двухуровневый кэш страниц и api
+первый уровень - lru в памяти процесса, второй - общий кэш flask-caching (redis и т.п.), если настроен
+записи помечаются тегом, invalidate(тег) сбрасывает все записи тега на обоих уровнях
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+
+
+class TwoTierCache:
+    """lru в памяти + необязательный общий кэш, инвалидация по тегам"""
+
+    def __init__(self, shared=None, max_items=1024, local_ttl=30.0, shared_ttl=300):
+        self.shared = shared
+        self.max_items = max_items
+        # локальная копия живет недолго: другой процесс мог сбросить тег в общем кэше
+        self.local_ttl = local_ttl if shared is not None else shared_ttl
+        self.shared_ttl = shared_ttl
+        self._items = OrderedDict()  # (тег, ключ) -> (истекает, значение)
+        self._lock = threading.Lock()
+
+    def get(self, tag, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get((tag, key))
+            if item is not None:
+                if item[0] > now:
+                    self._items.move_to_end((tag, key))
+                    return item[1]
+                del self._items[(tag, key)]
+
+        if self.shared is None:
+            return None
+        value = self.shared.get(self._shared_key(tag, key))
+        if value is not None:
+            self._put_local(tag, key, value)
+        return value
+
+    def set(self, tag, key, value):
+        self._put_local(tag, key, value)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(tag, key), value, timeout=self.shared_ttl)
+
+    def invalidate(self, *tags):
+        """сброс всех записей с этими тегами"""
+        tags = set(tags)
+        with self._lock:
+            for full_key in [k for k in self._items if k[0] in tags]:
+                del self._items[full_key]
+
+        if self.shared is not None:
+            # старые записи в общем кэше не ищем, а уводим из-под ключей сменой поколения тега
+            for tag in tags:
+                self.shared.set(f'gen:{tag}', time.time_ns(), timeout=0)
+
+    def _put_local(self, tag, key, value):
+        with self._lock:
+            self._items[(tag, key)] = (time.monotonic() + self.local_ttl, value)
+            self._items.move_to_end((tag, key))
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def _shared_key(self, tag, key):
+        generation = self.shared.get(f'gen:{tag}') or 0
+        return f'{tag}:{generation}:{key}'
+
+
+def make_etag(body):
+    """etag по содержимому ответа"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def conditional_response(app, body, etag, content_type='text/html; charset=utf-8', private=False):
+    """ответ с etag: если у браузера та же версия - 304 без тела"""
+    response = app.response_class(body, content_type=content_type)
+    response.set_etag(etag)
+    # браузер хранит копию, но каждый раз сверяется с сервером
+    response.headers['Cache-Control'] = ('private' if private else 'public') + ', no-cache'
+    if private:
+        response.vary.add('Cookie')
+    return response.make_conditional(request)
@@ -0,0 +1,123 @@
+"""
+хеширование паролей в отдельных процессах
+bcrypt специально медленный: в потоке запроса он держит gil и тормозит обработку ответов в живых играх
+очередь ограничена - при наплыве входов лишние запросы получают отказ, а не копятся
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as ResultTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+# стоимость bcrypt (2^rounds итераций); при смене старые хеши пересчитываются при входе
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+
+# процессы для хеширования и сколько задач может ждать в очереди
+PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get('PASSWORD_QUEUE_LIMIT', str(PASSWORD_WORKERS * 16)))
+
+# сколько ждем результат, прежде чем считать пул перегруженным
+PASSWORD_TIMEOUT = float(os.environ.get('PASSWORD_TIMEOUT', '10'))
+
+# bcrypt учитывает только первые 72 байта пароля
+_MAX_PASSWORD_BYTES = 72
+
+
+class HasherBusy(Exception):
+    """очередь хеширования переполнена - клиенту стоит повторить позже"""
+
+    def __init__(self, retry_after=2):
+        super().__init__('очередь хеширования паролей переполнена')
+        self.retry_after = retry_after
+
+
+def _encode(password):
+    return password.encode('utf-8')[:_MAX_PASSWORD_BYTES]
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, password_hash):
+    try:
+        return bcrypt.checkpw(_encode(password), password_hash.encode('utf-8'))
+    except ValueError:
+        # битый или не-bcrypt хеш
+        return False
+
+
+def hash_rounds(password_hash):
+    """стоимость, с которой посчитан хеш ($2b$12$...)"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """пул процессов с ограниченной очередью"""
+
+    def __init__(self, workers=PASSWORD_WORKERS, queue_limit=PASSWORD_QUEUE_LIMIT,
+                 rounds=BCRYPT_ROUNDS, timeout=PASSWORD_TIMEOUT):
+        self.workers = workers
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def start(self):
+        """запуск процессов заранее, чтобы первый вход не ждал их старта"""
+        self._submit(_hash, '', 4)
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def hash(self, password):
+        return self._submit(_hash, password, self.rounds)
+
+    def check(self, password, password_hash):
+        return self._submit(_check, password, password_hash)
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self.shutdown()
+            raise HasherBusy()
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            # поток запроса просто ждет, gil свободен для остальных
+            return future.result(timeout=self.timeout)
+        except ResultTimeout:
+            raise HasherBusy()
+        except BrokenProcessPool:
+            # упавший процесс ломает весь пул - следующий запрос поднимет новый
+            self.shutdown()
+            raise HasherBusy()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn: форк процесса с потоками сервера может зависнуть на чужих блокировках
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
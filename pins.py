@@ -0,0 +1,99 @@
+"""
+выдача пин-кодов комнат
+пин - перестановка номера игры (feistel по ключу): номера идут подряд, пины выглядят случайными
+и не повторяются, пока не кончится пространство 36^6; ни повторных попыток, ни общей блокировки
+номера процесс берет блоками из общего счетчика (в бд), поэтому у нескольких процессов они не совпадают
+"""
+
+import hashlib
+import itertools
+import string
+import threading
+
+PIN_ALPHABET = string.ascii_uppercase + string.digits
+PIN_LENGTH = 6
+PIN_SPACE = len(PIN_ALPHABET) ** PIN_LENGTH
+
+# feistel на 32 битах (36^6 < 2^32), лишние значения отбрасываются повторным шифрованием
+_HALF_BITS = 16
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_ROUNDS = 4
+
+# номеров игр за одно обращение к общему счетчику
+ID_BLOCK = 100
+
+
+class MemoryCounter:
+    """общий счетчик в памяти процесса (один процесс, тесты): counter(n) -> первый номер блока из n"""
+
+    def __init__(self, start=1):
+        self.next = start
+        self._lock = threading.Lock()
+
+    def __call__(self, count):
+        with self._lock:
+            start = self.next
+            self.next += count
+            return start
+
+
+class PinAllocator:
+    """номер игры из блока общего счетчика -> пин через перестановку"""
+
+    def __init__(self, key, reserve=None, block=ID_BLOCK):
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        # ключи раундов из секрета: без него по пину не восстановить номер и не угадать следующий
+        digest = hashlib.blake2b(key, digest_size=8 * _ROUNDS, person=b'quizbattle-pin').digest()
+        self._round_keys = [int.from_bytes(digest[i * 8:(i + 1) * 8], 'little') | 1 for i in range(_ROUNDS)]
+        # reserve(n) -> первый номер свежего блока из n номеров, общий для всех процессов
+        self._reserve = reserve or MemoryCounter()
+        self._block_size = block
+        self._lock = threading.Lock()
+        self.reset()
+
+    def allocate(self):
+        """(номер игры, пин); next() у itertools.count атомарен под gil, лок - только когда блок кончился"""
+        while True:
+            counter, end = block = self._block
+            game_id = next(counter)
+            if game_id < end:
+                return game_id, self.pin_for(game_id)
+            with self._lock:
+                if self._block is block:
+                    start = self._reserve(self._block_size)
+                    self._block = (itertools.count(start), start + self._block_size)
+
+    def reset(self):
+        """бросить текущий блок: следующий номер возьмется из общего счетчика (например, после его сдвига)"""
+        self._block = (itertools.count(0), 0)
+
+    def pin_for(self, game_id):
+        value = self._permute(game_id % PIN_SPACE)
+        chars = []
+        for _ in range(PIN_LENGTH):
+            value, digit = divmod(value, len(PIN_ALPHABET))
+            chars.append(PIN_ALPHABET[digit])
+        return ''.join(reversed(chars))
+
+    def _permute(self, value):
+        # cycle walking: перестановка 2^32 значений, сужение до PIN_SPACE (в среднем < 2 шагов)
+        while True:
+            value = self._feistel(value)
+            if value < PIN_SPACE:
+                return value
+
+    def _feistel(self, value):
+        left, right = value >> _HALF_BITS, value & _HALF_MASK
+        for round_key in self._round_keys:
+            left, right = right, left ^ _mix(right, round_key)
+        return (left << _HALF_BITS) | right
+
+
+def _mix(value, round_key):
+    """функция раунда: перемешивание 16 бит с ключом (умножение и сдвиги, как в хешах murmur)"""
+    h = (value * round_key + (round_key >> 32)) & 0xFFFFFFFF
+    h ^= h >> 15
+    h = (h * 0x2C1B3C6D) & 0xFFFFFFFF
+    h ^= h >> 12
+    return h & _HALF_MASK
@@ -0,0 +1,104 @@
+"""
+сэмплирующий профайлер по запросу
+фоновый поток раз в interval снимает стеки потоков (sys._current_frames) в течение ограниченного окна,
+стек подписывается socket.io событием и пин-кодом игры, которые сейчас обрабатывает поток
+результат - collapsed stacks (flamegraph.pl, speedscope); выключенный профайлер стоит одной проверки флага
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# частота снимков (секунды) и потолок окна
+PROFILE_INTERVAL = 0.01
+MAX_PROFILE_SECONDS = 60
+
+
+class SamplingProfiler:
+    """один запуск за раз; active читается в горячем пути без блокировок"""
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.active = False
+        self._context = {}  # ident потока -> 'event:...;pin:...'
+        self._labels = {}   # code -> 'функция (файл:строка)'
+        self._lock = threading.Lock()
+
+    def context(self, event, pin=None):
+        """подпись стеков потока на время обработки события: with profiler.context(...) (вызывать только при active)"""
+        pin = str(pin)[:16] if pin else '-'
+        if ';' in pin or ' ' in pin:
+            # пин приходит от клиента: разделители формата из него убираем
+            pin = pin.replace(';', '_').replace(' ', '_')
+        return _Tag(self._context, f'event:{event};pin:{pin}')
+
+    def run(self, seconds, all_threads=False):
+        """профилирование окна seconds в вызывающем потоке; None, если уже идет другой запуск
+
+        all_threads - снимать и потоки вне событий (таймеры, планировщик), с подписью thread:<имя>"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            self.active = True
+            counts = Counter()
+            me = threading.get_ident()
+            deadline = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+            names = {}
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    prefix = self._context.get(ident)
+                    if prefix is None:
+                        if not all_threads:
+                            continue
+                        if ident not in names:
+                            names = {t.ident: t.name for t in threading.enumerate()}
+                        prefix = f'thread:{names.get(ident, ident)}'
+                    counts[prefix + ';' + self._stack(frame)] += 1
+                time.sleep(self.interval)
+            return counts
+        finally:
+            self.active = False
+            self._context.clear()
+            self._lock.release()
+
+    def _stack(self, frame):
+        """стек от корня к листу через ';'"""
+        labels = self._labels
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            stack.append(label)
+            frame = frame.f_back
+        stack.reverse()
+        return ';'.join(stack)
+
+
+class _Tag:
+    """подпись потока на время блока with"""
+    __slots__ = ('tags', 'label', 'ident')
+
+    def __init__(self, tags, label):
+        self.tags = tags
+        self.label = label
+
+    def __enter__(self):
+        self.ident = threading.get_ident()
+        self.tags[self.ident] = self.label
+
+    def __exit__(self, *exc):
+        self.tags.pop(self.ident, None)
+
+
+def collapsed(counts, pin=None):
+    """текст collapsed stacks: 'кадр;кадр;... число' на строку, частые сверху; pin - только одна игра"""
+    marker = f';pin:{pin};' if pin else None
+    lines = [f'{stack} {n}' for stack, n in counts.most_common()
+             if marker is None or marker in f';{stack}']
+    return '\n'.join(lines) + '\n' if lines else ''
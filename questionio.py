@@ -0,0 +1,137 @@
+"""
+импорт и экспорт вопросов файлами jsonl и csv
+чтение и запись потоковые: файл любого размера идет строка за строкой, в памяти - только текущая порция
+строка jsonl: {"topic", "difficulty", "question", "options": [4 варианта], "correct": 0..3}
+csv: те же поля, варианты - колонками option_1..option_4
+"""
+
+import csv
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+FORMATS = ('jsonl', 'csv')
+CSV_FIELDS = ('topic', 'difficulty', 'question', 'option_1', 'option_2', 'option_3', 'option_4', 'correct')
+# колонки Question в том же порядке (выборка для экспорта)
+COLUMNS = ('topic', 'difficulty', 'question_text', 'option_1', 'option_2', 'option_3', 'option_4', 'correct_answer')
+DIFFICULTIES = ('easy', 'medium', 'hard')
+_DIFFICULTIES = frozenset(DIFFICULTIES)
+
+# ограничения колонок Question
+MAX_TOPIC = 50
+MAX_OPTION = 200
+
+
+def detect_format(path, fmt=None):
+    """формат по параметру или расширению файла (stdin/stdout - jsonl)"""
+    if fmt:
+        return fmt
+    if path == '-':
+        return 'jsonl'
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    return 'jsonl' if ext in ('jsonl', 'ndjson', 'json') else 'csv' if ext == 'csv' else None
+
+
+@contextmanager
+def open_file(path, mode='r'):
+    """файл вопросов или stdin/stdout для '-' (csv требует newline='')"""
+    if path == '-':
+        yield sys.stdin if mode == 'r' else sys.stdout
+        return
+    with open(path, mode, encoding='utf-8', newline='') as f:
+        yield f
+
+
+def validate(data, topics=None):
+    """строка файла -> (кортеж колонок в порядке COLUMNS, None) или (None, текст ошибки)
+    строк сотни тысяч: проверки без копий строк (strip только у того, что пишем в бд)"""
+    if type(data) is not dict:
+        return None, 'ожидался объект'
+    topic = data.get('topic')
+    if type(topic) is not str or not topic or topic.isspace() or len(topic) > MAX_TOPIC:
+        return None, 'пустая или слишком длинная тема'
+    topic = topic.strip()
+    if topics is not None and topic not in topics:
+        return None, f'неизвестная тема {topic!r}'
+    difficulty = data.get('difficulty') or 'medium'
+    if type(difficulty) is not str or difficulty not in _DIFFICULTIES:
+        return None, f'неизвестная сложность {difficulty!r}'
+    text = data.get('question')
+    if type(text) is not str or not text or text.isspace():
+        return None, 'пустой вопрос'
+    options = data.get('options')
+    if type(options) is not list or len(options) != 4:
+        return None, 'нужно ровно 4 варианта'
+    for option in options:
+        if type(option) is not str or not option or option.isspace() or len(option) > MAX_OPTION:
+            return None, 'пустой или слишком длинный вариант'
+    correct = data.get('correct')
+    if type(correct) is not int:
+        if type(correct) is str and correct.isdigit():
+            correct = int(correct)
+        else:
+            return None, 'правильный ответ - номер варианта 0..3'
+    if not 0 <= correct <= 3:
+        return None, 'правильный ответ - номер варианта 0..3'
+    return (topic, difficulty, text.strip(), *options, correct), None
+
+
+def read_questions(f, fmt, topics=None):
+    """поток (номер строки, кортеж колонок или None, ошибка или None) из открытого текстового файла"""
+    if topics is not None:
+        topics = frozenset(topics)
+    if fmt == 'jsonl':
+        # raw_decode без обертки json.loads (на каждой строке она заметна); хвост после объекта - только пробелы
+        decode, loads = json.JSONDecoder().raw_decode, json.loads
+        for line_no, line in enumerate(f, 1):
+            try:
+                data, end = decode(line)
+                if end != len(line) and not line[end:].isspace():
+                    raise ValueError('лишнее после объекта')
+            except ValueError:
+                if not line or line.isspace():
+                    continue
+                try:
+                    # пробелы в начале строки raw_decode не пропускает
+                    data = loads(line)
+                except ValueError:
+                    yield line_no, None, 'не json'
+                    continue
+            row, error = validate(data, topics)
+            yield line_no, row, error
+    elif fmt == 'csv':
+        reader = csv.DictReader(f)
+        for data in reader:
+            data['options'] = [data.pop(f'option_{i}', None) for i in range(1, 5)]
+            row, error = validate(data, topics)
+            yield reader.line_num, row, error
+    else:
+        raise ValueError(f'неизвестный формат {fmt}')
+
+
+def write_questions(f, fmt, rows):
+    """запись кортежей в порядке COLUMNS в открытый текстовый файл; возвращает число вопросов"""
+    count = 0
+    if fmt == 'jsonl':
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        write = f.write
+        for topic, difficulty, text, option_1, option_2, option_3, option_4, correct in rows:
+            write(encode({
+                'topic': topic,
+                'difficulty': difficulty,
+                'question': text,
+                'options': [option_1, option_2, option_3, option_4],
+                'correct': correct
+            }) + '\n')
+            count += 1
+    elif fmt == 'csv':
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        # колонки выборки идут в порядке CSV_FIELDS
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        raise ValueError(f'неизвестный формат {fmt}')
+    return count
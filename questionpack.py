@@ -0,0 +1,177 @@
+"""
+пакет вопросов для офлайн-игры
+бинарный файл только для чтения: заголовок, таблица разделов (тема, сложность), смещения вопросов и сами вопросы
+файл отображается в память, вопрос декодируется только когда попал в выборку
+id вопросов пакета отрицательные (см. pack_question_id): с вопросами локальной бд они не пересекаются
+"""
+
+import mmap
+import os
+import random
+import struct
+
+PACK_MAGIC = b'QBP1'
+PACK_VERSION = 1
+
+# заголовок: магия, версия, число разделов, число вопросов
+_HEADER = struct.Struct('<4sHHI')
+# раздел: тема, сложность, номер первого вопроса, сколько вопросов
+_SECTION = struct.Struct('<64s16sII')
+# смещение вопроса от начала файла
+_OFFSET = struct.Struct('<I')
+# вопрос: id в бд, индекс правильного ответа, дальше 5 строк (вопрос и 4 варианта)
+_RECORD = struct.Struct('<IB')
+_STR_LEN = struct.Struct('<H')
+
+
+def pack_question_id(source_id):
+    """id вопроса пакета в игре по его id в бд, из которой собран пакет
+    у локальной бд свои id с 1, поэтому пакет берет отрицательные; -1 в журнале событий - "нет вопроса"
+    """
+    return -1 - source_id if source_id else None
+
+
+def _fixed(text, size):
+    data = text.encode('utf-8')
+    if len(data) > size:
+        raise ValueError(f'слишком длинное имя раздела: {text}')
+    return data
+
+
+def write_pack(path, questions):
+    """запись пакета; questions - словари как Question.to_dict() плюс 'topic'"""
+    sections = {}
+    for q in questions:
+        sections.setdefault((q['topic'], q['difficulty'] or 'medium'), []).append(q)
+
+    ordered = sorted(sections.items())
+    total = sum(len(items) for _, items in ordered)
+
+    records = []
+    section_rows = []
+    for (topic, difficulty), items in ordered:
+        section_rows.append(_SECTION.pack(_fixed(topic, 64), _fixed(difficulty, 16), len(records), len(items)))
+        for q in items:
+            parts = [_RECORD.pack(q['id'] or 0, q['correct'])]
+            for text in [q['question'], *q['options']]:
+                data = text.encode('utf-8')
+                parts.append(_STR_LEN.pack(len(data)) + data)
+            records.append(b''.join(parts))
+
+    # вопросы начинаются сразу за таблицей смещений (в ней total + 1 элемент - конец последнего)
+    data_start = _HEADER.size + _SECTION.size * len(ordered) + _OFFSET.size * (total + 1)
+    offsets = []
+    pos = data_start
+    for record in records:
+        offsets.append(pos)
+        pos += len(record)
+    offsets.append(pos)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(ordered), total))
+        f.write(b''.join(section_rows))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        f.write(b''.join(records))
+    os.replace(tmp_path, path)
+    return total
+
+
+class QuestionPack:
+    """пакет вопросов, отображенный в память"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, section_count, self.total = _HEADER.unpack_from(self._mm, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f'{path}: не пакет вопросов или неизвестная версия')
+
+        # (тема, сложность) -> (первый вопрос, количество)
+        self.sections = {}
+        pos = _HEADER.size
+        for _ in range(section_count):
+            topic, difficulty, first, count = _SECTION.unpack_from(self._mm, pos)
+            key = (topic.rstrip(b'\0').decode('utf-8'), difficulty.rstrip(b'\0').decode('utf-8'))
+            self.sections[key] = (first, count)
+            pos += _SECTION.size
+        self._offsets_pos = pos
+
+    @classmethod
+    def open_optional(cls, path):
+        """пакет, если файл есть, иначе None"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"[!] пакет вопросов {path} не загружен: {e}")
+            return None
+
+    def __len__(self):
+        return self.total
+
+    def count(self, topic, difficulty=None):
+        return sum(count for _, count in self._ranges(topic, difficulty))
+
+    def sample(self, topic, count, difficulty=None, exclude=(), texts=()):
+        """случайные вопросы темы (difficulty None или 'mixed' - любая сложность)
+        exclude - id пропускаемых вопросов пакета (списанные), texts - тексты уже выбранных вопросов"""
+        indices = [i for first, n in self._ranges(topic, difficulty) for i in range(first, first + n)]
+        picked = []
+        for idx in random.sample(indices, len(indices)):
+            if len(picked) >= count:
+                break
+            question = self.question(idx)
+            if question['id'] not in exclude and question['question'] not in texts:
+                picked.append(question)
+        return picked
+
+    def question(self, idx):
+        """вопрос по номеру в пакете"""
+        pos = _OFFSET.unpack_from(self._mm, self._offsets_pos + idx * _OFFSET.size)[0]
+        question_id, correct = _RECORD.unpack_from(self._mm, pos)
+        pos += _RECORD.size
+
+        texts = []
+        for _ in range(5):
+            (size,) = _STR_LEN.unpack_from(self._mm, pos)
+            pos += _STR_LEN.size
+            texts.append(self._mm[pos:pos + size].decode('utf-8'))
+            pos += size
+
+        return {
+            'id': pack_question_id(question_id),
+            'question': texts[0],
+            'options': texts[1:],
+            'correct': correct,
+            'difficulty': self._difficulty_of(idx)
+        }
+
+    def find(self, ids):
+        """вопросы пакета по id (проход по всему пакету - для команд, не для игры)"""
+        ids = set(ids)
+        found = {}
+        if ids:
+            for idx in range(self.total):
+                question = self.question(idx)
+                if question['id'] in ids:
+                    found[question['id']] = question
+        return found
+
+    def close(self):
+        self._mm.close()
+
+    def _ranges(self, topic, difficulty):
+        if difficulty and difficulty != 'mixed':
+            found = self.sections.get((topic, difficulty))
+            return [found] if found else []
+        return [rng for (t, _), rng in self.sections.items() if t == topic]
+
+    def _difficulty_of(self, idx):
+        for (_, difficulty), (first, count) in self.sections.items():
+            if first <= idx < first + count:
+                return difficulty
+        return 'medium'
@@ -0,0 +1,136 @@
+"""
+статистика вопросов: сколько раз показан, как часто отвечают верно, какие варианты выбирают и как быстро
+счетчики копятся в памяти на каждый ответ, в бд уходят редкими пакетными upsert
+по накопленному можно пересчитать сложность вопроса и убрать плохие
+"""
+
+import threading
+
+# верхние границы корзин времени ответа (секунды), последняя корзина - всё что дольше
+TIME_BUCKETS = (1, 2, 3, 5, 8, 12, 20)
+
+OPTIONS = 4
+PICK_COLUMNS = tuple(f'picks_{i}' for i in range(OPTIONS))
+TIME_COLUMNS = tuple(f'time_b{i}' for i in range(len(TIME_BUCKETS) + 1))
+
+# порядок счетчиков в строке агрегатора (совпадает с колонками QuestionStats)
+COUNTERS = ('shown', 'answered', 'correct') + PICK_COLUMNS + ('time_total',) + TIME_COLUMNS
+_SHOWN, _ANSWERED, _CORRECT = 0, 1, 2
+_PICKS = 3
+_TIME_TOTAL = _PICKS + OPTIONS
+_TIME_BUCKET = _TIME_TOTAL + 1
+
+# меньше ответов - выводов о вопросе не делаем
+MIN_ANSWERS = 30
+
+# доля верных ответов для меток сложности
+EASY_RATE = 0.75
+HARD_RATE = 0.4
+
+# плохой вопрос: почти никто не отвечает верно или неверный вариант выбирают чаще правильного
+BAD_RATE = 0.1
+DISTRACTOR_FACTOR = 1.5
+
+
+def time_bucket(response_time):
+    for i, bound in enumerate(TIME_BUCKETS):
+        if response_time < bound:
+            return i
+    return len(TIME_BUCKETS)
+
+
+class QuestionStatsAggregator:
+    """счетчики по id вопроса до следующего сброса в бд"""
+
+    def __init__(self):
+        self._rows = {}  # question_id -> [счетчики в порядке COUNTERS]
+        self._lock = threading.Lock()
+
+    def _row(self, question_id):
+        row = self._rows.get(question_id)
+        if row is None:
+            row = self._rows[question_id] = [0] * len(COUNTERS)
+        return row
+
+    def shown(self, question_id):
+        """вопрос отыгран в раунде"""
+        if question_id is None:
+            return
+        with self._lock:
+            self._row(question_id)[_SHOWN] += 1
+
+    def answer(self, question_id, option, is_correct, response_time):
+        """один ответ; option - номер варианта 0..3 или -1, если клиент прислал мусор"""
+        if question_id is None:
+            return
+        with self._lock:
+            row = self._row(question_id)
+            row[_ANSWERED] += 1
+            if is_correct:
+                row[_CORRECT] += 1
+            if 0 <= option < OPTIONS:
+                row[_PICKS + option] += 1
+            row[_TIME_TOTAL] += response_time
+            row[_TIME_BUCKET + time_bucket(response_time)] += 1
+
+    def drain(self):
+        """накопленное строками для upsert (question_id + COUNTERS), счетчики обнуляются"""
+        with self._lock:
+            rows, self._rows = self._rows, {}
+        return [{'question_id': question_id, **dict(zip(COUNTERS, row))} for question_id, row in rows.items()]
+
+    def merge(self, rows):
+        """вернуть несброшенное обратно (бд была недоступна)"""
+        with self._lock:
+            for data in rows:
+                row = self._row(data['question_id'])
+                for i, name in enumerate(COUNTERS):
+                    row[i] += data[name]
+
+    def __len__(self):
+        return len(self._rows)
+
+
+# ==================== ВЫВОДЫ ====================
+
+def correct_rate(stats):
+    return stats['correct'] / stats['answered'] if stats['answered'] else None
+
+
+def time_quantile(stats, q):
+    """оценка квантиля времени ответа по корзинам (верхняя граница корзины)"""
+    counts = [stats[name] for name in TIME_COLUMNS]
+    total = sum(counts)
+    if not total:
+        return None
+    need = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        seen += count
+        if seen >= need:
+            return TIME_BUCKETS[i] if i < len(TIME_BUCKETS) else float('inf')
+    return float('inf')
+
+
+def suggest_difficulty(stats):
+    """метка сложности по доле верных ответов (None - мало данных)"""
+    if stats['answered'] < MIN_ANSWERS:
+        return None
+    rate = correct_rate(stats)
+    if rate >= EASY_RATE:
+        return 'easy'
+    if rate <= HARD_RATE:
+        return 'hard'
+    return 'medium'
+
+
+def is_bad(stats, correct_option):
+    """вопрос стоит убрать: правильный ответ почти не выбирают или популярнее неверный вариант"""
+    if stats['answered'] < MIN_ANSWERS:
+        return False
+    if correct_rate(stats) < BAD_RATE:
+        return True
+    picks = [stats[name] for name in PICK_COLUMNS]
+    right = picks[correct_option] if 0 <= correct_option < OPTIONS else 0
+    wrong = max(p for i, p in enumerate(picks) if i != correct_option)
+    return wrong > DISTRACTOR_FACTOR * right
@@ -0,0 +1,73 @@
+"""
+ограничение частоты socket.io событий
+token bucket на каждое соединение (sid) и на каждый ip, бюджеты задаются по событиям
+проверка - пара обращений к словарю и арифметика, без бд
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+# rate - событий в секунду, burst - сколько можно подряд; ip_* - то же на весь ip (None - без лимита по ip)
+Budget = namedtuple('Budget', 'rate burst ip_rate ip_burst')
+
+
+class RateLimiter:
+    """token bucket по sid и по ip"""
+
+    def __init__(self, budgets, default=None):
+        self.budgets = budgets
+        self.default = default
+        self._by_sid = {}  # sid -> {событие: [токены, время]}
+        self._by_ip = {}   # ip -> {событие: [токены, время]}
+        self._lock = threading.Lock()
+
+    def allow(self, event, sid, ip, now=None):
+        """можно ли обработать событие; если да - списываем токен"""
+        budget = self.budgets.get(event, self.default)
+        if budget is None:
+            return True
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            sid_bucket = self._refill(self._by_sid, sid, event, budget.rate, budget.burst, now)
+            if sid_bucket[0] < 1:
+                return False
+
+            ip_bucket = None
+            if budget.ip_rate is not None and ip:
+                ip_bucket = self._refill(self._by_ip, ip, event, budget.ip_rate, budget.ip_burst, now)
+                if ip_bucket[0] < 1:
+                    return False
+                ip_bucket[0] -= 1
+            sid_bucket[0] -= 1
+            return True
+
+    def forget(self, sid):
+        """соединение закрыто - его корзины больше не нужны"""
+        with self._lock:
+            self._by_sid.pop(sid, None)
+
+    def prune(self, idle=300, now=None):
+        """удаление корзин ip, которые давно не трогали (полные корзины ничего не ограничивают)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for table in (self._by_ip, self._by_sid):
+                stale = [key for key, buckets in table.items()
+                         if all(now - stamp > idle for _, stamp in buckets.values())]
+                for key in stale:
+                    del table[key]
+            return len(self._by_sid), len(self._by_ip)
+
+    @staticmethod
+    def _refill(table, key, event, rate, burst, now):
+        buckets = table.get(key)
+        if buckets is None:
+            buckets = table[key] = {}
+        bucket = buckets.get(event)
+        if bucket is None:
+            bucket = buckets[event] = [float(burst), now]
+            return bucket
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        return bucket
@@ -0,0 +1,240 @@
+"""
+рейтинговый движок
+ffa раскладывается на попарные матчи, команды играют как два составных игрока
+поддерживает elo и glicko-2, одна и та же функция используется вживую и при пересчете всей истории
+"""
+
+import math
+import os
+
+from startup import lazy_import
+
+# numpy грузится при первой игре, а не при старте сервера
+np = lazy_import('numpy')
+
+# какая система используется для рейтинга: elo или glicko2
+RATING_SYSTEM = os.environ.get('RATING_SYSTEM', 'elo')
+
+# коэффициент K для elo
+ELO_K = float(os.environ.get('ELO_K', '32'))
+
+# стартовые значения для гостей и новичков
+DEFAULT_RATING = 1000
+DEFAULT_RD = 350.0
+DEFAULT_VOL = 0.06
+
+# ограничение изменчивости волатильности в glicko-2
+GLICKO_TAU = float(os.environ.get('GLICKO_TAU', '0.5'))
+
+# минимальный рейтинг
+MIN_RATING = 100
+
+# перевод между шкалой рейтинга и внутренней шкалой glicko-2
+_GLICKO_SCALE = 173.7178
+_GLICKO_EPS = 1e-6
+
+
+# ==================== ELO ====================
+
+def expected_scores(ratings):
+    """сумма ожидаемых результатов каждого игрока против всех остальных"""
+    # 1 / (1 + 10^((rj - ri) / 400)) == qi / (qi + qj), где q = 10^(r / 400)
+    strength = np.power(10.0, (ratings - ratings.mean()) / 400.0)
+    pairwise = strength[:, None] / (strength[:, None] + strength[None, :])
+    # на диагонали стоит 0.5 - матч игрока с самим собой не считаем
+    return pairwise.sum(axis=1) - 0.5
+
+
+def actual_scores(scores):
+    """сумма попарных результатов по очкам: победа 1, ничья 0.5"""
+    ordered = np.sort(scores)
+    below = np.searchsorted(ordered, scores, side='left')
+    equal = np.searchsorted(ordered, scores, side='right') - below
+    return below + 0.5 * (equal - 1)
+
+
+def elo_deltas_ffa(ratings, scores, k=ELO_K):
+    """ffa как набор попарных матчей: каждый с каждым, результат по очкам"""
+    ratings = np.asarray(ratings, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(ratings)
+    if n < 2:
+        return np.zeros(n)
+
+    # k делим на число соперников, чтобы размер комнаты не разгонял рейтинг
+    return k / (n - 1) * (actual_scores(scores) - expected_scores(ratings))
+
+
+def elo_deltas_teams(ratings, teams, team_scores, k=ELO_K):
+    """командный матч: рейтинг команды - средний, изменение одинаково для всех её игроков"""
+    ratings = np.asarray(ratings, dtype=np.float64)
+    teams = np.asarray(teams)
+    deltas = np.zeros(len(ratings))
+
+    mask_a = teams == 'A'
+    mask_b = teams == 'B'
+    if not mask_a.any() or not mask_b.any():
+        return deltas
+
+    r_a = ratings[mask_a].mean()
+    r_b = ratings[mask_b].mean()
+    expected_a = 1.0 / (1.0 + 10.0 ** ((r_b - r_a) / 400.0))
+    actual_a = (np.sign(team_scores['A'] - team_scores['B']) + 1.0) / 2.0
+
+    deltas[mask_a] = k * (actual_a - expected_a)
+    deltas[mask_b] = k * ((1.0 - actual_a) - (1.0 - expected_a))
+    return deltas
+
+
+# ==================== GLICKO-2 ====================
+
+def _glicko2_terms(mu, opp_mu, opp_phi, results):
+    """дисперсия v и сумма улучшений по матчам; массивы вида (игроки, соперники)"""
+    g = 1.0 / np.sqrt(1.0 + 3.0 * opp_phi ** 2 / math.pi ** 2)
+    expected = 1.0 / (1.0 + np.exp(-g * (mu[:, None] - opp_mu)))
+    v = 1.0 / np.sum(g ** 2 * expected * (1.0 - expected), axis=1)
+    improvement = np.sum(g * (results - expected), axis=1)
+    return v, improvement
+
+
+def _glicko2_step(mu, phi, vol, v, improvement, tau):
+    """новые mu, phi, vol одного игрока (скалярная часть, чистый math быстрее numpy)"""
+    delta = v * improvement
+    phi2 = phi * phi
+
+    # новая волатильность: корень f(x) = 0 методом Illinois
+    a = math.log(vol * vol)
+    tau2 = tau * tau
+
+    def f(x):
+        ex = math.exp(x)
+        return ex * (delta * delta - phi2 - v - ex) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / tau2
+
+    lo = a
+    if delta * delta > phi2 + v:
+        hi = math.log(delta * delta - phi2 - v)
+    else:
+        k = 1
+        while f(a - k * tau) < 0:
+            k += 1
+        hi = a - k * tau
+
+    f_lo, f_hi = f(lo), f(hi)
+    while abs(hi - lo) > _GLICKO_EPS:
+        mid = lo + (lo - hi) * f_lo / (f_hi - f_lo)
+        f_mid = f(mid)
+        if f_mid * f_hi <= 0:
+            lo, f_lo = hi, f_hi
+        else:
+            f_lo /= 2.0
+        hi, f_hi = mid, f_mid
+
+    new_vol = math.exp(lo / 2.0)
+    phi_star2 = phi2 + new_vol * new_vol
+    new_phi = 1.0 / math.sqrt(1.0 / phi_star2 + 1.0 / v)
+    new_mu = mu + new_phi * new_phi * improvement
+    return new_mu, new_phi, new_vol
+
+
+def _glicko2_apply(ratings, rds, vols, opp_ratings, opp_rds, results, tau):
+    """обновление всех игроков: opp_* и results - матрицы (игроки, соперники)"""
+    mu = (ratings - DEFAULT_RATING) / _GLICKO_SCALE
+    phi = rds / _GLICKO_SCALE
+    opp_mu = (opp_ratings - DEFAULT_RATING) / _GLICKO_SCALE
+    opp_phi = opp_rds / _GLICKO_SCALE
+
+    v, improvement = _glicko2_terms(mu, opp_mu, opp_phi, results)
+
+    new = np.empty((3, len(ratings)))
+    for i in range(len(ratings)):
+        new_mu, new_phi, new_vol = _glicko2_step(
+            float(mu[i]), float(phi[i]), float(vols[i]), float(v[i]), float(improvement[i]), tau
+        )
+        new[0, i] = DEFAULT_RATING + _GLICKO_SCALE * new_mu
+        new[1, i] = min(DEFAULT_RD, _GLICKO_SCALE * new_phi)
+        new[2, i] = new_vol
+    return new
+
+
+def glicko2_update(rating, rd, vol, opp_ratings, opp_rds, results, tau=GLICKO_TAU):
+    """обновление одного игрока по набору матчей за период (алгоритм glicko-2 из статьи Гликмана)"""
+    new = _glicko2_apply(
+        np.array([rating], dtype=np.float64),
+        np.array([rd], dtype=np.float64),
+        np.array([vol], dtype=np.float64),
+        np.asarray(opp_ratings, dtype=np.float64)[None, :],
+        np.asarray(opp_rds, dtype=np.float64)[None, :],
+        np.asarray(results, dtype=np.float64)[None, :],
+        tau
+    )
+    return tuple(float(x) for x in new[:, 0])
+
+
+def glicko2_ffa(ratings, rds, vols, scores, tau=GLICKO_TAU):
+    """ffa: каждый игрок сыграл с каждым, результат по очкам"""
+    n = len(ratings)
+    if n < 2:
+        return np.vstack([ratings, rds, vols]).astype(np.float64)
+
+    # матрицы n x (n - 1): соперники каждого игрока без него самого
+    others = ~np.eye(n, dtype=bool)
+    opp_ratings = np.broadcast_to(ratings, (n, n))[others].reshape(n, n - 1)
+    opp_rds = np.broadcast_to(rds, (n, n))[others].reshape(n, n - 1)
+    results = ((np.sign(scores[:, None] - scores[None, :]) + 1.0) / 2.0)[others].reshape(n, n - 1)
+
+    return _glicko2_apply(ratings, rds, vols, opp_ratings, opp_rds, results, tau)
+
+
+def glicko2_teams(ratings, rds, vols, teams, team_scores, tau=GLICKO_TAU):
+    """команды: соперник - составной игрок со средним рейтингом и rd другой команды"""
+    new = np.vstack([ratings, rds, vols]).astype(np.float64)
+
+    in_a = teams == 'A'
+    in_b = teams == 'B'
+    if not in_a.any() or not in_b.any():
+        return new
+
+    composite = {
+        'A': (ratings[in_a].mean(), math.sqrt(np.mean(rds[in_a] ** 2))),
+        'B': (ratings[in_b].mean(), math.sqrt(np.mean(rds[in_b] ** 2)))
+    }
+    result_a = (np.sign(team_scores['A'] - team_scores['B']) + 1.0) / 2.0
+
+    playing = in_a | in_b
+    opp_ratings = np.where(in_a, composite['B'][0], composite['A'][0])[playing][:, None]
+    opp_rds = np.where(in_a, composite['B'][1], composite['A'][1])[playing][:, None]
+    results = np.where(in_a, result_a, 1.0 - result_a)[playing][:, None]
+
+    new[:, playing] = _glicko2_apply(ratings[playing], rds[playing], vols[playing], opp_ratings, opp_rds, results, tau)
+    return new
+
+
+# ==================== ОБЩИЙ ВХОД ====================
+
+def rate_game(mode, ratings, rds, vols, scores, teams, system=None):
+    """новые (rating, rd, vol) всех участников одной игры"""
+    system = system or RATING_SYSTEM
+    ratings = np.asarray(ratings, dtype=np.float64)
+    rds = np.asarray(rds, dtype=np.float64)
+    vols = np.asarray(vols, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    teams = np.asarray(teams, dtype=object)
+
+    team_scores = None
+    if mode == 'teams':
+        team_scores = {team: float(scores[teams == team].sum()) for team in ('A', 'B')}
+
+    if system == 'glicko2':
+        if mode == 'teams':
+            new = glicko2_teams(ratings, rds, vols, teams, team_scores)
+        else:
+            new = glicko2_ffa(ratings, rds, vols, scores)
+        new_ratings, new_rds, new_vols = new
+    else:
+        if mode == 'teams':
+            deltas = elo_deltas_teams(ratings, teams, team_scores)
+        else:
+            deltas = elo_deltas_ffa(ratings, scores)
+        new_ratings, new_rds, new_vols = ratings + deltas, rds, vols
+
+    return np.maximum(MIN_RATING, new_ratings), new_rds, new_vols
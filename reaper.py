@@ -0,0 +1,51 @@
+"""
+уборка брошенных и зависших игр
+решает какие комнаты удалить из active_games по ttl состояния и лимиту живых комнат
+"""
+
+# ttl по состоянию игры (секунды с последней активности)
+DEFAULT_TTLS = {
+    'waiting': 30 * 60,   # лобби, которое так и не стартовало
+    'playing': 10 * 60,   # никто не отвечает и не берет вопросы
+    'paused': 10 * 60,    # выхода из паузы нет, держать дольше смысла нет
+    'finished': 60,       # результаты уже отправлены и сохранены
+}
+
+# лобби, из которого ушел создатель, стартовать уже некому
+ORPHAN_LOBBY_TTL = 2 * 60
+
+# при превышении лимита удаляем сначала эти состояния
+EVICTION_ORDER = ('finished', 'paused', 'waiting', 'playing')
+
+
+def creator_present(game):
+    """создатель еще в комнате (для гостевых игр считаем что да)"""
+    if game.creator_id is None:
+        return True
+    return any(p['user_id'] == game.creator_id for p in game.players.values())
+
+
+def select_expired(games, now, ttls=None, max_rooms=None):
+    """список (pin, причина) комнат для удаления"""
+    ttls = ttls or DEFAULT_TTLS
+    expired = []
+    alive = []
+
+    for pin, game in games.items():
+        idle = now - game.last_activity
+
+        if game.status == 'waiting' and not creator_present(game) and idle > ORPHAN_LOBBY_TTL:
+            expired.append((pin, 'orphaned'))
+        elif idle > ttls.get(game.status, ttls['waiting']):
+            expired.append((pin, game.status))
+        else:
+            alive.append((pin, game))
+
+    # лимит живых комнат: вытесняем по приоритету состояния, внутри - самые давние
+    if max_rooms is not None and len(alive) > max_rooms:
+        priority = {status: i for i, status in enumerate(EVICTION_ORDER)}
+        alive.sort(key=lambda item: (priority.get(item[1].status, 0), item[1].last_activity))
+        for pin, game in alive[:len(alive) - max_rooms]:
+            expired.append((pin, 'evicted'))
+
+    return expired
@@ -0,0 +1,82 @@
+"""
+планировщик периодических фоновых задач
+один поток на всё приложение вместо россыпи threading.Timer
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class Scheduler:
+    """выполнение задач с фиксированным интервалом в одном фоновом потоке"""
+
+    def __init__(self):
+        self._heap = []  # (next_run, seq, interval, name, fn)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def every(self, interval, fn, name=None):
+        """регистрация задачи, первый запуск через interval секунд"""
+        with self._lock:
+            heapq.heappush(self._heap, (
+                time.monotonic() + interval,
+                next(self._seq),
+                interval,
+                name or fn.__name__,
+                fn
+            ))
+        self._wakeup.set()
+
+    def start(self):
+        """запуск фонового потока (повторный вызов ничего не делает)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """остановка потока"""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                if not self._heap:
+                    delay = None
+                else:
+                    delay = self._heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        next_run, _, interval, name, fn = heapq.heappop(self._heap)
+                        delay = 0
+
+            if delay is None or delay > 0:
+                # спим до ближайшей задачи или до регистрации новой
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+                continue
+
+            try:
+                fn()
+            except Exception as e:
+                print(f"[!] ошибка фоновой задачи {name}: {e}")
+
+            # следующий запуск считаем от плана, а не от факта, чтобы не было дрейфа
+            with self._lock:
+                heapq.heappush(self._heap, (
+                    max(next_run + interval, time.monotonic()),
+                    next(self._seq),
+                    interval,
+                    name,
+                    fn
+                ))
+
+
+# общий планировщик приложения
+scheduler = Scheduler()
@@ -0,0 +1,353 @@
+"""
+снапшоты активных игр для рестарта без потери комнат
+компактный бинарный формат состояния GameSession и append-only журнал чекпоинтов
+"""
+
+import os
+import struct
+import zlib
+
+# версия формата одной игры
+SNAPSHOT_VERSION = 1
+
+# заголовок файла журнала
+JOURNAL_MAGIC = b'QBJ1'
+
+# типы записей журнала
+RECORD_SNAPSHOT = b'S'
+RECORD_DELETE = b'D'
+
+# запись: тип, длина pin, длина payload, crc32 payload
+_RECORD_HEADER = struct.Struct('<cBII')
+
+# журнал переписывается когда он во столько раз больше живых данных
+COMPACT_FACTOR = 4
+COMPACT_MIN_BYTES = 1 << 20
+
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_I32 = struct.Struct('<i')
+_I64 = struct.Struct('<q')
+_F32 = struct.Struct('<f')
+_F64 = struct.Struct('<d')
+
+
+# ==================== КОДИРОВАНИЕ ====================
+
+class _Writer:
+    """накопитель бинарных полей"""
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def u8(self, v):
+        self.buf += _U8.pack(v)
+
+    def u16(self, v):
+        self.buf += _U16.pack(v)
+
+    def u32(self, v):
+        self.buf += _U32.pack(v)
+
+    def i32(self, v):
+        self.buf += _I32.pack(v)
+
+    def f64(self, v):
+        self.buf += _F64.pack(v)
+
+    def opt_int(self, v):
+        """int или None (None кодируем как -1, id в бд всегда положительные)"""
+        self.buf += _I64.pack(-1 if v is None else v)
+
+    def str(self, v):
+        """строка с длиной, None кодируем как 0xFFFF"""
+        if v is None:
+            self.u16(0xFFFF)
+            return
+        data = v.encode('utf-8')
+        self.u16(len(data))
+        self.buf += data
+
+    def floats(self, values):
+        self.u16(len(values))
+        self.buf += struct.pack(f'<{len(values)}f', *values)
+
+    def blob(self, data):
+        self.u32(len(data))
+        self.buf += data
+
+
+class _Reader:
+    """чтение полей в том же порядке что писал _Writer"""
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def _take(self, fmt):
+        v = fmt.unpack_from(self.data, self.pos)[0]
+        self.pos += fmt.size
+        return v
+
+    def u8(self):
+        return self._take(_U8)
+
+    def u16(self):
+        return self._take(_U16)
+
+    def u32(self):
+        return self._take(_U32)
+
+    def i32(self):
+        return self._take(_I32)
+
+    def f64(self):
+        return self._take(_F64)
+
+    def opt_int(self):
+        v = self._take(_I64)
+        return None if v == -1 else v
+
+    def str(self):
+        n = self.u16()
+        if n == 0xFFFF:
+            return None
+        v = bytes(self.data[self.pos:self.pos + n]).decode('utf-8')
+        self.pos += n
+        return v
+
+    def floats(self):
+        n = self.u16()
+        values = list(struct.unpack_from(f'<{n}f', self.data, self.pos))
+        self.pos += n * _F32.size
+        return values
+
+    def blob(self):
+        n = self.u32()
+        v = bytes(self.data[self.pos:self.pos + n])
+        self.pos += n
+        return v
+
+
+def encode_game(state):
+    """сериализация состояния игры (dict из GameSession.snapshot_state) в байты"""
+    w = _Writer()
+    w.u8(SNAPSHOT_VERSION)
+
+    w.str(state['pin'])
+    w.opt_int(state['game_id'])
+    w.opt_int(state['creator_id'])
+    w.str(state['topic'])
+    w.str(state['mode'])
+    w.str(state['difficulty'])
+    w.u16(state['questions_count'])
+    w.u8(1 if state['has_password'] else 0)
+    w.str(state['password'])
+    w.str(state['status'])
+    w.f64(state['created_at'])
+    w.u16(state['current_question_idx'])
+    w.str(state['current_team'])
+    w.u8(1 if state['bonus_enabled'] else 0)
+    w.u8(1 if state['large'] else 0)
+    w.u16(state['auto_start'])
+    # время показа вопроса по часам сервера, -1 если раунд не идет
+    w.f64(-1.0 if state['question_start_time'] is None else state['question_start_time'])
+
+    w.u16(len(state['questions']))
+    for q in state['questions']:
+        w.opt_int(q.get('id'))
+        w.str(q['question'])
+        for opt in q['options']:
+            w.str(opt)
+        w.u8(q['correct'])
+        w.str(q.get('difficulty'))
+
+    # команды не пишем - они восстанавливаются из порядка игроков
+    w.u32(len(state['players']))
+    for sid, p in state['players'].items():
+        w.str(sid)
+        w.str(p.get('token'))
+        w.opt_int(p['user_id'])
+        w.str(p['name'])
+        w.str(p['team'])
+        w.i32(p['score'])
+        w.u16(p['correct'])
+        w.u16(p['wrong'])
+        w.u8(1 if p['answered_current'] else 0)
+        w.floats(p['response_times'])
+
+    # матрицы аналитики: sid каждой строки и сырые байты numpy
+    analytics = state.get('analytics')
+    w.u8(1 if analytics else 0)
+    if analytics:
+        w.u32(len(analytics['rows']))
+        for sid in analytics['rows']:
+            w.str(sid)
+        w.blob(analytics['data'])
+
+    return bytes(w.buf)
+
+
+def decode_game(data):
+    """обратное преобразование байтов в dict состояния"""
+    r = _Reader(data)
+    version = r.u8()
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f'неизвестная версия снапшота: {version}')
+
+    state = {
+        'pin': r.str(),
+        'game_id': r.opt_int(),
+        'creator_id': r.opt_int(),
+        'topic': r.str(),
+        'mode': r.str(),
+        'difficulty': r.str(),
+        'questions_count': r.u16(),
+        'has_password': bool(r.u8()),
+        'password': r.str(),
+        'status': r.str(),
+        'created_at': r.f64(),
+        'current_question_idx': r.u16(),
+        'current_team': r.str(),
+        'bonus_enabled': bool(r.u8()),
+        'large': bool(r.u8()),
+        'auto_start': r.u16(),
+    }
+    start = r.f64()
+    state['question_start_time'] = None if start < 0 else start
+
+    questions = []
+    for _ in range(r.u16()):
+        questions.append({
+            'id': r.opt_int(),
+            'question': r.str(),
+            'options': [r.str(), r.str(), r.str(), r.str()],
+            'correct': r.u8(),
+            'difficulty': r.str()
+        })
+    state['questions'] = questions
+
+    players = {}
+    for _ in range(r.u32()):
+        sid = r.str()
+        players[sid] = {
+            'token': r.str(),
+            'user_id': r.opt_int(),
+            'name': r.str(),
+            'team': r.str(),
+            'score': r.i32(),
+            'correct': r.u16(),
+            'wrong': r.u16(),
+            'answered_current': bool(r.u8()),
+            'response_times': r.floats()
+        }
+    state['players'] = players
+
+    state['analytics'] = None
+    if r.u8():
+        rows = [r.str() for _ in range(r.u32())]
+        state['analytics'] = {'rows': rows, 'data': r.blob()}
+
+    return state
+
+
+# ==================== ЖУРНАЛ ====================
+
+class GameJournal:
+    """append-only журнал снапшотов: дописываются только изменившиеся комнаты"""
+
+    def __init__(self, path):
+        self.path = path
+        self._last = {}  # pin -> последний записанный payload
+        self._live_bytes = 0
+
+    def load(self):
+        """чтение журнала, возвращает pin -> payload последнего снапшота"""
+        self._last = {}
+        if not os.path.exists(self.path):
+            return {}
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        if not data.startswith(JOURNAL_MAGIC):
+            print(f"[!] {self.path}: не журнал снапшотов, игнорируем")
+            return {}
+
+        pos = len(JOURNAL_MAGIC)
+        header_size = _RECORD_HEADER.size
+        while pos + header_size <= len(data):
+            kind, pin_len, payload_len, crc = _RECORD_HEADER.unpack_from(data, pos)
+            end = pos + header_size + pin_len + payload_len
+            if end > len(data):
+                # хвост недописан (падение посреди записи) - всё до него валидно
+                break
+            pin = data[pos + header_size:pos + header_size + pin_len].decode('ascii')
+            payload = data[pos + header_size + pin_len:end]
+            if zlib.crc32(payload) != crc:
+                break
+            if kind == RECORD_SNAPSHOT:
+                self._last[pin] = payload
+            elif kind == RECORD_DELETE:
+                self._last.pop(pin, None)
+            pos = end
+
+        self._live_bytes = sum(len(p) for p in self._last.values())
+        # после восстановления сразу сжимаем журнал до живых записей
+        self.compact()
+        return dict(self._last)
+
+    def __len__(self):
+        """комнат в последнем чекпоинте"""
+        return len(self._last)
+
+    def previous(self, pin):
+        """последний записанный payload комнаты или None"""
+        return self._last.get(pin)
+
+    def checkpoint(self, snapshots):
+        """запись чекпоинта: snapshots - pin -> payload всех живых комнат"""
+        chunks = []
+        for pin, payload in snapshots.items():
+            if self._last.get(pin) != payload:
+                chunks.append(_record(RECORD_SNAPSHOT, pin, payload))
+        for pin in self._last.keys() - snapshots.keys():
+            chunks.append(_record(RECORD_DELETE, pin, b''))
+
+        if not chunks:
+            return 0
+
+        self._last = dict(snapshots)
+        self._live_bytes = sum(len(p) for p in snapshots.values())
+
+        new_file = not os.path.exists(self.path)
+        with open(self.path, 'ab') as f:
+            if new_file:
+                f.write(JOURNAL_MAGIC)
+            f.write(b''.join(chunks))
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+
+        if size > COMPACT_MIN_BYTES and size > COMPACT_FACTOR * self._live_bytes:
+            self.compact()
+
+        return len(chunks)
+
+    def compact(self):
+        """переписывание журнала только с актуальными снапшотами"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(JOURNAL_MAGIC)
+            for pin, payload in self._last.items():
+                f.write(_record(RECORD_SNAPSHOT, pin, payload))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def _record(kind, pin, payload):
+    """одна запись журнала"""
+    pin_bytes = pin.encode('ascii')
+    return _RECORD_HEADER.pack(kind, len(pin_bytes), len(payload), zlib.crc32(payload)) + pin_bytes + payload
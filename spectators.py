@@ -0,0 +1,44 @@
+"""
+зрители: отдельный канал комнаты без записи в состояние игры
+зрители сидят в socket.io комнате <pin>:watch, игра про них ничего не знает
+раз в интервал по каждой игре со зрителями собирается один снимок, сериализуется один раз и рассылается всем
+"""
+
+import json
+import threading
+
+
+def watch_room(pin):
+    """socket.io комната зрителей игры"""
+    return f'{pin}:watch'
+
+
+class SpectatorFeed:
+    """последний снимок каждой игры: json-строка и отпечаток состояния, по которому он собран"""
+
+    def __init__(self):
+        self._latest = {}  # pin -> (отпечаток, json)
+        self._lock = threading.Lock()
+
+    def publish(self, pin, fingerprint, build):
+        """новый снимок, если состояние изменилось с прошлого раза; иначе None (рассылать нечего)"""
+        with self._lock:
+            current = self._latest.get(pin)
+        if current is not None and current[0] == fingerprint:
+            return None
+        body = json.dumps(build(), ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._latest[pin] = (fingerprint, body)
+        return body
+
+    def latest(self, pin):
+        """готовый снимок для только что подключившегося зрителя"""
+        with self._lock:
+            current = self._latest.get(pin)
+        return current[1] if current else None
+
+    def retain(self, pins):
+        """забыть игры, которых больше нет"""
+        with self._lock:
+            for pin in self._latest.keys() - set(pins):
+                del self._latest[pin]
@@ -0,0 +1,68 @@
+"""
+быстрый старт
+ленивые импорты тяжелых модулей, ожидание готовности сервера по порту и отчет о времени импорта
+"""
+
+import importlib.util
+import socket
+import subprocess
+import sys
+import time
+
+
+def lazy_import(name):
+    """модуль загружается при первом обращении к атрибуту, а не при импорте"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f'модуль {name} не найден')
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def port_in_use(host, port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        return sock.connect_ex((host, port)) == 0
+
+
+def free_port(host):
+    """свободный порт от ос"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(host, port, timeout=30.0, interval=0.02, alive=None):
+    """ждем, пока сервер начнет принимать соединения; alive() == False - сервер упал, ждать нечего"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            if alive is not None and not alive():
+                return False
+            time.sleep(interval)
+    return False
+
+
+def importtime_report(module, python=None):
+    """время импорта модуля по python -X importtime: [(накопленное мкс, свое мкс, глубина, имя)]"""
+    result = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # у самого модуля отступ в один пробел, дальше по два на уровень
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return rows
@@ -0,0 +1,80 @@
+"""
+общие фикстуры тестов: приложение на временной бд и каталогах, чистое состояние между тестами
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# до импорта app: бд, журнал снапшотов и события игр - во временном каталоге, без API ключа
+_tmp = tempfile.mkdtemp(prefix='quizbattle-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ['ARCHIVE_DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp, 'archive.db')}"
+os.environ['SNAPSHOT_PATH'] = os.path.join(_tmp, 'game_journal.bin')
+os.environ['EVENT_LOG_DIR'] = os.path.join(_tmp, 'events')
+os.environ['QUESTION_PACK'] = os.path.join(_tmp, 'questions.qbp')
+os.environ['KIMI_API_KEY'] = ''
+
+
+@pytest.fixture(scope='session')
+def quiz():
+    """модуль app с созданной бд"""
+    import app
+    app.app.config['TESTING'] = True
+    app.init_db()
+    return app
+
+
+@pytest.fixture(autouse=True)
+def clean_games(quiz):
+    """комнаты одного теста не видны следующему"""
+    yield
+    with quiz.games_lock:
+        quiz.active_games.clear()
+
+
+@pytest.fixture
+def count_queries(quiz):
+    """число sql-запросов на один запрос тест-клиента: count_queries(client.get, url) -> (ответ, запросов)
+    тело читается целиком внутри подсчета, чтобы потоковые ответы тоже посчитались"""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with quiz.app.app_context():
+        engine = quiz.db.engine
+    event.listen(engine, 'before_cursor_execute', on_execute)
+
+    def count(call, *args, **kwargs):
+        statements.clear()
+        response = call(*args, **kwargs)
+        response.get_data()
+        return response, len(statements)
+
+    yield count
+    event.remove(engine, 'before_cursor_execute', on_execute)
+
+
+@pytest.fixture
+def connect(quiz):
+    """socket.io клиенты теста: connect(**kwargs) -> тестовый клиент; в конце теста все отключаются"""
+    clients = []
+
+    def connect(**kwargs):
+        client = quiz.socketio.test_client(quiz.app, **kwargs)
+        clients.append(client)
+        return client
+
+    yield connect
+    for client in clients:
+        if client.is_connected():
+            client.disconnect()
+        # engine.io-сессию тестовый клиент не закрывает сам
+        type(client).clients.pop(client.eio_sid, None)
+        quiz.socketio.server.environ.pop(client.eio_sid, None)
@@ -0,0 +1,32 @@
+"""
+журнал событий: поле, не влезающее в формат записи, пропускается, а не роняет обработчик
+"""
+
+from eventlog import EVENT_JOIN, EventLog, read_log
+
+
+def test_record_refuses_oversized_fields(tmp_path):
+    log = EventLog(str(tmp_path))
+    assert log.record(1, 0.0, EVENT_JOIN, 0, None, 0, 'игрок', now=1.0)
+    # слот не влезает в u16, строка длиннее 64 кб, одиночный суррогат
+    assert not log.record(1, 0.0, EVENT_JOIN, 70000, None, 0, 'игрок', now=1.0)
+    assert not log.record(1, 0.0, EVENT_JOIN, 1, None, 0, 'x' * 70000, now=1.0)
+    assert not log.record(1, 0.0, EVENT_JOIN, 2, None, 0, '\ud800', now=1.0)
+    assert log.dropped == 3
+    log.flush()
+    assert [event.kind for event in read_log(str(tmp_path / '1.qbe'))] == ['join']
+
+
+def test_join_with_hostile_name(quiz, connect):
+    creator = connect()
+    creator.emit('create_game', {'topic': quiz.TOPICS[0], 'mode': 'ffa', 'questions_count': 3})
+    pin = next(r['args'][0]['pin'] for r in creator.get_received() if r['name'] == 'game_created')
+
+    dropped = quiz.event_log.dropped
+    player = connect()
+    player.emit('join_game', {'pin': pin, 'guest_name': '\ud800' + 'я' * 70000})
+    joined = [r['args'][0] for r in player.get_received() if r['name'] == 'joined']
+    assert len(joined) == 1
+    assert joined[0]['name'] == 'я' * quiz.MAX_NAME_LENGTH
+    assert quiz.event_log.dropped == dropped
+    assert len(quiz.active_games[pin].players) == 1
@@ -0,0 +1,103 @@
+"""
+номера игр: блоки из общего счетчика в бд не пересекаются между процессами, id строк истории выдает бд
+"""
+
+import threading
+
+import pytest
+import sqlalchemy as sa
+
+import database
+from pins import PinAllocator
+
+
+@pytest.fixture
+def counter(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'counter.db'}")
+    table = sa.Table('counter', sa.MetaData(), sa.Column('name', sa.String(50), primary_key=True),
+                     sa.Column('value', sa.BigInteger, nullable=False))
+    table.create(engine)
+    return engine, table
+
+
+def test_counter_only_moves_forward(counter):
+    engine, table = counter
+    database.advance_counter(engine, table, 'game', 10)
+    database.advance_counter(engine, table, 'game', 5)
+    assert database.reserve_block(engine, table, 'game', 3) == 10
+    database.advance_counter(engine, table, 'game', 12)
+    assert database.reserve_block(engine, table, 'game', 3) == 13
+
+
+def test_workers_never_share_ids(counter):
+    engine, table = counter
+    database.advance_counter(engine, table, 'game', 1)
+    # два процесса сервера: у каждого свой аллокатор, счетчик в бд общий
+    workers = [PinAllocator('key', lambda n: database.reserve_block(engine, table, 'game', n), block=7)
+               for _ in range(2)]
+    ids = [[] for _ in workers]
+
+    def run(allocator, out):
+        for _ in range(200):
+            out.append(allocator.allocate()[0])
+
+    threads = [threading.Thread(target=run, args=(allocator, out)) for allocator, out in zip(workers, ids)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not set(ids[0]) & set(ids[1])
+    assert len(set(ids[0] + ids[1])) == 400
+
+
+def test_history_row_gets_db_id(quiz, connect):
+    with quiz.app.app_context():
+        quiz.db.session.add_all(quiz.Question(topic='наука', difficulty='medium', question_text=f'вопрос номера {i}',
+                                              option_1='а', option_2='б', option_3='в', option_4='г', correct_answer=0)
+                                for i in range(2))
+        quiz.db.session.commit()
+    creator, player = connect(), connect()
+    creator.emit('create_game', {'topic': 'наука', 'mode': 'ffa', 'questions_count': 2})
+    pin = next(r['args'][0]['pin'] for r in creator.get_received() if r['name'] == 'game_created')
+    creator.emit('join_game', {'pin': pin})
+    player.emit('join_game', {'pin': pin})
+    creator.emit('start_game', {'pin': pin})
+    game = quiz.active_games[pin]
+
+    with quiz.app.app_context():
+        history = quiz.get_latest_game(pin)
+        assert history.game_id == game.game_id
+        # номер игры живет в своей колонке, id строки - автоинкремент бд
+        assert history.id == quiz.db.session.execute(sa.select(sa.func.max(quiz.GameHistory.id))).scalar()
+        counter = quiz.db.session.get(quiz.Counter, quiz.GAME_COUNTER)
+        assert counter.value > game.game_id
+
+
+def test_results_go_to_current_game(quiz, connect):
+    with quiz.app.app_context():
+        quiz.db.session.add_all(quiz.Question(topic='наука', difficulty='medium', question_text=f'вопрос пина {i}',
+                                              option_1='а', option_2='б', option_3='в', option_4='г', correct_answer=0)
+                                for i in range(2))
+        quiz.db.session.commit()
+    creator, player = connect(), connect()
+    creator.emit('create_game', {'topic': 'наука', 'mode': 'ffa', 'questions_count': 2})
+    pin = next(r['args'][0]['pin'] for r in creator.get_received() if r['name'] == 'game_created')
+    creator.emit('join_game', {'pin': pin})
+    player.emit('join_game', {'pin': pin})
+    game = quiz.active_games[pin]
+
+    with quiz.app.app_context():
+        # старая игра под тем же пином (случайные пины до счетчика могли повторяться)
+        old = quiz.GameHistory(pin=pin, topic='наука', mode='ffa', difficulty='medium', questions_count=2)
+        quiz.db.session.add(old)
+        quiz.db.session.commit()
+        old_id = old.id
+    creator.emit('start_game', {'pin': pin})
+    quiz.end_game(pin)
+
+    with quiz.app.app_context():
+        assert quiz.db.session.get(quiz.GameHistory, old_id).ended_at is None
+        current = quiz.db.session.execute(
+            sa.select(quiz.GameHistory).where(quiz.GameHistory.game_id == game.game_id)).scalar_one()
+        assert current.ended_at is not None
+        assert quiz.get_latest_game(pin).id == current.id
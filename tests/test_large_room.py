@@ -0,0 +1,17 @@
+"""
+большая комната: список игроков страницами, мусор от клиента не роняет обработчик
+"""
+
+
+def test_roster_page_is_clamped(quiz, connect):
+    creator = connect()
+    creator.emit('create_game', {'topic': quiz.TOPICS[0], 'mode': 'teams', 'questions_count': 3, 'large_room': True})
+    pin = next(r['args'][0]['pin'] for r in creator.get_received() if r['name'] == 'game_created')
+    creator.emit('join_game', {'pin': pin})
+    creator.get_received()
+
+    for page, team in (('abc', 'A'), (None, None), ([1], ['A']), (-5, 'B'), (10 ** 30, None), ('2', {'x': 1})):
+        creator.emit('get_roster', {'pin': pin, 'team': team, 'page': page})
+        rosters = [r['args'][0] for r in creator.get_received() if r['name'] == 'roster']
+        assert len(rosters) == 1
+        assert 0 <= rosters[0]['page'] < rosters[0]['pages']
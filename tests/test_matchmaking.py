@@ -0,0 +1,32 @@
+"""
+подбор соперников: комнату подбора стартует сервер, а не первый вошедший гость
+"""
+
+from snapshot import decode_game, encode_game
+
+
+def match_room(quiz, players):
+    # как run_matchmaking: без создателя, с паролем, ждет всех подобранных
+    game = quiz.GameSession(None, quiz.TOPICS[0], 'ffa', questions_count=3, has_password=True, password='match')
+    game.auto_start = players
+    with quiz.games_lock:
+        quiz.active_games[game.pin] = game
+    return game
+
+
+def test_guest_cannot_start_match_room(quiz, connect):
+    game = match_room(quiz, 3)
+    guests = [connect(), connect()]
+    for guest in guests:
+        guest.emit('join_game', {'pin': game.pin, 'password': 'match'})
+    joined = [r['args'][0] for r in guests[0].get_received() if r['name'] == 'joined']
+    assert joined[0]['match']
+
+    guests[1].get_received()
+    guests[1].emit('start_game', {'pin': game.pin})
+    assert [r['name'] for r in guests[1].get_received()] == ['error']
+    assert game.status == 'waiting'
+
+    # после рестарта комната по-прежнему ждет подобранных
+    restored = quiz.GameSession.from_snapshot_state(decode_game(encode_game(game.snapshot_state())))
+    assert restored.auto_start == 3
@@ -0,0 +1,96 @@
+"""
+бюджет sql-запросов на страницу: число запросов не растет с числом игр и игроков
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+PLAYERS = 12
+GAMES = 25
+
+# страница -> максимум sql-запросов на один холодный (без кэша) запрос
+QUERY_BUDGETS = {
+    'index': 1,
+    'rating': 2,
+    'profile': 5,
+    'get_game_stats': 3,
+    'export_game_results': 3,
+}
+
+
+@pytest.fixture(scope='module')
+def history(quiz):
+    """игроки и законченные игры, в которых участвовали все: (id пользователей, пины игр)"""
+    with quiz.app.app_context():
+        users = [quiz.User(username=f'budget{i}', email=f'budget{i}@test', password_hash='-',
+                           total_games=GAMES, rating=1000 + i) for i in range(PLAYERS)]
+        quiz.db.session.add_all(users)
+        quiz.db.session.flush()
+        start = datetime(2026, 2, 1)
+        pins = []
+        for n in range(GAMES):
+            game = quiz.GameHistory(pin=f'B{n:05d}', topic='history', mode='ffa', difficulty='medium',
+                                    created_at=start + timedelta(minutes=n), ended_at=start + timedelta(minutes=n),
+                                    winner_team=str(users[0].id), questions_count=10)
+            quiz.db.session.add(game)
+            quiz.db.session.flush()
+            quiz.db.session.add_all(quiz.PlayerStats(game_id=game.id, user_id=user.id, score=10 * i, correct_answers=i,
+                                                     wrong_answers=1, avg_response_time=2.5)
+                                    for i, user in enumerate(users))
+            pins.append(game.pin)
+        quiz.db.session.commit()
+        return [user.id for user in users], pins
+
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+def test_index(quiz, count_queries):
+    quiz.page_cache.invalidate('static')
+    response, queries = count_queries(quiz.app.test_client().get, '/')
+    assert response.status_code == 200
+    assert queries <= QUERY_BUDGETS['index']
+
+
+def test_rating(quiz, history, count_queries):
+    quiz.page_cache.invalidate('leaderboard')
+    response, queries = count_queries(quiz.app.test_client().get, '/rating')
+    assert response.status_code == 200
+    assert 'budget0' in response.get_data(as_text=True)
+    assert queries <= QUERY_BUDGETS['rating']
+
+
+def test_profile(quiz, history, count_queries):
+    user_ids, _ = history
+    client = quiz.app.test_client()
+    login(client, user_ids[0])
+
+    response, queries = count_queries(client.get, '/profile')
+    assert response.status_code == 200
+    assert queries <= QUERY_BUDGETS['profile']
+
+    # следующая страница истории - тот же бюджет
+    _, page = count_queries(client.get, '/profile', query_string={'before': 10 ** 9})
+    assert page <= QUERY_BUDGETS['profile']
+
+
+def test_game_stats(quiz, history, count_queries):
+    _, pins = history
+    quiz.page_cache.invalidate(f'game:{pins[0]}')
+    response, queries = count_queries(quiz.app.test_client().get, f'/api/game/{pins[0]}/stats')
+    assert response.status_code == 200
+    assert len(response.get_json()) == PLAYERS
+    assert queries <= QUERY_BUDGETS['get_game_stats']
+
+
+@pytest.mark.parametrize('fmt', ['json', 'ndjson', 'csv'])
+def test_game_export(quiz, history, count_queries, fmt):
+    _, pins = history
+    response, queries = count_queries(quiz.app.test_client().get, f'/api/game/{pins[1]}/export',
+                                      query_string={'format': fmt})
+    assert response.status_code == 200
+    assert queries <= QUERY_BUDGETS['export_game_results']
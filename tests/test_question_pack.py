@@ -0,0 +1,82 @@
+"""
+встроенный пакет вопросов: свои id, не пересекаются с локальной бд; списанные и дубли не выдаются
+"""
+
+import pytest
+
+from questionpack import QuestionPack, pack_question_id, write_pack
+
+TOPIC = 'пакет'
+
+
+def question(n, **extra):
+    return {'topic': TOPIC, 'difficulty': 'medium', 'question': f'вопрос пакета {n}',
+            'options': ['а', 'б', 'в', 'г'], 'correct': 1, **extra}
+
+
+@pytest.fixture
+def pack(quiz, tmp_path, monkeypatch):
+    """пакет из 5 вопросов с теми же id, что и у вопросов локальной бд"""
+    with quiz.app.app_context():
+        local = quiz.Question(topic=TOPIC, difficulty='medium', question_text='вопрос пакета 0',
+                              option_1='а', option_2='б', option_3='в', option_4='г', correct_answer=1)
+        quiz.db.session.add(local)
+        quiz.db.session.commit()
+        local_id = local.id
+    path = str(tmp_path / 'questions.qbp')
+    write_pack(path, [question(n, id=local_id + n) for n in range(5)])
+    opened = QuestionPack(path)
+    monkeypatch.setattr(quiz, 'question_pack', opened)
+    yield local_id
+    opened.close()
+    with quiz.app.app_context():
+        quiz.db.session.execute(quiz.db.delete(quiz.QuestionStats))
+        quiz.db.session.execute(quiz.db.delete(quiz.Question).where(quiz.Question.topic == TOPIC))
+        quiz.db.session.commit()
+
+
+def test_pack_ids_do_not_hit_local_questions(quiz, pack):
+    local_id = pack
+    with quiz.app.app_context():
+        questions = quiz.get_random_questions(TOPIC, 10)
+    ids = [q['id'] for q in questions]
+    # вопрос 0 есть и в бд, и в пакете: выдается один раз, из бд
+    assert [q['question'] for q in questions].count('вопрос пакета 0') == 1
+    assert local_id in ids and len(questions) == 5
+    assert all(i < 0 for i in ids if i != local_id)
+
+    for q in questions:
+        quiz.question_stats.shown(q['id'])
+    with quiz.app.app_context():
+        quiz.flush_question_stats()
+        # показы вопросов пакета не попадают в times_used чужих вопросов бд
+        assert quiz.db.session.get(quiz.Question, local_id).times_used == 1
+
+
+def test_retired_pack_question_is_skipped(quiz, pack):
+    local_id = pack
+    retired = pack_question_id(local_id + 2)
+    with quiz.app.app_context():
+        quiz.db.session.add(quiz.QuestionStats(question_id=retired, retired=True))
+        quiz.db.session.commit()
+        texts = {q['question'] for q in quiz.get_random_questions(TOPIC, 10)}
+    assert 'вопрос пакета 2' not in texts
+    assert len(texts) == 4
+
+
+def test_question_stats_retires_pack_question(quiz, pack):
+    local_id = pack
+    bad = pack_question_id(local_id)
+    # на вопрос пакета все отвечают неверно, локальный вопрос с тем же исходным id в порядке
+    with quiz.app.app_context():
+        quiz.db.session.add_all([
+            quiz.QuestionStats(question_id=bad, shown=40, answered=40, correct=0, picks_0=40),
+            quiz.QuestionStats(question_id=local_id, shown=40, answered=40, correct=20, picks_1=20, picks_0=20),
+        ])
+        quiz.db.session.commit()
+    result = quiz.app.test_cli_runner().invoke(args=['question-stats', '--apply'])
+    assert result.exit_code == 0, result.output
+    with quiz.app.app_context():
+        assert quiz.db.session.get(quiz.QuestionStats, bad).retired
+        assert not quiz.db.session.get(quiz.QuestionStats, local_id).retired
+        assert quiz.db.session.get(quiz.Question, local_id).difficulty == 'medium'
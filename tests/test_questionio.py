@@ -0,0 +1,60 @@
+"""
+импорт вопросов: быстрый разбор строк jsonl не меняет того, что принимается и что отбрасывается
+"""
+
+import io
+import json
+
+from questionio import read_questions
+
+QUESTION = {'topic': 'наука', 'difficulty': 'easy', 'question': ' Сколько планет? ',
+            'options': ['7', '8', '9', '10'], 'correct': 1}
+
+
+def read(lines):
+    return list(read_questions(io.StringIO(''.join(lines)), 'jsonl', ['наука']))
+
+
+def test_jsonl_lines():
+    line = json.dumps(QUESTION, ensure_ascii=False)
+    results = read([
+        line + '\n',
+        '   ' + line + '  \n',
+        '\n',
+        line + ' {}\n',
+        '{"topic": \n',
+        json.dumps({**QUESTION, 'correct': '2'}) + '\n',
+        json.dumps({**QUESTION, 'correct': True}) + '\n',
+        json.dumps({**QUESTION, 'difficulty': ['easy']}) + '\n',
+        json.dumps({**QUESTION, 'options': ['7', '8', ' ', '10']}) + '\n',
+        '[1, 2]\n',
+        line,
+    ])
+    row = ('наука', 'easy', 'Сколько планет?', '7', '8', '9', '10', 1)
+    assert results == [
+        (1, row, None),
+        (2, row, None),
+        (4, None, 'не json'),
+        (5, None, 'не json'),
+        (6, row[:-1] + (2,), None),
+        # bool - подкласс int, но номером варианта не считается
+        (7, None, 'правильный ответ - номер варианта 0..3'),
+        (8, None, "неизвестная сложность ['easy']"),
+        (9, None, 'пустой или слишком длинный вариант'),
+        (10, None, 'ожидался объект'),
+        (11, row, None),
+    ]
+
+
+def test_import_skips_duplicates(quiz):
+    line = json.dumps(QUESTION, ensure_ascii=False) + '\n'
+    other = json.dumps({**QUESTION, 'question': 'Сколько спутников у Марса?'}, ensure_ascii=False) + '\n'
+    with quiz.app.app_context():
+        try:
+            # дубль внутри порции и дубль из прошлой порции
+            assert quiz.import_questions(io.StringIO(line * 3 + other), 'jsonl', chunk_size=2) == (4, 0, 2)
+            assert quiz.import_questions(io.StringIO(line + other), 'jsonl') == (2, 0, 0)
+        finally:
+            quiz.db.session.execute(quiz.db.delete(quiz.Question).where(quiz.Question.topic == 'наука',
+                                    quiz.Question.question_text.in_(['Сколько планет?', 'Сколько спутников у Марса?'])))
+            quiz.db.session.commit()
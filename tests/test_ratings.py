@@ -0,0 +1,76 @@
+"""
+рейтинг: колонки glicko-2 добавляются в старую бд, пересчет по истории совпадает с живым
+"""
+
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import sqlalchemy as sa
+
+import database
+
+GAMES = 30
+
+
+def test_init_db_adds_rating_columns(quiz, tmp_path):
+    # таблица user в том виде, в каком она была до glicko-2
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            'CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80), email VARCHAR(120), '
+            'password_hash VARCHAR(120), created_at DATETIME, avatar VARCHAR(200), total_games INTEGER, '
+            'total_wins INTEGER, total_points INTEGER, rating INTEGER)'
+        )
+        conn.exec_driver_sql("INSERT INTO user (id, username, rating) VALUES (1, 'old', 1234)")
+
+    table = quiz.User.__table__
+    with engine.begin() as conn:
+        assert database.add_missing_columns(conn, table) == ['rating_rd', 'rating_vol']
+    # повторный запуск ничего не меняет
+    with engine.begin() as conn:
+        assert database.add_missing_columns(conn, table) == []
+        row = conn.execute(sa.select(table.c.rating, table.c.rating_rd, table.c.rating_vol)).one()
+    assert row == (1234, quiz.DEFAULT_RD, quiz.DEFAULT_VOL)
+
+
+def test_recompute_matches_live(quiz):
+    rng = random.Random(7)
+    with quiz.app.app_context():
+        users = [quiz.User(username=f'rated{i}', email=f'rated{i}@test', password_hash='-') for i in range(4)]
+        quiz.db.session.add_all(users)
+        quiz.db.session.commit()
+        ids = [user.id for user in users]
+
+        start = datetime(2026, 1, 1)
+        for n in range(GAMES):
+            mode = 'ffa' if n % 2 else 'teams'
+            players = {
+                f'sid{i}': {'user_id': user_id, 'name': f'rated{i}', 'team': None if mode == 'ffa' else 'AB'[i % 2],
+                            'score': rng.randrange(0, 1000, 10), 'correct': 1, 'wrong': 1}
+                for i, user_id in enumerate(ids)
+            }
+            history = quiz.GameHistory(pin=f'R{n:05d}', topic='history', mode=mode, difficulty='medium',
+                                       created_at=start + timedelta(minutes=n), ended_at=start + timedelta(minutes=n),
+                                       winner_team='A', questions_count=2)
+            quiz.db.session.add(history)
+            quiz.db.session.flush()
+            game = SimpleNamespace(mode=mode, topic='history', players=players)
+            quiz.save_game_results(history, game, list(players), {'avg_time': np.ones(len(players))})
+
+        def ratings():
+            rows = quiz.db.session.execute(
+                quiz.db.select(quiz.User.id, quiz.User.rating, quiz.User.rating_rd, quiz.User.rating_vol)
+                .where(quiz.User.id.in_(ids)).order_by(quiz.User.id)
+            )
+            return [tuple(row) for row in rows]
+
+        live = ratings()
+        quiz.recompute_ratings()
+        quiz.db.session.expire_all()
+        recomputed = ratings()
+
+    assert [row[1] for row in live] != [quiz.DEFAULT_RATING] * len(ids)
+    assert [row[1] for row in recomputed] == [row[1] for row in live]
+    np.testing.assert_allclose([row[2:] for row in recomputed], [row[2:] for row in live])
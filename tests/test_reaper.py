@@ -0,0 +1,76 @@
+"""
+soak уборки комнат: тысячи созданных и брошенных игр не оставляют следов в памяти
+"""
+
+import time
+import tracemalloc
+
+from ratelimit import Budget
+
+CYCLES = 2000
+REAP_EVERY = 400
+
+# прирост памяти после первой уборки, который еще считаем шумом аллокатора
+MEMORY_BOUND = 512 * 1024
+
+
+def test_abandoned_rooms_are_reaped(quiz, monkeypatch):
+    # лимиты частоты не мешают тысячам созданий подряд, но корзины заводятся как обычно
+    unlimited = Budget(rate=1e9, burst=1e9, ip_rate=1e9, ip_burst=1e9)
+    monkeypatch.setattr(quiz.rate_limiter, 'budgets', dict.fromkeys(quiz.SOCKET_EVENT_BUDGETS, unlimited))
+    monkeypatch.setattr(quiz.rate_limiter, 'default', unlimited)
+    statuses = ('waiting', 'playing', 'paused', 'finished')
+    ttl = max(quiz.DEFAULT_TTLS.values()) + 1
+    socket_rooms = quiz.socketio.server.manager.rooms.setdefault('/', {})
+    rooms_before = len(socket_rooms)
+
+    def hang_up(client):
+        client.disconnect()
+        # engine.io-сессию тестовый клиент не закрывает: без этого он сам держит каждое соединение
+        type(client).clients.pop(client.eio_sid, None)
+        quiz.socketio.server.environ.pop(client.eio_sid, None)
+
+    def reap():
+        # как планировщик: уборка, чекпоинт и сброс журнала событий
+        quiz.reap_games(now=time.time() + ttl)
+        quiz.checkpoint_games()
+        quiz.event_log.flush()
+
+    tracemalloc.start()
+    try:
+        idle, baseline = [], None
+        for i in range(CYCLES):
+            # создатель открыл лобби и ушел, комната осталась
+            creator = quiz.socketio.test_client(quiz.app)
+            creator.emit('create_game', {'topic': quiz.TOPICS[0], 'mode': 'teams' if i % 2 else 'ffa'})
+            pin = next(e['args'][0]['pin'] for e in creator.get_received() if e['name'] == 'game_created')
+            hang_up(creator)
+
+            if i % 2:
+                # игрок сидит в открытой вкладке и ничего не делает, игра в одном из состояний
+                player = quiz.socketio.test_client(quiz.app)
+                player.emit('join_game', {'pin': pin, 'guest_name': f'игрок {i}'})
+                player.get_received()
+                quiz.active_games[pin].status = statuses[i // 2 % len(statuses)]
+                idle.append(player)
+
+            if i % REAP_EVERY == REAP_EVERY - 1:
+                reap()
+                for player in idle:
+                    hang_up(player)
+                idle.clear()
+                if baseline is None:
+                    baseline = tracemalloc.get_traced_memory()[0]
+
+        growth = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+
+    assert quiz.active_games == {}
+    # корзины sid уходят при отключении, корзины ip - штатной чисткой простаивающих
+    assert quiz.rate_limiter.prune(now=time.monotonic() + 301) == (0, 0)
+    assert len(quiz.game_journal) == 0
+    assert len(quiz.event_log) == 0
+    assert len(quiz.clock_sync) == 0
+    assert len(socket_rooms) == rooms_before
+    assert growth < MEMORY_BOUND, f'память выросла на {growth / 1024:.0f} КБ'
@@ -0,0 +1,36 @@
+"""
+сводки профиля: в бд от прошлых версий init_db собирает их из уже накопленной истории
+"""
+
+from datetime import datetime
+
+GAMES = 3
+
+
+def test_backfill_rollups(quiz):
+    with quiz.app.app_context():
+        user = quiz.User(username='rollup', email='rollup@test', password_hash='-')
+        quiz.db.session.add(user)
+        quiz.db.session.flush()
+        for n in range(GAMES):
+            game = quiz.GameHistory(game_id=quiz.pin_allocator.allocate()[0], pin=f'R{n:05d}', topic='космос',
+                                    mode='ffa', difficulty='medium', ended_at=datetime(2026, 3, 1, 12, n),
+                                    questions_count=10)
+            quiz.db.session.add(game)
+            quiz.db.session.flush()
+            quiz.db.session.add(quiz.PlayerStats(game_id=game.id, user_id=user.id, score=10, correct_answers=1,
+                                                 wrong_answers=1, avg_response_time=2.0))
+        # история есть, сводок нет - как после обновления старой бд
+        quiz.db.session.execute(quiz.db.delete(quiz.UserDailyStats))
+        quiz.db.session.execute(quiz.db.delete(quiz.UserTopicStats))
+        quiz.db.session.commit()
+
+        # init_db на старте вызывает backfill_rollups
+        assert quiz.backfill_rollups() is not None
+        topic = quiz.db.session.get(quiz.UserTopicStats, (user.id, 'космос'))
+        assert (topic.games, topic.points) == (GAMES, 10 * GAMES)
+        # сводки уже есть: повторный старт их не пересобирает
+        topic.points = 1
+        quiz.db.session.commit()
+        assert quiz.backfill_rollups() is None
+        assert quiz.db.session.get(quiz.UserTopicStats, (user.id, 'космос')).points == 1
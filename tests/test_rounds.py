@@ -0,0 +1,60 @@
+"""
+раунды: текст вопроса уходит клиентам не раньше чем за QUESTION_LEAD секунд до показа
+"""
+
+import pytest
+
+QUESTIONS = 3
+
+
+@pytest.fixture(scope='module')
+def questions(quiz):
+    with quiz.app.app_context():
+        quiz.db.session.add_all(quiz.Question(topic='история', difficulty='medium', question_text=f'вопрос раунда {i}',
+                                              option_1='а', option_2='б', option_3='в', option_4='г', correct_answer=0)
+                                for i in range(QUESTIONS))
+        quiz.db.session.commit()
+
+
+def received(client, name):
+    return [r['args'][0] for r in client.get_received() if r['name'] == name]
+
+
+def start(quiz, connect):
+    creator, player = connect(), connect()
+    creator.emit('create_game', {'topic': 'история', 'mode': 'ffa', 'questions_count': QUESTIONS})
+    pin = received(creator, 'game_created')[0]['pin']
+    creator.emit('join_game', {'pin': pin, 'guest_name': 'ведущий'})
+    player.emit('join_game', {'pin': pin, 'guest_name': 'игрок'})
+    creator.emit('start_game', {'pin': pin})
+    creator.get_received()
+    player.get_received()
+    return pin, creator, player
+
+
+def test_question_text_has_bounded_lead(quiz, connect, questions, monkeypatch):
+    # таймеры раундов короткие, чтобы не держали процесс после теста
+    monkeypatch.setattr(quiz, 'QUESTION_TIME', 1)
+    pin, creator, player = start(quiz, connect)
+    game = quiz.active_games[pin]
+    assert quiz.START_DELAY > quiz.QUESTION_LEAD
+
+    # первый вопрос показывается через START_DELAY: сейчас приходит только расписание
+    player.emit('get_question', {'pin': pin})
+    early = received(player, 'question')[0]
+    assert 'question' not in early and 'options' not in early
+    assert early['question_at'] == pytest.approx(early['reveal_at'] - quiz.QUESTION_LEAD)
+
+    # в question_at - уже с вопросом
+    info = game.round_info(now=early['question_at'])
+    assert info['question'] == game.questions[0]['question']
+
+    # граница раунда: вопрос вместе с расписанием, за ROUND_PAUSE до показа, и ничего про следующий
+    creator.emit('admin_skip', {'pin': pin})
+    rounds = received(player, 'next_round')
+    assert len(rounds) == 1
+    info = rounds[0]
+    assert info['question'] == game.questions[1]['question']
+    assert info['reveal_at'] - info['server_time'] <= quiz.QUESTION_LEAD
+    assert 'next' not in info
+    assert game.questions[2]['question'] not in repr(info)
@@ -0,0 +1,46 @@
+"""
+снапшоты игр: идущая игра переживает кодирование и восстановление без потерь
+"""
+
+import pytest
+
+from snapshot import SNAPSHOT_VERSION, decode_game, encode_game
+
+
+def test_playing_game_round_trip(quiz, connect):
+    with quiz.app.app_context():
+        quiz.db.session.add_all(quiz.Question(topic='наука', difficulty='medium', question_text=f'вопрос снапшота {i}',
+                                              option_1='а', option_2='б', option_3='в', option_4='г', correct_answer=0)
+                                for i in range(2))
+        quiz.db.session.commit()
+    creator, player = connect(), connect()
+    creator.emit('create_game', {'topic': 'наука', 'mode': 'ffa', 'questions_count': 2})
+    pin = next(r['args'][0]['pin'] for r in creator.get_received() if r['name'] == 'game_created')
+    creator.emit('join_game', {'pin': pin})
+    player.emit('join_game', {'pin': pin})
+    creator.emit('start_game', {'pin': pin})
+    game = quiz.active_games[pin]
+    assert game.status == 'playing'
+
+    payload = encode_game(game.snapshot_state())
+    restored = quiz.GameSession.from_snapshot_state(decode_game(payload))
+    assert restored.game_id == game.game_id
+    assert restored.question_start_time == game.question_start_time
+    assert restored.large == game.large
+    assert restored.players == game.players
+    assert restored.questions == game.questions
+    # восстановленная игра пишет тот же снапшот: чекпоинт ее не перезапишет
+    assert encode_game(restored.snapshot_state()) == payload
+
+
+def test_unknown_version_is_rejected(quiz):
+    payload = encode_game(quiz.GameSession(None, 'наука', 'ffa').snapshot_state())
+    with pytest.raises(ValueError):
+        decode_game(bytes([SNAPSHOT_VERSION + 1]) + payload[1:])
+
+
+def test_resume_with_garbage_input(quiz, connect):
+    client = connect()
+    for data in ({'pin': 123456, 'token': 'x'}, {'pin': ['ABC'], 'token': {'a': 1}}, {}):
+        client.emit('resume_game', data)
+        assert [r['name'] for r in client.get_received()] == ['error']
@@ -0,0 +1,36 @@
+"""
+трансляция: закрытую комнату смотрят только с паролем
+"""
+
+
+def create_room(quiz, client, **options):
+    client.emit('create_game', {'topic': quiz.TOPICS[0], 'mode': 'ffa', 'questions_count': 3, **options})
+    return next(r['args'][0]['pin'] for r in client.get_received() if r['name'] == 'game_created')
+
+
+def received(client, name):
+    return [r['args'][0] for r in client.get_received() if r['name'] == name]
+
+
+def test_open_room_is_watchable(quiz, connect):
+    pin = create_room(quiz, connect())
+    watcher = connect()
+    watcher.emit('watch_game', {'pin': pin})
+    assert len(received(watcher, 'spectate')) == 1
+
+
+def test_password_room_needs_password(quiz, connect):
+    pin = create_room(quiz, connect(), has_password=True, password='secret')
+
+    for password in (None, 'wrong'):
+        watcher = connect()
+        watcher.emit('watch_game', {'pin': pin, 'password': password})
+        messages = watcher.get_received()
+        assert [r['name'] for r in messages] == ['error']
+        assert messages[0]['args'][0]['password_required']
+        assert not quiz.has_watchers(pin)
+
+    watcher = connect()
+    watcher.emit('watch_game', {'pin': pin, 'password': 'secret'})
+    assert len(received(watcher, 'spectate')) == 1
+    assert quiz.has_watchers(pin)
@@ -0,0 +1,48 @@
+"""
+транспорт socket.io
+auto - как раньше: старт на long-polling и апгрейд до websocket; websocket - сразу websocket без polling
+пакеты в json или в messagepack (бинарные кадры); сжатие permessage-deflate simple-websocket
+включает сам, если его предлагает браузер
+"""
+
+import os
+
+SOCKET_TRANSPORT = os.environ.get('SOCKET_TRANSPORT', 'auto')
+SOCKET_SERIALIZER = os.environ.get('SOCKET_SERIALIZER', 'json')
+
+TRANSPORTS = {
+    'auto': ['polling', 'websocket'],
+    'websocket': ['websocket'],
+}
+
+# клиент socket.io той же версии; сборка с msgpack содержит нужный парсер
+CLIENT_SCRIPTS = {
+    'json': 'https://cdn.socket.io/4.5.4/socket.io.min.js',
+    'msgpack': 'https://cdn.socket.io/4.5.4/socket.io.msgpack.min.js',
+}
+
+
+def _check(transport, serializer):
+    if transport not in TRANSPORTS:
+        raise ValueError(f'SOCKET_TRANSPORT: неизвестный транспорт {transport}')
+    if serializer not in CLIENT_SCRIPTS:
+        raise ValueError(f'SOCKET_SERIALIZER: неизвестный формат {serializer}')
+
+
+def server_options(transport=SOCKET_TRANSPORT, serializer=SOCKET_SERIALIZER):
+    """параметры для SocketIO(...)"""
+    _check(transport, serializer)
+    options = {'transports': TRANSPORTS[transport]}
+    if serializer == 'msgpack':
+        options['serializer'] = 'msgpack'
+    return options
+
+
+def client_config(transport=SOCKET_TRANSPORT, serializer=SOCKET_SERIALIZER):
+    """что нужно шаблонам: скрипт клиента и опции io()"""
+    _check(transport, serializer)
+    options = {}
+    if transport == 'websocket':
+        # без этого клиент начнет с polling, а сервер его отклонит
+        options['transports'] = ['websocket']
+    return {'script': CLIENT_SCRIPTS[serializer], 'options': options}